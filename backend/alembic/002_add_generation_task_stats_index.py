@@ -0,0 +1,29 @@
+"""Add generation task stats index
+
+Revision ID: 002_generation_task_stats
+Revises: 001_initial
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002_generation_task_stats'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # タスク種別ごとの期間集計（スループット・失敗率・所要時間）用
+    op.create_index(
+        'ix_generation_tasks_type_created',
+        'generation_tasks',
+        ['task_type', 'created_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_generation_tasks_type_created', table_name='generation_tasks')
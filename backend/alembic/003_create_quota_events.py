@@ -0,0 +1,35 @@
+"""Create quota events table
+
+Revision ID: 003_quota_events
+Revises: 002_generation_task_stats
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_quota_events'
+down_revision = '002_generation_task_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create quota_events table
+    op.create_table('quota_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('quota_key', sa.String(length=100), nullable=False),
+        sa.Column('token', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('token')
+    )
+    op.create_index(op.f('ix_quota_events_id'), 'quota_events', ['id'], unique=False)
+    op.create_index('ix_quota_events_key_created', 'quota_events', ['quota_key', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_quota_events_key_created', table_name='quota_events')
+    op.drop_index(op.f('ix_quota_events_id'), table_name='quota_events')
+    op.drop_table('quota_events')
@@ -0,0 +1,46 @@
+"""Create publish records table
+
+Revision ID: 004_publish_records
+Revises: 003_quota_events
+Create Date: 2026-10-18 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_publish_records'
+down_revision = '003_quota_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create publish_records table
+    op.create_table('publish_records',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('site', sa.String(length=255), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=True),
+        sa.Column('title', sa.String(length=500), nullable=True),
+        sa.Column('article_path', sa.Text(), nullable=True),
+        sa.Column('batch_id', sa.String(length=64), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('record_metadata', sa.JSON(), nullable=True),
+        sa.Column('claimed_at', sa.DateTime(), nullable=True),
+        sa.Column('published_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('site', 'content_hash', name='uq_publish_records_site_hash')
+    )
+    op.create_index(op.f('ix_publish_records_id'), 'publish_records', ['id'], unique=False)
+    op.create_index('ix_publish_records_batch_status', 'publish_records', ['batch_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_publish_records_batch_status', table_name='publish_records')
+    op.drop_index(op.f('ix_publish_records_id'), table_name='publish_records')
+    op.drop_table('publish_records')
@@ -0,0 +1,26 @@
+"""Add html_blob_hash to articles
+
+Revision ID: 005_article_html_blob
+Revises: 004_publish_records
+Create Date: 2026-10-18 22:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_article_html_blob'
+down_revision = '004_publish_records'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Reference to HTML stored in the content-addressed blob store
+    op.add_column('articles', sa.Column('html_blob_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_articles_html_blob_hash'), 'articles', ['html_blob_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_articles_html_blob_hash'), table_name='articles')
+    op.drop_column('articles', 'html_blob_hash')
@@ -0,0 +1,56 @@
+"""Create full-text search index for articles
+
+Revision ID: 006_article_search
+Revises: 005_article_html_blob
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '006_article_search'
+down_revision = '005_article_html_blob'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # FTS5 trigram index kept in sync with articles by triggers (SQLite 3.34+)
+        op.execute(
+            "CREATE VIRTUAL TABLE articles_fts USING fts5("
+            "title, content, content='articles', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER articles_fts_ai AFTER INSERT ON articles BEGIN "
+            "INSERT INTO articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER articles_fts_ad AFTER DELETE ON articles BEGIN "
+            "INSERT INTO articles_fts(articles_fts, rowid, title, content) "
+            "VALUES ('delete', old.id, old.title, old.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER articles_fts_au AFTER UPDATE OF title, content ON articles BEGIN "
+            "INSERT INTO articles_fts(articles_fts, rowid, title, content) "
+            "VALUES ('delete', old.id, old.title, old.content); "
+            "INSERT INTO articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END"
+        )
+        op.execute("INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        # Trigram GIN indexes serve ILIKE '%term%' for Japanese text as well
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_articles_title_trgm ON articles USING gin (title gin_trgm_ops)")
+        op.execute("CREATE INDEX ix_articles_content_trgm ON articles USING gin (content gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('articles_fts_ai', 'articles_fts_ad', 'articles_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS articles_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_articles_content_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_articles_title_trgm")
@@ -0,0 +1,54 @@
+"""Add composite indexes for hot queries
+
+Revision ID: 007_hot_query_indexes
+Revises: 006_article_search
+Create Date: 2026-10-18 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_hot_query_indexes'
+down_revision = '006_article_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 未処理トピックのスコア順、スコア順
+    op.create_index('ix_topics_processed_score', 'topics', ['processed', 'score'], unique=False)
+    op.create_index('ix_topics_score', 'topics', ['score'], unique=False)
+
+    # 記事一覧（新しい順、ステータス・種別での絞り込み）
+    op.create_index('ix_articles_generated_at', 'articles', ['generated_at'], unique=False)
+    op.create_index('ix_articles_status_generated', 'articles', ['status', 'generated_at'], unique=False)
+    op.create_index('ix_articles_type_generated', 'articles', ['type', 'generated_at'], unique=False)
+
+    # 記事ごとの最新ファクトチェック結果
+    op.create_index(
+        'ix_fact_check_results_article_version',
+        'fact_check_results',
+        ['article_id', 'checker_version'],
+        unique=False
+    )
+
+    # メトリクスごとの時系列（metric_name 単独の索引は複合索引の先頭列で代替）
+    op.create_index(
+        'ix_system_metrics_name_recorded',
+        'system_metrics',
+        ['metric_name', 'recorded_at'],
+        unique=False
+    )
+    op.drop_index('ix_system_metrics_metric_name', table_name='system_metrics')
+
+
+def downgrade() -> None:
+    op.create_index('ix_system_metrics_metric_name', 'system_metrics', ['metric_name'], unique=False)
+    op.drop_index('ix_system_metrics_name_recorded', table_name='system_metrics')
+    op.drop_index('ix_fact_check_results_article_version', table_name='fact_check_results')
+    op.drop_index('ix_articles_type_generated', table_name='articles')
+    op.drop_index('ix_articles_status_generated', table_name='articles')
+    op.drop_index('ix_articles_generated_at', table_name='articles')
+    op.drop_index('ix_topics_score', table_name='topics')
+    op.drop_index('ix_topics_processed_score', table_name='topics')
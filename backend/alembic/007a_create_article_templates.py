@@ -0,0 +1,51 @@
+"""Create article_templates table
+
+Revision ID: 007a_article_templates
+Revises: 007_hot_query_indexes
+Create Date: 2026-10-19 03:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007a_article_templates'
+down_revision = '007_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Databases built with create_all() already have the table
+    if 'article_templates' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table('article_templates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('article_type', sa.String(length=50), nullable=True),
+        sa.Column('tone', sa.String(length=50), nullable=True),
+        sa.Column('target_length', sa.Integer(), nullable=True),
+        sa.Column('structure', sa.JSON(), nullable=True),
+        sa.Column('required_elements', sa.JSON(), nullable=True),
+        sa.Column('keywords_template', sa.JSON(), nullable=True),
+        sa.Column('system_prompt', sa.Text(), nullable=True),
+        sa.Column('user_prompt_template', sa.Text(), nullable=True),
+        sa.Column('seo_title_template', sa.String(length=500), nullable=True),
+        sa.Column('meta_description_template', sa.String(length=500), nullable=True),
+        sa.Column('usage_count', sa.Integer(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('is_public', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_article_templates_id'), 'article_templates', ['id'], unique=False)
+    op.create_index(op.f('ix_article_templates_name'), 'article_templates', ['name'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_article_templates_name'), table_name='article_templates')
+    op.drop_index(op.f('ix_article_templates_id'), table_name='article_templates')
+    op.drop_table('article_templates')
@@ -0,0 +1,41 @@
+"""Create system_counters maintained by triggers
+
+Revision ID: 008_system_counters
+Revises: 007a_article_templates
+Create Date: 2026-10-19 00:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from src.system_counters import trigger_ddl, drop_trigger_ddl, rebuild_counters
+
+# revision identifiers, used by Alembic.
+revision = '008_system_counters'
+down_revision = '007a_article_templates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # SQLite has no transactional DDL, so an earlier failed run may have left the table behind
+    if 'system_counters' not in sa.inspect(bind).get_table_names():
+        op.create_table('system_counters',
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('value', sa.BigInteger(), nullable=False),
+            sa.PrimaryKeyConstraint('name')
+        )
+    if bind.dialect.name in ('sqlite', 'postgresql'):
+        # Counters are bumped by triggers on topics, articles and article_templates
+        for statement in trigger_ddl(bind.dialect.name):
+            op.execute(statement)
+        rebuild_counters(bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name in ('sqlite', 'postgresql'):
+        for statement in drop_trigger_ddl(bind.dialect.name):
+            op.execute(statement)
+    op.drop_table('system_counters')
@@ -0,0 +1,44 @@
+"""Create bigram search index for two-character terms
+
+Revision ID: 009_article_bigram_search
+Revises: 008_system_counters
+Create Date: 2026-10-19 02:00:00.000000
+
+"""
+from alembic import op
+
+from src.search_index import (
+    SQLITE_BIGRAM_DDL, POSTGRES_DDL, BIGRAM_TABLE, BIGRAM_PENDING_TABLE
+)
+
+# revision identifiers, used by Alembic.
+revision = '009_article_bigram_search'
+down_revision = '008_system_counters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        # Triggers queue changed article ids; the app computes the bigrams before two-character searches
+        for statement in SQLITE_BIGRAM_DDL:
+            op.execute(statement)
+        op.execute(f"INSERT OR IGNORE INTO {BIGRAM_PENDING_TABLE}(article_id) SELECT id FROM articles")
+    elif bind.dialect.name == 'postgresql':
+        # GIN index over the bigram array of title + content
+        for statement in POSTGRES_DDL:
+            if 'article_bigrams' in statement:
+                op.execute(statement)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {BIGRAM_TABLE}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {BIGRAM_PENDING_TABLE}")
+        op.execute(f"DROP TABLE IF EXISTS {BIGRAM_TABLE}")
+    elif bind.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_articles_bigrams")
+        op.execute("DROP FUNCTION IF EXISTS article_bigrams(text)")
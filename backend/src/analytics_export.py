@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+分析用の列指向アーカイブ
+トピック・記事・ファクトチェック結果・システムメトリクスを日付パーティションの Parquet（または Arrow IPC）に追記する。
+テーブルごとのウォーターマークから差分だけを書き出すので、分析は必要な列・期間のファイルだけを読めばよい
+
+出力先:
+    {ANALYTICS_EXPORT_DIR}/{データセット}/date=YYYY-MM-DD/part-*.parquet
+    （pyarrow.dataset / DuckDB などで hive パーティションとして読める）
+"""
+
+import os
+import json
+import gzip
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, and_, func, or_
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, Topic, Article, FactCheckResult, SystemMetrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_EXPORT_DIR = os.getenv('ANALYTICS_EXPORT_DIR', './output/analytics')
+# parquet / arrow（Arrow IPC）/ jsonl（pyarrow がない環境向けの gzip JSON Lines）
+ANALYTICS_EXPORT_FORMAT = os.getenv('ANALYTICS_EXPORT_FORMAT', 'parquet').lower()
+ANALYTICS_EXPORT_COMPRESSION = os.getenv('ANALYTICS_EXPORT_COMPRESSION', 'zstd')
+ANALYTICS_EXPORT_BATCH_SIZE = int(os.getenv('ANALYTICS_EXPORT_BATCH_SIZE', 10000))
+# コミット中のトランザクションを取りこぼさないよう、この秒数より新しい行は次回に回す
+ANALYTICS_EXPORT_LAG_SECONDS = float(os.getenv('ANALYTICS_EXPORT_LAG_SECONDS', 60))
+
+FORMAT_EXTENSIONS = {
+    'parquet': '.parquet',
+    'arrow': '.arrow',
+    'jsonl': '.jsonl.gz',
+}
+
+# ウォーターマークの保存先（"_" で始まるファイルはデータセットの読み込みで無視される）
+WATERMARK_FILE = '_watermarks.json'
+
+# 列の種類: int / float / bool / datetime / string / json（JSON文字列として保存）
+COLLECTED_TOPIC_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ('title', 'string'),
+    ('source', 'string'),
+    ('source_url', 'string'),
+    ('priority', 'string'),
+    ('coins', 'json'),
+    ('keywords', 'json'),
+    ('summary', 'string'),
+    ('collected_at', 'datetime'),
+    ('data', 'json'),
+    ('score', 'float'),
+    ('base_score', 'float'),
+)
+
+
+@dataclass(frozen=True)
+class ExportDataset:
+    """書き出すテーブル"""
+    name: str
+    model: Any
+    columns: Tuple[str, ...]
+    partition_column: str  # 日付パーティションを決める列
+    version_column: Optional[str] = None  # 更新を追う列（None なら id だけで追う追記専用のテーブル）
+
+    def fields(self) -> List[Tuple[str, str]]:
+        table = self.model.__table__
+        return [(name, _column_kind(table.c[name])) for name in self.columns]
+
+
+DATASETS: Dict[str, ExportDataset] = {dataset.name: dataset for dataset in (
+    ExportDataset(
+        'topics', Topic,
+        ('id', 'title', 'content', 'score', 'priority', 'source', 'source_url', 'keywords', 'coins',
+         'collected_at', 'updated_at', 'processed', 'processed_at'),
+        'collected_at', 'updated_at',
+    ),
+    # html_content は content から作り直せるので含めない
+    ExportDataset(
+        'articles', Article,
+        ('id', 'topic_id', 'title', 'content', 'summary', 'type', 'status', 'word_count', 'coins',
+         'keywords', 'source', 'source_url', 'model_used', 'generation_params',
+         'generated_at', 'published_at', 'updated_at'),
+        'generated_at', 'updated_at',
+    ),
+    ExportDataset(
+        'fact_check_results', FactCheckResult,
+        ('id', 'article_id', 'reliability_score', 'total_facts', 'verified_facts', 'failed_facts',
+         'skipped_facts', 'results', 'checker_version', 'checked_at'),
+        'checked_at',
+    ),
+    ExportDataset(
+        'system_metrics', SystemMetrics,
+        ('id', 'metric_name', 'metric_value', 'metric_unit', 'category', 'tags', 'recorded_at'),
+        'recorded_at',
+    ),
+)}
+
+
+def _column_kind(column) -> str:
+    if isinstance(column.type, Boolean):
+        return 'bool'
+    if isinstance(column.type, Integer):
+        return 'int'
+    if isinstance(column.type, Float):
+        return 'float'
+    if isinstance(column.type, DateTime):
+        return 'datetime'
+    if column.type.__class__.__name__ == 'JSON':
+        return 'json'
+    return 'string'
+
+
+def _convert(value: Any, kind: str) -> Any:
+    if value is None:
+        return None
+    if kind == 'json':
+        return json.dumps(value, ensure_ascii=False)
+    if kind == 'datetime' and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _partition_day(value: Any) -> str:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.date().isoformat() if value is not None else 'unknown'
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _arrow_schema(fields: Sequence[Tuple[str, str]]):
+    types = {
+        'int': pa.int64(),
+        'float': pa.float64(),
+        'bool': pa.bool_(),
+        'datetime': pa.timestamp('us'),
+        'string': pa.string(),
+        'json': pa.string(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in fields])
+
+
+def resolve_format(export_format: str) -> str:
+    """出力形式を決める（pyarrow がなければ jsonl にする）"""
+    if export_format not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Unknown analytics export format: {export_format}")
+    if export_format != 'jsonl' and not PYARROW_AVAILABLE:
+        logger.warning(f"pyarrow is not installed; writing {export_format} exports as jsonl")
+        return 'jsonl'
+    return export_format
+
+
+class AnalyticsExporter:
+    """
+    分析用アーカイブの書き出し
+
+    データセットごとに最後に書き出した行（id、更新を追うテーブルは (更新日時, id)）を
+    出力先の _watermarks.json に記録し、次回はその続きから書き出す。
+    更新されたトピック・記事は新しい版として追記されるので、読む側は id ごとに updated_at が最新の行を使う。
+    """
+
+    def __init__(self, output_dir: str = ANALYTICS_EXPORT_DIR, export_format: str = ANALYTICS_EXPORT_FORMAT,
+                 batch_size: int = ANALYTICS_EXPORT_BATCH_SIZE, lag_seconds: float = ANALYTICS_EXPORT_LAG_SECONDS,
+                 session_factory: Callable[[], Session] = SessionLocal):
+        self.output_dir = output_dir
+        self.format = resolve_format(export_format)
+        self.batch_size = batch_size
+        self.lag_seconds = lag_seconds
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+
+    # ---- ウォーターマーク ----
+
+    @property
+    def watermark_path(self) -> str:
+        return os.path.join(self.output_dir, WATERMARK_FILE)
+
+    def load_watermarks(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.watermark_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_watermarks(self, watermarks: Dict[str, Dict[str, Any]]) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = self.watermark_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(watermarks, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.watermark_path)
+
+    def reset(self, names: Iterable[str]) -> None:
+        """ウォーターマークを消して、次回は最初から書き出す（既存のファイルは消さない）"""
+        with self._lock:
+            watermarks = self.load_watermarks()
+            for name in names:
+                watermarks.pop(name, None)
+            self._save_watermarks(watermarks)
+
+    # ---- 書き込み ----
+
+    def _write_part(self, dataset: str, fields: Sequence[Tuple[str, str]], day: str,
+                    part_name: str, rows: List[Dict[str, Any]]) -> str:
+        """1つのパーティションにファイルを書く（一時ファイルに書いてから置き換える）"""
+        directory = os.path.join(self.output_dir, dataset, f"date={day}")
+        os.makedirs(directory, exist_ok=True)
+        filename = part_name + FORMAT_EXTENSIONS[self.format]
+        path = os.path.join(directory, filename)
+        tmp_path = os.path.join(directory, f".{filename}.tmp")
+
+        if self.format == 'jsonl':
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False, default=_json_default) + '\n')
+        else:
+            table = pa.Table.from_pylist(rows, schema=_arrow_schema(fields))
+            if self.format == 'parquet':
+                pq.write_table(table, tmp_path, compression=ANALYTICS_EXPORT_COMPRESSION)
+            else:
+                feather.write_feather(table, tmp_path, compression=ANALYTICS_EXPORT_COMPRESSION)
+        os.replace(tmp_path, path)
+        return path
+
+    def _write_partitions(self, dataset: str, fields: Sequence[Tuple[str, str]], part_name: str,
+                          rows: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        by_day: Dict[str, List[Dict[str, Any]]] = {}
+        for day, row in rows:
+            by_day.setdefault(day, []).append(row)
+        for day, day_rows in by_day.items():
+            self._write_part(dataset, fields, day, part_name, day_rows)
+        return len(by_day)
+
+    # ---- データベースのテーブル ----
+
+    def _fetch_batch(self, db: Session, dataset: ExportDataset, mark: Dict[str, Any],
+                     cutoff: datetime) -> List[Tuple[Any, Any]]:
+        """ウォーターマークより後の行を (行, 版) で最大 batch_size 件"""
+        model = dataset.model
+        columns = [getattr(model, name) for name in dataset.columns]
+        last_id = mark.get('id', 0)
+
+        if dataset.version_column:
+            version = func.coalesce(
+                getattr(model, dataset.version_column), getattr(model, dataset.partition_column)
+            ).label('export_version')
+            query = db.query(*columns, version).filter(version < cutoff)
+            if mark.get('version'):
+                last_version = datetime.fromisoformat(mark['version'])
+                query = query.filter(or_(
+                    version > last_version, and_(version == last_version, model.id > last_id)
+                ))
+            rows = query.order_by(version, model.id).limit(self.batch_size).all()
+            return [(row, _convert(row.export_version, 'datetime')) for row in rows]
+
+        rows = db.query(*columns).filter(model.id > last_id).order_by(model.id).limit(self.batch_size).all()
+        batch = []
+        for row in rows:
+            # id 順に読むので、猶予期間内の行に当たったらそこで止める（それより後の id は次回）
+            created = _convert(getattr(row, dataset.partition_column), 'datetime')
+            if created is not None and created >= cutoff:
+                break
+            batch.append((row, None))
+        return batch
+
+    def export_dataset(self, name: str, db: Optional[Session] = None) -> Dict[str, Any]:
+        """1つのデータセットの差分を書き出す"""
+        dataset = DATASETS[name]
+        fields = dataset.fields()
+        cutoff = datetime.utcnow() - timedelta(seconds=self.lag_seconds)
+        owns_session = db is None
+        db = db or self.session_factory()
+        exported = files = 0
+        try:
+            with self._lock:
+                watermarks = self.load_watermarks()
+                mark = dict(watermarks.get(name, {}))
+                while True:
+                    batch = self._fetch_batch(db, dataset, mark, cutoff)
+                    if not batch:
+                        break
+                    first_row, first_version = batch[0]
+                    last_row, last_version = batch[-1]
+                    if first_version is not None:
+                        part_name = f"part-{first_version.strftime('%Y%m%dT%H%M%S%f')}-{first_row.id:010d}"
+                    else:
+                        part_name = f"part-{first_row.id:010d}-{last_row.id:010d}"
+
+                    files += self._write_partitions(name, fields, part_name, (
+                        (
+                            _partition_day(getattr(row, dataset.partition_column)),
+                            {column: _convert(getattr(row, column), kind) for column, kind in fields},
+                        )
+                        for row, _ in batch
+                    ))
+                    exported += len(batch)
+
+                    # ファイルを書いてからウォーターマークを進める（途中で落ちても同じ名前で書き直される）
+                    mark = {
+                        'id': last_row.id,
+                        'version': last_version.isoformat() if last_version is not None else None,
+                        'rows': mark.get('rows', 0) + len(batch),
+                        'exported_at': datetime.utcnow().isoformat(),
+                    }
+                    watermarks[name] = mark
+                    self._save_watermarks(watermarks)
+
+                    if len(batch) < self.batch_size:
+                        break
+        finally:
+            if owns_session:
+                db.close()
+
+        if exported:
+            logger.info(f"Exported {exported} {name} rows to {files} {self.format} files")
+        return {'dataset': name, 'rows': exported, 'files': files, 'watermark': mark}
+
+    def export(self, names: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """データセット（省略時はすべて）の差分を書き出す"""
+        names = list(names) if names else list(DATASETS)
+        unknown = [name for name in names if name not in DATASETS]
+        if unknown:
+            raise ValueError(f"Unknown analytics datasets: {', '.join(unknown)}")
+
+        db = self.session_factory()
+        try:
+            return [self.export_dataset(name, db) for name in names]
+        finally:
+            db.close()
+
+    # ---- パイプラインが収集したトピック ----
+
+    def append_collected_topics(self, topics: Sequence[Any]) -> int:
+        """
+        TopicManager に新しく追加されたトピック（CollectedTopic）を collected_topics に追記する
+
+        収集のたびに全トピックを JSON に書き出す代わりに、その回の新着分だけを書く。
+        """
+        if not topics:
+            return 0
+        part_name = f"part-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}"
+        rows = []
+        for topic in topics:
+            values = topic.to_dict()
+            values['base_score'] = topic.base_score
+            row = {name: _convert(values.get(name), kind) for name, kind in COLLECTED_TOPIC_FIELDS}
+            rows.append((_partition_day(row['collected_at']), row))
+        with self._lock:
+            self._write_partitions('collected_topics', COLLECTED_TOPIC_FIELDS, part_name, rows)
+        return len(rows)
+
+
+# グローバルインスタンス
+_analytics_exporter: Optional[AnalyticsExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_analytics_exporter() -> AnalyticsExporter:
+    """分析用アーカイブのシングルトンを取得"""
+    global _analytics_exporter
+    if _analytics_exporter is None:
+        with _exporter_lock:
+            if _analytics_exporter is None:
+                _analytics_exporter = AnalyticsExporter()
+    return _analytics_exporter
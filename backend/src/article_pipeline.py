@@ -5,7 +5,6 @@
 """
 
 import os
-import json
 import time
 import schedule
 from datetime import datetime, timedelta
@@ -23,6 +22,10 @@ from .crypto_article_generator_mvp import (
     CryptoArticleGenerator, ArticleTopic, ArticleType, 
     ArticleDepth, GeneratedArticle
 )
+from .quota_service import QuotaService, get_quota_service
+from .article_repository import get_article_repository
+from .analytics_export import get_analytics_exporter
+from .topic_journal import attach_owned_journal
 
 load_dotenv()
 
@@ -48,62 +51,81 @@ class PipelineConfig:
     generation_interval_minutes: int = 5
     enable_wordpress_post: bool = False
     enable_fact_check: bool = False
+    enable_analytics_export: bool = False
     output_dir: str = "./output"
+    
+    @classmethod
+    def from_env(cls) -> 'PipelineConfig':
+        """環境変数から設定を読み込み"""
+        return cls(
+            max_articles_per_day=int(os.getenv('MAX_ARTICLES_PER_DAY', 50)),
+            max_articles_per_hour=int(os.getenv('MAX_ARTICLES_PER_HOUR', 10)),
+            min_topic_score=float(os.getenv('MIN_TOPIC_SCORE', 30.0)),
+            collection_interval_minutes=int(os.getenv('COLLECTION_INTERVAL_MINUTES', 30)),
+            generation_interval_minutes=int(os.getenv('GENERATION_INTERVAL_MINUTES', 5)),
+            enable_wordpress_post=os.getenv('ENABLE_WORDPRESS_POST', 'false').lower() == 'true',
+            enable_analytics_export=os.getenv('ENABLE_ANALYTICS_EXPORT', 'false').lower() == 'true',
+            output_dir=os.getenv('OUTPUT_DIR', './output')
+        )
 
 
 class ArticleQuota:
-    """記事生成数の管理"""
+    """
+    記事生成数の管理
     
-    def __init__(self, config: PipelineConfig):
+    カウントは QuotaService（Redis/DB）で全プロセス共有のスライディングウィンドウとして管理する。
+    """
+    
+    def __init__(self, config: PipelineConfig, service: Optional[QuotaService] = None):
         self.config = config
-        self.daily_count = 0
-        self.hourly_count = 0
-        self.last_reset_date = datetime.now().date()
-        self.last_reset_hour = datetime.now().hour
+        self.service = service or get_quota_service(
+            max_per_hour=config.max_articles_per_hour,
+            max_per_day=config.max_articles_per_day
+        )
         self.generation_history: List[Dict] = []
     
     def can_generate(self) -> bool:
         """記事を生成できるかチェック"""
-        now = datetime.now()
-        
-        # 日付が変わったらリセット
-        if now.date() > self.last_reset_date:
-            self.daily_count = 0
-            self.last_reset_date = now.date()
+        result = self.service.peek()
         
-        # 時間が変わったらリセット
-        if now.hour != self.last_reset_hour:
-            self.hourly_count = 0
-            self.last_reset_hour = now.hour
+        if not result.available:
+            logger.warning("Quota backend unavailable")
+            return False
         
         # クォータチェック
-        if self.daily_count >= self.config.max_articles_per_day:
+        if result.daily_count >= self.config.max_articles_per_day:
             logger.warning("Daily quota reached")
             return False
         
-        if self.hourly_count >= self.config.max_articles_per_hour:
+        if result.hourly_count >= self.config.max_articles_per_hour:
             logger.warning("Hourly quota reached")
             return False
         
         return True
     
-    def increment(self, article_info: Dict):
-        """生成数をカウント"""
-        self.daily_count += 1
-        self.hourly_count += 1
+    def acquire(self) -> Optional[str]:
+        """生成枠を予約（上限に達している場合は None）"""
+        result = self.service.acquire()
+        if not result.allowed:
+            logger.warning("Article quota reached")
+            return None
+        return result.token
+    
+    def release(self, token: str):
+        """予約した生成枠を返却（生成失敗時）"""
+        self.service.release(token)
+    
+    def increment(self, article_info: Dict, token: str):
+        """生成した記事を記録（枠は acquire() で予約済み。token はその予約）"""
         self.generation_history.append({
             'timestamp': datetime.now().isoformat(),
+            'token': token,
             'article': article_info
         })
     
     def get_stats(self) -> Dict:
         """統計情報を取得"""
-        return {
-            'daily_count': self.daily_count,
-            'hourly_count': self.hourly_count,
-            'daily_remaining': self.config.max_articles_per_day - self.daily_count,
-            'hourly_remaining': self.config.max_articles_per_hour - self.hourly_count
-        }
+        return self.service.get_stats()
 
 
 class ArticlePipeline:
@@ -122,9 +144,15 @@ class ArticlePipeline:
         
         # 出力ディレクトリ作成
         os.makedirs(config.output_dir, exist_ok=True)
-        os.makedirs(f"{config.output_dir}/articles", exist_ok=True)
         os.makedirs(f"{config.output_dir}/logs", exist_ok=True)
     
+    def attach_topic_journal(self, role: str = 'pipeline'):
+        """
+        このプロセスがトピックのジャーナルの書き込み担当（TOPIC_JOURNAL_OWNER == role）なら、
+        前回までのトピックを復元し、以降の変更を追記する
+        """
+        return attach_owned_journal(self.topic_manager, role, self.config.output_dir)
+    
     def collect_topics(self):
         """トピックを収集"""
         logger.info("Starting topic collection...")
@@ -132,18 +160,17 @@ class ArticlePipeline:
         try:
             # RSSから収集
             rss_topics = self.rss_collector.collect()
-            self.topic_manager.add_topics(rss_topics)
+            added = self.topic_manager.add_topics(rss_topics)
             logger.info(f"Collected {len(rss_topics)} topics from RSS feeds")
             
             # 価格データから収集
             price_topics = self.price_collector.collect()
-            self.topic_manager.add_topics(price_topics)
+            added += self.topic_manager.add_topics(price_topics)
             logger.info(f"Collected {len(price_topics)} topics from price data")
             
-            # トピックを保存
-            self.topic_manager.save_topics(
-                f"{self.config.output_dir}/logs/topics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            )
+            # 新着トピックを分析用アーカイブに追記（トピック自体は add_topics がジャーナルに記録済み）
+            if self.config.enable_analytics_export:
+                get_analytics_exporter().append_collected_topics(added)
             
         except Exception as e:
             logger.error(f"Error collecting topics: {e}")
@@ -173,7 +200,8 @@ class ArticlePipeline:
         logger.info(f"Found {len(unprocessed_topics)} unprocessed topics")
         
         for topic in unprocessed_topics:
-            if not self.quota.can_generate():
+            quota_token = self.quota.acquire()
+            if quota_token is None:
                 break
             
             try:
@@ -195,7 +223,7 @@ class ArticlePipeline:
                     'title': topic.title,
                     'type': article_topic.article_type.value,
                     'word_count': article.word_count
-                })
+                }, token=quota_token)
                 
                 logger.info(f"Successfully generated article: {topic.title}")
                 
@@ -204,6 +232,7 @@ class ArticlePipeline:
                 
             except Exception as e:
                 logger.error(f"Error generating article for '{topic.title}': {e}")
+                self.quota.release(quota_token)
         
         # 統計情報をログ
         stats = self.quota.get_stats()
@@ -262,38 +291,11 @@ class ArticlePipeline:
         }
         return coin_names.get(symbol, symbol)
     
-    def _save_article(self, article: GeneratedArticle, topic: CollectedTopic):
-        """記事を保存"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        base_name = f"{timestamp}_{article.topic.coin_symbol}_{topic.priority.name}"
-        
-        # 記事本文を保存
-        article_path = f"{self.config.output_dir}/articles/{base_name}.html"
-        with open(article_path, 'w', encoding='utf-8') as f:
-            f.write(article.html_content)
-        
-        # メタデータを保存
-        metadata = {
-            'generated_at': article.generated_at.isoformat(),
-            'topic': {
-                'title': topic.title,
-                'source': topic.source.value,
-                'priority': topic.priority.value,
-                'score': topic.score,
-                'collected_at': topic.collected_at.isoformat()
-            },
-            'article': {
-                'type': article.topic.article_type.value,
-                'depth': article.topic.depth.value,
-                'word_count': article.word_count,
-                'coins': article.topic.coins,
-                'keywords': article.topic.keywords
-            }
-        }
-        
-        metadata_path = f"{self.config.output_dir}/articles/{base_name}_meta.json"
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+    def _save_article(self, article: GeneratedArticle, topic: CollectedTopic) -> int:
+        """記事をデータベースに保存"""
+        article_id = get_article_repository().save_article(article, topic)
+        logger.info(f"Article saved: id={article_id}")
+        return article_id
     
     def run_once(self):
         """パイプラインを1回実行"""
@@ -353,18 +355,11 @@ class ArticlePipeline:
 def main():
     """メイン実行関数"""
     # 設定を読み込み
-    config = PipelineConfig(
-        max_articles_per_day=int(os.getenv('MAX_ARTICLES_PER_DAY', 50)),
-        max_articles_per_hour=int(os.getenv('MAX_ARTICLES_PER_HOUR', 10)),
-        min_topic_score=float(os.getenv('MIN_TOPIC_SCORE', 30.0)),
-        collection_interval_minutes=int(os.getenv('COLLECTION_INTERVAL_MINUTES', 30)),
-        generation_interval_minutes=int(os.getenv('GENERATION_INTERVAL_MINUTES', 5)),
-        enable_wordpress_post=os.getenv('ENABLE_WORDPRESS_POST', 'false').lower() == 'true',
-        output_dir=os.getenv('OUTPUT_DIR', './output')
-    )
+    config = PipelineConfig.from_env()
     
     # パイプラインを初期化
     pipeline = ArticlePipeline(config)
+    pipeline.attach_topic_journal()
     
     # 実行モードを選択
     import sys
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+記事リポジトリ
+生成した記事を articles テーブルへ直接保存し、APIの各エンドポイントはここを通して読み書きする。
+HTML本文は行に持つか、ARTICLE_HTML_STORAGE=blob の場合は内容アドレス（SHA-256）のブロブ保存領域に置く
+"""
+
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, Article, FactCheckResult
+from .pagination import encode_article_cursor, decode_article_cursor
+
+logger = logging.getLogger(__name__)
+
+# HTML本文の保存先（db: articles.html_content、blob: ブロブ保存領域）
+ARTICLE_HTML_STORAGE = os.getenv('ARTICLE_HTML_STORAGE', 'db')
+ARTICLE_BLOB_DIR = os.getenv('ARTICLE_BLOB_DIR', './output/blobs')
+
+# プロセス内に保持するブロブ数（内容アドレスなので古くならない）
+DEFAULT_BLOB_CACHE_SIZE = int(os.getenv('ARTICLE_BLOB_CACHE_SIZE', 128))
+# 参照されていないブロブを消すまでの猶予（秒）。保存中の記事がコミットするまでの時間より長くする
+ARTICLE_BLOB_GC_GRACE = float(os.getenv('ARTICLE_BLOB_GC_GRACE', 3600))
+BLOB_GC_BATCH = 500
+
+
+class BlobStore:
+    """
+    内容アドレスのブロブ保存領域
+
+    ファイル名はUTF-8本文のSHA-256（root/ab/cdef...）。同じ内容は1ファイルにまとまり、
+    一度書いたファイルは変わらないため、読み込んだ本文はそのままキャッシュできる。
+    参照されなくなったブロブはすぐには消さず、ArticleRepository.collect_blob_garbage で
+    最後の put から猶予を過ぎたものだけを消す（同じ本文を保存中の記事と競合しないように）。
+    """
+
+    def __init__(self, root: str, cache_size: int = DEFAULT_BLOB_CACHE_SIZE):
+        self.root = Path(root)
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(data: str) -> str:
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:]
+
+    def _remember(self, digest: str, data: str) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[digest] = data
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def put(self, data: str) -> str:
+        """本文を保存してダイジェストを返す（既にあれば書き込まない）"""
+        digest = self.digest(data)
+        path = self._path(digest)
+        try:
+            # 既にあれば更新時刻だけ進める（猶予中は回収されない）
+            os.utime(path)
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # 一時ファイルに書いてから置き換え（読み手が書きかけのファイルを見ないように）
+            fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data.encode('utf-8'))
+                os.replace(temp_path, path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+        self._remember(digest, data)
+        return digest
+
+    def get(self, digest: str) -> Optional[str]:
+        with self._lock:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return self._cache[digest]
+        try:
+            data = self._path(digest).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            logger.warning(f"Article blob not found: {digest}")
+            return None
+        self._remember(digest, data)
+        return data
+
+    def exists(self, digest: str) -> bool:
+        return self._path(digest).exists()
+
+    def list_blobs(self) -> Iterator[Tuple[str, Path, float]]:
+        """保存されているファイルの (ダイジェスト, パス, 更新時刻)。書きかけの一時ファイルはダイジェストが空"""
+        if not self.root.is_dir():
+            return
+        for directory in self.root.iterdir():
+            if not directory.is_dir() or len(directory.name) != 2:
+                continue
+            for path in directory.iterdir():
+                try:
+                    mtime = path.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                digest = '' if path.name.startswith('.tmp-') else directory.name + path.name
+                yield digest, path, mtime
+
+    def delete(self, digest: str, older_than: Optional[float] = None) -> bool:
+        """ブロブを消す（older_than を指定した場合、それ以降に put されたブロブは残す）"""
+        path = self._path(digest)
+        try:
+            if older_than is not None and path.stat().st_mtime >= older_than:
+                return False
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            self._cache.pop(digest, None)
+        return True
+
+
+class ArticleRepository:
+    """
+    articles テーブルへの記事の保存・取得
+
+    生成時のメタデータ（深度、トピックのスコア・優先度、タスクIDなど）は generation_params
+    に保存し、WordPress投稿用のメタデータは publish_metadata() で組み立てる。
+    """
+
+    def __init__(self, session_factory=None, blob_store: Optional[BlobStore] = None,
+                 store_html_in_blobs: bool = False):
+        self.session_factory = session_factory or SessionLocal
+        self.blob_store = blob_store or BlobStore(ARTICLE_BLOB_DIR)
+        self.store_html_in_blobs = store_html_in_blobs
+
+    def save_generated(self, *, title: str, html_content: str, content: Optional[str] = None,
+                       article_type: Optional[str] = None, word_count: int = 0,
+                       coins: Optional[List[str]] = None, keywords: Optional[List[str]] = None,
+                       source: Optional[str] = None, source_url: Optional[str] = None,
+                       model_used: Optional[str] = None,
+                       generation_params: Optional[Dict[str, Any]] = None,
+                       generated_at: Optional[datetime] = None,
+                       db: Optional[Session] = None) -> int:
+        """生成した記事を保存して記事IDを返す"""
+        article = Article(
+            title=title,
+            content=content,
+            type=article_type,
+            status='draft',
+            word_count=word_count,
+            coins=list(coins or []),
+            keywords=list(keywords or []),
+            source=source,
+            source_url=source_url,
+            model_used=model_used,
+            generation_params=generation_params or {},
+            generated_at=generated_at or datetime.utcnow()
+        )
+        # コミットに失敗した場合のブロブは参照されないまま残り、collect_blob_garbage で消える
+        if self.store_html_in_blobs:
+            article.html_blob_hash = self.blob_store.put(html_content)
+        else:
+            article.html_content = html_content
+
+        own_session = db is None
+        db = db or self.session_factory()
+        try:
+            db.add(article)
+            db.commit()
+            article_id = article.id
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            if own_session:
+                db.close()
+
+        # put からコミットまでの間に回収された場合は書き直す
+        if article.html_blob_hash and not self.blob_store.exists(article.html_blob_hash):
+            logger.warning(f"Article blob {article.html_blob_hash} was collected before commit; rewriting")
+            self.blob_store.put(html_content)
+        return article_id
+
+    def save_article(self, article, topic, extra_params: Optional[Dict[str, Any]] = None,
+                     db: Optional[Session] = None) -> int:
+        """GeneratedArticle と元の CollectedTopic から記事を保存"""
+        article_topic = article.topic
+        generation_params = {
+            'depth': article_topic.depth.value,
+            'topic': {
+                'title': topic.title,
+                'source': topic.source.value if topic.source else None,
+                'priority': topic.priority.value,
+                'score': topic.score,
+                'collected_at': topic.collected_at.isoformat()
+            },
+            'ai': {key: value for key, value in (article.metadata or {}).items() if key != 'ai_config'},
+            **(extra_params or {})
+        }
+        return self.save_generated(
+            title=topic.title,
+            html_content=article.html_content,
+            content=article.content,
+            article_type=article_topic.article_type.value,
+            word_count=article.word_count,
+            coins=topic.coins,
+            keywords=article_topic.keywords,
+            source=topic.source.value if topic.source else None,
+            source_url=topic.source_url,
+            model_used=(article.metadata or {}).get('ai_model'),
+            generation_params=generation_params,
+            generated_at=article.generated_at,
+            db=db
+        )
+
+    def get(self, db: Session, article_id: int) -> Optional[Article]:
+        return db.query(Article).filter(Article.id == article_id).first()
+
+    def get_html(self, article: Article) -> str:
+        """記事のHTML本文（ブロブ保存領域にあればそこから）"""
+        if article.html_blob_hash:
+            return self.blob_store.get(article.html_blob_hash) or ''
+        return article.html_content or ''
+
+    def publish_metadata(self, article: Article) -> Dict[str, Any]:
+        """ArticlePublisher が扱うメタデータ形式（旧 _meta.json と同じ構造）"""
+        params = article.generation_params or {}
+        topic = dict(params.get('topic') or {})
+        topic.setdefault('title', article.title)
+        return {
+            'generated_at': article.generated_at.isoformat() if article.generated_at else '',
+            'topic': topic,
+            'article': {
+                'id': article.id,
+                'type': article.type,
+                'depth': params.get('depth'),
+                'word_count': article.word_count or 0,
+                'coins': article.coins or [],
+                'keywords': article.keywords or []
+            }
+        }
+
+    @staticmethod
+    def _set_published(article: Article, post_id: Optional[int]) -> None:
+        article.status = 'published'
+        article.published_at = datetime.utcnow()
+        if post_id:
+            article.generation_params = {**(article.generation_params or {}), 'wordpress_post_id': post_id}
+
+    def mark_published(self, db: Session, article: Article, post_id: Optional[int] = None) -> None:
+        self._set_published(article, post_id)
+        db.commit()
+
+    def delete(self, db: Session, article_id: int) -> bool:
+        """記事（とファクトチェック結果）を削除する。ブロブは collect_blob_garbage で消す"""
+        article = self.get(db, article_id)
+        if not article:
+            return False
+        db.query(FactCheckResult).filter(FactCheckResult.article_id == article_id).delete(
+            synchronize_session=False
+        )
+        db.delete(article)
+        db.commit()
+        return True
+
+    def collect_blob_garbage(self, grace_seconds: float = ARTICLE_BLOB_GC_GRACE,
+                             db: Optional[Session] = None) -> int:
+        """
+        どの記事からも参照されていないブロブを消し、消した数を返す
+
+        最後の put から grace_seconds 以内のブロブは、まだコミットしていない記事のものかもしれないので残す。
+        判定後に同じ本文が保存された場合も、save_generated がコミット後に確認して書き直す。
+        """
+        cutoff = time.time() - grace_seconds
+        candidates = []
+        for digest, path, mtime in self.blob_store.list_blobs():
+            if mtime >= cutoff:
+                continue
+            if digest:
+                candidates.append(digest)
+            else:
+                # 書き込み中に落ちた一時ファイル
+                path.unlink(missing_ok=True)
+
+        own_session = db is None
+        db = db or self.session_factory()
+        removed = 0
+        try:
+            for start in range(0, len(candidates), BLOB_GC_BATCH):
+                batch = candidates[start:start + BLOB_GC_BATCH]
+                referenced = {
+                    digest for (digest,) in
+                    db.query(Article.html_blob_hash).filter(Article.html_blob_hash.in_(batch))
+                }
+                for digest in batch:
+                    if digest not in referenced and self.blob_store.delete(digest, older_than=cutoff):
+                        removed += 1
+        finally:
+            if own_session:
+                db.close()
+
+        if removed:
+            logger.info(f"Removed {removed} unreferenced article blobs")
+        return removed
+
+    def list_unpublished(self, db: Session, limit: int) -> List[Article]:
+        """未投稿（下書き）の記事を古い順に"""
+        return (
+            db.query(Article)
+            .filter(Article.status == 'draft')
+            .order_by(Article.generated_at, Article.id)
+            .limit(limit)
+            .all()
+        )
+
+    def mark_published_many(self, post_ids: Dict[int, int], db: Optional[Session] = None) -> None:
+        """記事ID → 投稿ID の記事をまとめて投稿済みにする"""
+        if not post_ids:
+            return
+        own_session = db is None
+        db = db or self.session_factory()
+        try:
+            for article in db.query(Article).filter(Article.id.in_(list(post_ids))):
+                self._set_published(article, post_ids[article.id])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            if own_session:
+                db.close()
+
+    def list_page(self, db: Session, limit: int = 20, cursor: Optional[str] = None,
+                  status: Optional[str] = None, article_type: Optional[str] = None,
+                  offset: int = 0) -> Tuple[List[Article], Optional[str]]:
+        """
+        記事一覧（新しい順）の1ページと次のページのカーソル
+
+        (generated_at, id) の降順に並べ、カーソルはページ最後の記事のキー。
+        次のページはキーの比較で索引から直接引くため、何ページ目でも取得量はページ分だけで、
+        途中で記事が追加されてもページがずれない。
+        """
+        query = db.query(Article).order_by(Article.generated_at.desc(), Article.id.desc())
+        if status:
+            query = query.filter(Article.status == status)
+        if article_type:
+            query = query.filter(Article.type == article_type)
+        if cursor:
+            generated_at, article_id = decode_article_cursor(cursor)
+            # generated_at <= は索引の範囲検索に使われ、同時刻の記事は id で区切る
+            query = query.filter(
+                Article.generated_at <= generated_at,
+                or_(Article.generated_at < generated_at, Article.id < article_id)
+            )
+        elif offset:
+            query = query.offset(offset)
+
+        articles = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(articles) > limit:
+            articles = articles[:limit]
+            last = articles[-1]
+            next_cursor = encode_article_cursor(last.generated_at, last.id)
+        return articles, next_cursor
+
+    def count_generated_since(self, db: Session, since: datetime) -> int:
+        return db.query(Article).filter(Article.generated_at >= since).count()
+
+
+# グローバルインスタンス
+_article_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_article_repository() -> ArticleRepository:
+    """記事リポジトリのシングルトンを取得"""
+    global _article_repository
+    if _article_repository is None:
+        with _repository_lock:
+            if _article_repository is None:
+                _article_repository = ArticleRepository(
+                    store_html_in_blobs=ARTICLE_HTML_STORAGE == 'blob'
+                )
+    return _article_repository
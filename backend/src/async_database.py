@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+非同期のデータベースセッション
+FastAPI の async ハンドラからイベントループを止めずにデータベースを読み書きするための get_async_db。
+aiosqlite / asyncpg が入っていれば SQLAlchemy の AsyncSession、なければ同期セッションの処理をスレッドで実行する。
+どちらも run_sync(関数) で既存の同期クエリ（db.query など）をそのまま使える
+"""
+
+import os
+import asyncio
+import logging
+import importlib.util
+import threading
+from typing import Any, AsyncIterator, Callable, Optional
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from .database import DATABASE_URL, SessionLocal, engine_options, instrument_engine, is_memory_database
+
+logger = logging.getLogger(__name__)
+
+# 非同期ドライバの使用（auto: 入っていれば使う、false: 常にスレッドで実行）
+DATABASE_ASYNC = os.getenv('DATABASE_ASYNC', 'auto').lower()
+
+# 方言ごとの非同期ドライバ（URLのドライバ名, モジュール名）
+ASYNC_DRIVERS = {
+    'sqlite': ('sqlite+aiosqlite', 'aiosqlite'),
+    'postgresql': ('postgresql+asyncpg', 'asyncpg'),
+}
+
+try:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+    ASYNCIO_AVAILABLE = importlib.util.find_spec('greenlet') is not None
+except ImportError:
+    ASYNCIO_AVAILABLE = False
+
+
+def async_database_url(url: str = DATABASE_URL) -> Optional[str]:
+    """非同期ドライバでの接続URL（ドライバがない・使えないデータベースなら None）"""
+    if DATABASE_ASYNC == 'false' or not ASYNCIO_AVAILABLE:
+        return None
+    database_url = make_url(url)
+    driver = ASYNC_DRIVERS.get(database_url.get_backend_name())
+    # インメモリのSQLiteは接続ごとに別のデータベースになるため、同期エンジンと共有できない
+    if not driver or is_memory_database(database_url):
+        return None
+    drivername, module = driver
+    if importlib.util.find_spec(module) is None:
+        if DATABASE_ASYNC == 'true':
+            logger.warning(f"DATABASE_ASYNC=true but {module} is not installed; using threaded sessions")
+        return None
+    return database_url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+class ThreadedSession:
+    """
+    非同期ドライバがない場合の AsyncSession の代わり
+
+    同期セッションへの処理を1つずつワーカースレッドで実行する（同時に2つの処理は走らせない）。
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self._session: Session = session_factory()
+        self._lock = asyncio.Lock()
+
+    async def _run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        async with self._lock:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+
+    async def run_sync(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await self._run(fn, self._session, *args, **kwargs)
+
+    async def commit(self) -> None:
+        await self._run(self._session.commit)
+
+    async def rollback(self) -> None:
+        await self._run(self._session.rollback)
+
+    async def close(self) -> None:
+        await self._run(self._session.close)
+
+
+# グローバルインスタンス
+_async_engine = None
+_async_session_factory = None
+_async_checked = False
+_async_lock = threading.Lock()
+
+
+def get_async_engine():
+    """非同期エンジンのシングルトンを取得（非同期ドライバがなければ None）"""
+    global _async_engine, _async_session_factory, _async_checked
+    if not _async_checked:
+        with _async_lock:
+            if not _async_checked:
+                url = async_database_url()
+                if url is not None:
+                    options = engine_options(url)
+                    if make_url(url).get_backend_name() == 'sqlite':
+                        options['poolclass'] = AsyncAdaptedQueuePool
+                    _async_engine = create_async_engine(url, **options)
+                    instrument_engine(_async_engine.sync_engine)
+                    _async_session_factory = async_sessionmaker(
+                        _async_engine, autoflush=False, expire_on_commit=False
+                    )
+                    logger.info(f"Async database sessions enabled ({make_url(url).drivername})")
+                _async_checked = True
+    return _async_engine
+
+
+def async_session_mode() -> str:
+    """asyncio（非同期ドライバ）または thread（同期セッションをスレッドで実行）"""
+    return 'asyncio' if get_async_engine() is not None else 'thread'
+
+
+def open_async_session():
+    """AsyncSession（またはその代わりの ThreadedSession）を開く。呼び出し側で await close() する"""
+    if get_async_engine() is not None:
+        return _async_session_factory()
+    return ThreadedSession()
+
+
+async def get_async_db() -> AsyncIterator[Any]:
+    """非同期ハンドラ用のデータベースセッションを取得"""
+    db = open_async_session()
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -15,7 +15,7 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
-from .database import SessionLocal
+from .async_database import open_async_session
 from .auth_service import AuthService, get_current_user_from_token, get_current_user_from_api_key
 
 # レート制限設定
@@ -43,6 +43,27 @@ AUTH_METHODS = {
 }
 
 
+class _LazySession:
+    """
+    最初に run_sync() されたときにだけ開く非同期セッション（資格情報のないリクエストは接続を使わない）
+    
+    照合のクエリはイベントループの外で実行する（async_database.py を参照）。
+    """
+    
+    def __init__(self):
+        self._session = None
+    
+    async def run_sync(self, fn, *args):
+        if self._session is None:
+            self._session = open_async_session()
+        return await self._session.run_sync(fn, *args)
+    
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
 class AuthenticationMiddleware(BaseHTTPMiddleware):
     """
     認証ミドルウェア
@@ -129,8 +150,8 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
         return False
     
     async def _authenticate_request(self, request: Request) -> Dict[str, Any]:
-        """リクエストの認証を実行"""
-        db = SessionLocal()
+        """リクエストの認証を実行（セッションは資格情報の照合が必要になった時点で開く）"""
+        db = _LazySession()
         
         try:
             # JWT認証を試行
@@ -152,9 +173,9 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
             }
             
         finally:
-            db.close()
+            await db.close()
     
-    async def _try_jwt_auth(self, request: Request, db: Session) -> Dict[str, Any]:
+    async def _try_jwt_auth(self, request: Request, db: '_LazySession') -> Dict[str, Any]:
         """JWT認証を試行"""
         auth_header = request.headers.get("Authorization")
         
@@ -185,10 +206,10 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
                     "www_authenticate": "Bearer"
                 }
             
-            user = db.query(User).filter(
+            user = await db.run_sync(lambda session: session.query(User).filter(
                 User.id == int(user_id),
                 User.is_active == True
-            ).first()
+            ).first())
             
             if not user:
                 return {
@@ -212,7 +233,7 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
                 "www_authenticate": "Bearer"
             }
     
-    async def _try_api_key_auth(self, request: Request, db: Session) -> Dict[str, Any]:
+    async def _try_api_key_auth(self, request: Request, db: '_LazySession') -> Dict[str, Any]:
         """APIキー認証を試行"""
         api_key = request.headers.get("X-API-Key")
         
@@ -220,7 +241,7 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
             return {"authenticated": False}
         
         try:
-            result = AuthService.verify_api_key(db, api_key)
+            result = await db.run_sync(AuthService.verify_api_key, api_key)
             
             if not result:
                 return {
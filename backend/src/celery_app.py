@@ -5,18 +5,29 @@ Celery configuration and task definitions for asynchronous processing
 import os
 import logging
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 from celery.utils.log import get_task_logger
 from redis import Redis
-import json
-from datetime import datetime, timedelta
-from pathlib import Path
+import time
+from datetime import datetime
 
 # Import your modules
-from .article_pipeline import ArticlePipeline
-from .topic_collector import TopicCollector
+from .topic_collector import CollectedTopic
 from .crypto_article_generator_mvp import (
     ArticleType, ArticleDepth, GeneratedArticle
 )
+from .event_stream import (
+    TASK_EVENTS_CHANNEL, TOPIC_EVENTS_CHANNEL, encode_event, publish_event, topic_event
+)
+from .quota_service import get_quota_service
+from .worker_context import get_worker_context
+from .article_repository import get_article_repository
+from .database import SessionLocal
+from .analytics_export import get_analytics_exporter
+from .task_tracker import (
+    record_task, get_task_writer, TASK_TYPE_ARTICLE_GENERATION, TASK_TYPE_TOPIC_COLLECTION,
+    TASK_TYPE_FACT_CHECK
+)
 
 # Configure logging
 logger = get_task_logger(__name__)
@@ -36,7 +47,8 @@ app.config_from_object({
     'task_time_limit': 1800,  # 30 minutes
     'task_soft_time_limit': 1500,  # 25 minutes
     'worker_prefetch_multiplier': 1,
-    'worker_max_tasks_per_child': 50,
+    # ワーカーはパイプラインをプロセス内で使い回すため、再生成の頻度は環境変数で調整
+    'worker_max_tasks_per_child': int(os.getenv('CELERY_MAX_TASKS_PER_CHILD', 500)),
     'task_acks_late': True,
     'task_reject_on_worker_lost': True,
 })
@@ -44,180 +56,221 @@ app.config_from_object({
 # Redis client for status tracking
 redis_client = Redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
 
+TASK_STATUS_TTL = 3600  # 1時間でキー削除
+
+# タスク開始時刻で並べたインデックス（sorted set: member=task_id, score=開始UNIX時刻）
+TASK_INDEX_KEY = "task:index"
+
+
+def _update_task_status(task_id: str, task_type: str, data: dict, parameters: dict = None):
+    """
+    タスクステータスを保存し、SSE購読者へ同時に配信する
+    
+    ステータスキーの更新・インデックス登録・pub/sub の発行を1往復のパイプラインで行い、
+    ライフサイクルはバッファ経由でGenerationTaskへ永続化する。
+    """
+    payload = encode_event(data)
+    event = encode_event({'type': 'task', 'task_id': task_id, **data})
+    started_at = None
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.setex(f"task:{task_id}:status", TASK_STATUS_TTL, payload)
+        pipe.zadd(TASK_INDEX_KEY, {task_id: time.time()}, nx=True)
+        pipe.zscore(TASK_INDEX_KEY, task_id)
+        pipe.publish(TASK_EVENTS_CHANNEL, event)
+        results = pipe.execute()
+        if results[2] is not None:
+            started_at = datetime.fromtimestamp(results[2])
+    except Exception as e:
+        logger.warning(f"Failed to update task status for {task_id}: {e}")
+    
+    record_task(task_id, task_type, data, started_at=started_at, parameters=parameters)
+
+def _publish_topics(topics):
+    """新規トピックをSSE購読者へ配信"""
+    publish_event(redis_client, TOPIC_EVENTS_CHANNEL, topic_event(topics))
+
+def _get_context():
+    """ワーカーコンテキストを取得（トピック通知を登録済みの状態で返す）"""
+    context = get_worker_context()
+    context.add_topic_listener(_publish_topics)
+    return context
+
+def _resolve_enum(enum_cls, value, default):
+    """値または名前からEnumを解決（該当しない場合は既定値）"""
+    if not value:
+        return default
+    try:
+        return enum_cls(value.lower())
+    except ValueError:
+        return enum_cls.__members__.get(value.upper(), default)
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """ワーカープロセス起動時にパイプライン・クライアント類を初期化"""
+    _get_context().warm_up()
+
+@worker_process_shutdown.connect
+def flush_task_history(**kwargs):
+    """ワーカープロセス終了時にバッファ中のタスク履歴を書き込む"""
+    get_task_writer().close()
+
 @app.task(bind=True, name='generate_article_async')
 def generate_article_async(self, topic_id: str, article_type: str = 'analysis', 
-                          depth: str = 'comprehensive', publish: bool = False):
+                          depth: str = 'comprehensive', publish: bool = False,
+                          topic_data: dict = None):
     """
     非同期で記事を生成するタスク
+    
+    topic_data（CollectedTopic.to_dict()）が渡された場合はそれを使い、
+    なければワーカーのトピックストアから topic_id で検索する。
     """
+    setup_start = time.perf_counter()
+    quota = get_quota_service()
+    quota_token = None
     try:
         # タスク開始を記録
         task_id = self.request.id
-        redis_client.setex(
-            f"task:{task_id}:status",
-            3600,  # 1時間でキー削除
-            json.dumps({
-                'status': 'started',
-                'topic_id': topic_id,
-                'started_at': datetime.now().isoformat(),
-                'progress': 0
-            })
-        )
+        _update_task_status(task_id, TASK_TYPE_ARTICLE_GENERATION, {
+            'status': 'started',
+            'topic_id': topic_id,
+            'started_at': datetime.now().isoformat(),
+            'progress': 0
+        }, parameters={
+            'topic_id': topic_id,
+            'article_type': article_type,
+            'depth': depth,
+            'publish': publish
+        })
         
         logger.info(f"Starting article generation for topic {topic_id}")
         
-        # ArticlePipelineを初期化
-        pipeline = ArticlePipeline()
+        # 生成枠を予約（全ワーカー共通のクォータ）
+        quota_result = quota.acquire()
+        if not quota_result.available:
+            raise RuntimeError("Article generation quota backend is unavailable")
+        if not quota_result.allowed:
+            raise RuntimeError(
+                f"Article generation quota exceeded "
+                f"(hourly {quota_result.hourly_count}, daily {quota_result.daily_count})"
+            )
+        quota_token = quota_result.token
+        
+        # ワーカー共有のパイプラインを取得（worker_process_init で初期化済み）
+        context = _get_context()
+        pipeline = context.pipeline
         
         # 進行状況を更新
-        self.update_state(state='PROGRESS', meta={'progress': 10, 'status': 'Initializing pipeline'})
-        redis_client.setex(
-            f"task:{task_id}:status",
-            3600,
-            json.dumps({
-                'status': 'progress',
-                'topic_id': topic_id,
-                'progress': 10,
-                'message': 'Initializing pipeline'
-            })
-        )
+        self.update_state(state='PROGRESS', meta={'progress': 10, 'status': 'Resolving topic'})
+        _update_task_status(task_id, TASK_TYPE_ARTICLE_GENERATION, {
+            'status': 'progress',
+            'topic_id': topic_id,
+            'progress': 10,
+            'message': 'Resolving topic'
+        })
         
         # トピックを取得
-        collector = TopicCollector()
-        topics = collector.get_collected_topics(limit=100)
-        topic = next((t for t in topics if str(t.id) == topic_id), None)
+        if topic_data:
+            topic = CollectedTopic.from_dict(topic_data)
+        else:
+            topic = next((t for t in context.topic_manager.topics if str(hash(t.title)) == topic_id), None)
+            if topic:
+                context.topic_manager.current_score(topic)
         
         if not topic:
             raise ValueError(f"Topic {topic_id} not found")
         
+        # 記事トピックに変換（指定があれば記事タイプ・深度を上書き）
+        article_topic = pipeline._convert_to_article_topic(topic)
+        article_topic.article_type = _resolve_enum(ArticleType, article_type, article_topic.article_type)
+        article_topic.depth = _resolve_enum(ArticleDepth, depth, article_topic.depth)
+        
+        # 生成開始までのタスク固定コスト
+        setup_ms = round((time.perf_counter() - setup_start) * 1000, 1)
+        logger.info(f"Article task setup took {setup_ms}ms")
+        
         # 進行状況を更新
         self.update_state(state='PROGRESS', meta={'progress': 30, 'status': 'Generating article'})
-        redis_client.setex(
-            f"task:{task_id}:status",
-            3600,
-            json.dumps({
-                'status': 'progress',
-                'topic_id': topic_id,
-                'progress': 30,
-                'message': 'Generating article'
-            })
-        )
+        _update_task_status(task_id, TASK_TYPE_ARTICLE_GENERATION, {
+            'status': 'progress',
+            'topic_id': topic_id,
+            'progress': 30,
+            'message': 'Generating article'
+        })
         
         # 記事を生成
-        article_type_enum = ArticleType[article_type.upper()]
-        depth_enum = ArticleDepth[depth.upper()]
-        
-        article = pipeline.generator.generate_article(
-            topic=topic,
-            article_type=article_type_enum,
-            depth=depth_enum
-        )
+        article = context.generator.generate_article(article_topic)
         
         # 進行状況を更新
         self.update_state(state='PROGRESS', meta={'progress': 70, 'status': 'Saving article'})
-        redis_client.setex(
-            f"task:{task_id}:status",
-            3600,
-            json.dumps({
-                'status': 'progress',
-                'topic_id': topic_id,
-                'progress': 70,
-                'message': 'Saving article'
-            })
-        )
+        _update_task_status(task_id, TASK_TYPE_ARTICLE_GENERATION, {
+            'status': 'progress',
+            'topic_id': topic_id,
+            'progress': 70,
+            'message': 'Saving article'
+        })
         
         # 記事を保存
-        output_dir = Path("./output/articles")
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{topic_id}"
-        
-        # HTML保存
-        with open(output_dir / f"{filename}.html", 'w', encoding='utf-8') as f:
-            f.write(article.html_content)
-        
-        # メタデータ保存
-        metadata = {
-            "generated_at": article.generated_at.isoformat(),
-            "topic": {
-                "id": topic_id,
-                "title": topic.title,
-                "score": topic.score,
-                "source": topic.source.value if topic.source else None,
-                "source_url": topic.source_url
-            },
-            "article": {
-                "type": article_type,
-                "depth": depth,
-                "word_count": article.word_count,
-                "coins": article.coins,
-                "keywords": article.keywords
-            },
-            "task_id": task_id
-        }
-        
-        with open(output_dir / f"{filename}_meta.json", 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        repository = get_article_repository()
+        article_id = repository.save_article(article, topic, {'topic_id': topic_id, 'task_id': task_id})
         
         # WordPressへの投稿（必要な場合）
         if publish:
             self.update_state(state='PROGRESS', meta={'progress': 90, 'status': 'Publishing to WordPress'})
-            redis_client.setex(
-                f"task:{task_id}:status",
-                3600,
-                json.dumps({
-                    'status': 'progress',
-                    'topic_id': topic_id,
-                    'progress': 90,
-                    'message': 'Publishing to WordPress'
-                })
-            )
+            _update_task_status(task_id, TASK_TYPE_ARTICLE_GENERATION, {
+                'status': 'progress',
+                'topic_id': topic_id,
+                'progress': 90,
+                'message': 'Publishing to WordPress'
+            })
             
+            db = SessionLocal()
             try:
-                post_id = pipeline.publisher.publish_article(article, status='draft')
-                metadata['wordpress_post_id'] = post_id
-                
-                # メタデータを更新
-                with open(output_dir / f"{filename}_meta.json", 'w', encoding='utf-8') as f:
-                    json.dump(metadata, f, ensure_ascii=False, indent=2)
+                if context.publisher is None:
+                    raise RuntimeError("WordPress publisher is not configured")
+                saved = repository.get(db, article_id)
+                post_id = context.publisher.publish_content(
+                    repository.get_html(saved), repository.publish_metadata(saved)
+                )
+                if post_id:
+                    repository.mark_published(db, saved, post_id)
             except Exception as e:
                 logger.warning(f"Failed to publish to WordPress: {e}")
+            finally:
+                db.close()
         
         # 完了を記録
-        redis_client.setex(
-            f"task:{task_id}:status",
-            3600,
-            json.dumps({
-                'status': 'completed',
-                'topic_id': topic_id,
-                'progress': 100,
-                'article_id': filename,
-                'completed_at': datetime.now().isoformat()
-            })
-        )
+        _update_task_status(task_id, TASK_TYPE_ARTICLE_GENERATION, {
+            'status': 'completed',
+            'topic_id': topic_id,
+            'progress': 100,
+            'article_id': article_id,
+            'setup_ms': setup_ms,
+            'completed_at': datetime.now().isoformat()
+        })
         
         return {
             'success': True,
-            'article_id': filename,
+            'article_id': article_id,
             'word_count': article.word_count,
+            'setup_ms': setup_ms,
             'task_id': task_id
         }
         
     except Exception as e:
         logger.error(f"Error generating article: {e}")
         
+        # 生成できなかった枠を返却
+        if quota_token:
+            quota.release(quota_token)
+        
         # エラーを記録
-        redis_client.setex(
-            f"task:{self.request.id}:status",
-            3600,
-            json.dumps({
-                'status': 'failed',
-                'topic_id': topic_id,
-                'error': str(e),
-                'failed_at': datetime.now().isoformat()
-            })
-        )
+        _update_task_status(self.request.id, TASK_TYPE_ARTICLE_GENERATION, {
+            'status': 'failed',
+            'topic_id': topic_id,
+            'error': str(e),
+            'failed_at': datetime.now().isoformat()
+        })
         
         raise
 
@@ -230,38 +283,42 @@ def collect_topics_async(self):
         task_id = self.request.id
         
         # タスク開始を記録
-        redis_client.setex(
-            f"task:{task_id}:status",
-            3600,
-            json.dumps({
-                'status': 'started',
-                'started_at': datetime.now().isoformat(),
-                'progress': 0
-            })
-        )
+        _update_task_status(task_id, TASK_TYPE_TOPIC_COLLECTION, {
+            'status': 'started',
+            'started_at': datetime.now().isoformat(),
+            'progress': 0
+        })
         
         logger.info("Starting topic collection")
         
-        # TopicCollectorを初期化
-        collector = TopicCollector()
+        # ワーカー共有のトピックストアを取得（新規トピックはSSE購読者へ配信）
+        context = _get_context()
+        collector = context.topic_manager
         
         # 進行状況を更新
         self.update_state(state='PROGRESS', meta={'progress': 50, 'status': 'Collecting topics'})
+        _update_task_status(task_id, TASK_TYPE_TOPIC_COLLECTION, {
+            'status': 'progress',
+            'progress': 50,
+            'message': 'Collecting topics'
+        })
         
         # トピックを収集
-        collected_count = collector.collect_all()
+        collected_count = 0
+        for source_collector in [context.pipeline.rss_collector, context.pipeline.price_collector]:
+            try:
+                added = collector.add_topics(source_collector.collect())
+                collected_count += len(added)
+            except Exception as e:
+                logger.warning(f"Error collecting from {source_collector.__class__.__name__}: {e}")
         
         # 完了を記録
-        redis_client.setex(
-            f"task:{task_id}:status",
-            3600,
-            json.dumps({
-                'status': 'completed',
-                'progress': 100,
-                'collected_count': collected_count,
-                'completed_at': datetime.now().isoformat()
-            })
-        )
+        _update_task_status(task_id, TASK_TYPE_TOPIC_COLLECTION, {
+            'status': 'completed',
+            'progress': 100,
+            'collected_count': collected_count,
+            'completed_at': datetime.now().isoformat()
+        })
         
         return {
             'success': True,
@@ -273,42 +330,156 @@ def collect_topics_async(self):
         logger.error(f"Error collecting topics: {e}")
         
         # エラーを記録
-        redis_client.setex(
-            f"task:{self.request.id}:status",
-            3600,
-            json.dumps({
-                'status': 'failed',
-                'error': str(e),
-                'failed_at': datetime.now().isoformat()
-            })
-        )
+        _update_task_status(self.request.id, TASK_TYPE_TOPIC_COLLECTION, {
+            'status': 'failed',
+            'error': str(e),
+            'failed_at': datetime.now().isoformat()
+        })
         
         raise
 
+@app.task(bind=True, name='fact_check_bulk_async')
+def fact_check_bulk_async(self, article_ids: list = None, since: str = None,
+                          status: str = None, limit: int = None):
+    """
+    複数記事のファクトチェックをバックグラウンドで実行するタスク
+    """
+    from .fact_check_pipeline import BulkFactChecker, select_article_ids
+
+    task_id = self.request.id
+    parameters = {'article_ids': article_ids, 'since': since, 'status': status, 'limit': limit}
+
+    try:
+        _update_task_status(task_id, TASK_TYPE_FACT_CHECK, {
+            'status': 'started',
+            'started_at': datetime.now().isoformat(),
+            'progress': 0
+        }, parameters=parameters)
+
+        db = SessionLocal()
+        try:
+            ids = select_article_ids(
+                db,
+                article_ids=article_ids,
+                since=datetime.fromisoformat(since) if since else None,
+                status=status,
+                limit=limit
+            )
+        finally:
+            db.close()
+
+        logger.info(f"Starting bulk fact check for {len(ids)} articles")
+
+        checked = 0
+        summary = {}
+        failed_articles = []
+        for event in BulkFactChecker().run(ids):
+            if event['type'] == 'summary':
+                summary = event
+                continue
+            checked += 1
+            if event['type'] == 'error':
+                failed_articles.append(event['articleId'])
+            # 進行状況は10件ごとに更新
+            if checked % 10 == 0:
+                progress = int(checked / len(ids) * 100)
+                self.update_state(state='PROGRESS', meta={'progress': progress, 'status': 'Checking articles'})
+                _update_task_status(task_id, TASK_TYPE_FACT_CHECK, {
+                    'status': 'progress',
+                    'progress': progress,
+                    'message': f'Checked {checked}/{len(ids)} articles'
+                })
+
+        _update_task_status(task_id, TASK_TYPE_FACT_CHECK, {
+            'status': 'completed',
+            'progress': 100,
+            'checked_count': summary.get('succeeded', 0),
+            'failed_count': summary.get('failed', 0),
+            'failed_articles': failed_articles,
+            'completed_at': datetime.now().isoformat()
+        })
+
+        return {
+            'success': True,
+            'task_id': task_id,
+            **summary
+        }
+
+    except Exception as e:
+        logger.error(f"Error running bulk fact check: {e}")
+
+        _update_task_status(task_id, TASK_TYPE_FACT_CHECK, {
+            'status': 'failed',
+            'error': str(e),
+            'failed_at': datetime.now().isoformat()
+        })
+
+        raise
+
 @app.task(name='cleanup_old_tasks')
 def cleanup_old_tasks():
     """
     古いタスクステータスをクリーンアップ
+    
+    ステータスキー自体はTTLで失効するため、インデックスから期限切れの範囲だけを取り除く。
     """
     try:
-        # 1時間以上前のタスクステータスを削除
-        pattern = "task:*:status"
-        for key in redis_client.scan_iter(match=pattern):
-            data = redis_client.get(key)
-            if data:
-                status = json.loads(data)
-                if 'started_at' in status:
-                    started_at = datetime.fromisoformat(status['started_at'])
-                    if datetime.now() - started_at > timedelta(hours=1):
-                        redis_client.delete(key)
-                        logger.info(f"Cleaned up old task status: {key}")
-        
-        return {'success': True, 'message': 'Cleanup completed'}
+        # 1時間以上前に開始したタスクを削除
+        cutoff = time.time() - TASK_STATUS_TTL
+        expired = redis_client.zrangebyscore(TASK_INDEX_KEY, '-inf', cutoff)
+        
+        if expired:
+            pipe = redis_client.pipeline(transaction=False)
+            for member in expired:
+                task_id = member.decode() if isinstance(member, bytes) else member
+                pipe.delete(f"task:{task_id}:status")
+            pipe.zremrangebyscore(TASK_INDEX_KEY, '-inf', cutoff)
+            pipe.execute()
+            logger.info(f"Cleaned up {len(expired)} old task statuses")
+        
+        return {'success': True, 'message': 'Cleanup completed', 'removed': len(expired)}
         
     except Exception as e:
         logger.error(f"Error during cleanup: {e}")
         return {'success': False, 'error': str(e)}
 
+@app.task(name='export_analytics')
+def export_analytics(datasets=None):
+    """
+    分析用アーカイブの差分を書き出す
+    
+    前回のウォーターマークから後の行だけを日付パーティションのファイルに追記する。
+    """
+    try:
+        results = get_analytics_exporter().export(datasets)
+        exported = sum(result['rows'] for result in results)
+        return {'success': True, 'exported': exported, 'datasets': results}
+        
+    except Exception as e:
+        logger.error(f"Error during analytics export: {e}")
+        return {'success': False, 'error': str(e)}
+
+@app.task(name='collect_article_blobs')
+def collect_article_blobs():
+    """
+    どの記事からも参照されていないHTMLブロブを消す
+    
+    記事の削除時には消さず、最後の保存から ARTICLE_BLOB_GC_GRACE 秒を過ぎたものだけをここで消す。
+    """
+    try:
+        removed = get_article_repository().collect_blob_garbage()
+        return {'success': True, 'removed': removed}
+        
+    except Exception as e:
+        logger.error(f"Error collecting article blobs: {e}")
+        return {'success': False, 'error': str(e)}
+
+# 参照されていないHTMLブロブを消す間隔（秒、0 なら定期実行しない）
+ARTICLE_BLOB_GC_INTERVAL = float(os.getenv('ARTICLE_BLOB_GC_INTERVAL', 3600))
+
+# 分析用アーカイブの書き出し間隔（秒、0 なら定期実行しない）
+ANALYTICS_EXPORT_INTERVAL = float(os.getenv('ANALYTICS_EXPORT_INTERVAL', 0))
+
 # Celeryのビートスケジュール設定
 app.conf.beat_schedule = {
     'cleanup-old-tasks': {
@@ -317,5 +488,17 @@ app.conf.beat_schedule = {
     },
 }
 
+if ARTICLE_BLOB_GC_INTERVAL > 0:
+    app.conf.beat_schedule['collect-article-blobs'] = {
+        'task': 'collect_article_blobs',
+        'schedule': ARTICLE_BLOB_GC_INTERVAL,
+    }
+
+if ANALYTICS_EXPORT_INTERVAL > 0:
+    app.conf.beat_schedule['export-analytics'] = {
+        'task': 'export_analytics',
+        'schedule': ANALYTICS_EXPORT_INTERVAL,
+    }
+
 if __name__ == '__main__':
     app.start()
\ No newline at end of file
@@ -9,6 +9,8 @@ import logging
 from typing import Optional, Dict, List, Any
 from datetime import datetime, timezone
 
+from .price_oracle import get_price_oracle
+
 logger = logging.getLogger(__name__)
 
 COINGECKO_API_URL = "https://api.coingecko.com/api/v3"
@@ -54,6 +56,9 @@ class CoinGeckoClient:
             
             data = response.json()
             logger.info(f"Successfully fetched {len(data)} coins from CoinGecko")
+            
+            # 取得した価格を共有価格キャッシュへ登録
+            get_price_oracle().prime_from_markets(data, vs_currency)
             return data
             
         except requests.exceptions.RequestException as e:
@@ -5,12 +5,38 @@ Content importance scorer for cryptocurrency articles
 """
 
 import re
+import time
 import logging
-from typing import Dict, List, Any, Tuple
-from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+
+from .keyword_matcher import KeywordMatcher
+
+try:
+    import numpy as np
+except ImportError:  # numpy未導入の環境ではスカラー計算のみ
+    np = None
 
 logger = logging.getLogger(__name__)
 
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch_microseconds(published_time) -> Optional[int]:
+    """公開時刻をUNIXエポックからのマイクロ秒に変換（タイムゾーンなしはローカル時刻、解析不能は None）"""
+    if not published_time:
+        return None
+    try:
+        if isinstance(published_time, str):
+            pub_time = datetime.fromisoformat(published_time.replace('Z', '+00:00'))
+        else:
+            pub_time = published_time
+        return (pub_time.astimezone(timezone.utc).replace(tzinfo=None) - _EPOCH) // _MICROSECOND
+    except Exception:
+        return None
+
+
 class ContentScorer:
     """記事内容の重要度を分析してスコアリング"""
     
@@ -69,6 +95,11 @@ class ContentScorer:
             }
         }
         
+        # 全カテゴリのキーワードを1回の走査で判定するマッチャー
+        self.keyword_matcher = KeywordMatcher(
+            {category: rules["keywords"] for category, rules in self.scoring_rules.items()}
+        )
+        
         # 価格変動に基づく重要度
         self.price_impact_rules = {
             "massive": {"threshold": 15.0, "bonus": 20},    # 15%以上の変動
@@ -88,17 +119,15 @@ class ContentScorer:
             "DOGE": 1.0,  # 人気はあるが市場への影響は中程度
         }
         
-        # 時間による重要度減衰
+        # 時間による重要度減衰（連続的な指数減衰）
         self.time_decay = {
-            "1h": 1.0,    # 1時間以内: フル重要度
-            "6h": 0.9,    # 6時間以内: 90%
-            "24h": 0.8,   # 24時間以内: 80%
-            "48h": 0.6,   # 48時間以内: 60%
-            "week": 0.4   # 1週間以内: 40%
+            "half_life_hours": 48.0,  # 48時間で重要度が半分
+            "min_multiplier": 0.2,    # 古い記事でも20%は残す
         }
     
     def score_content(self, title: str, summary: str, coins: List[str] = None, 
-                     price_change: float = None, published_time: str = None) -> Dict[str, Any]:
+                     price_change: float = None, published_time: str = None,
+                     now: Optional[datetime] = None) -> Dict[str, Any]:
         """
         記事内容をスコアリングして重要度を判定
         
@@ -108,6 +137,7 @@ class ContentScorer:
             coins: 関連する暗号通貨リスト
             price_change: 価格変動率
             published_time: 公開時刻
+            now: 時間減衰の基準時刻（省略時は現在時刻）
             
         Returns:
             スコア情報辞書
@@ -123,7 +153,7 @@ class ContentScorer:
             coin_multiplier = self._calculate_coin_importance(coins)
             
             # 時間減衰補正
-            time_multiplier = self._calculate_time_decay(published_time)
+            time_multiplier = self._calculate_time_decay(published_time, now)
             
             # 最終スコア計算
             raw_score = (content_score + price_bonus) * coin_multiplier * time_multiplier
@@ -167,15 +197,11 @@ class ContentScorer:
         max_score = 0
         matched_category = "low"
         
-        # 各カテゴリのキーワードをチェック
+        # 各カテゴリの一致キーワード数をまとめて取得
+        keyword_matches = self.keyword_matcher.counts(text)
+        
         for category, rules in self.scoring_rules.items():
-            category_score = rules["base_score"]
-            keyword_matches = 0
-            
-            for keyword in rules["keywords"]:
-                if keyword in text:
-                    keyword_matches += 1
-                    category_score += rules["weight"]
+            category_score = rules["base_score"] + rules["weight"] * keyword_matches[category]
             
             # このカテゴリのスコアが最高の場合
             if category_score > max_score:
@@ -216,7 +242,7 @@ class ContentScorer:
         logger.debug(f"Coin importance multiplier: {max_importance} for {coins}")
         return max_importance
     
-    def _calculate_time_decay(self, published_time: str = None) -> float:
+    def _calculate_time_decay(self, published_time: str = None, now: Optional[datetime] = None) -> float:
         """時間による重要度減衰計算"""
         if not published_time:
             return 1.0
@@ -228,22 +254,14 @@ class ContentScorer:
             else:
                 pub_time = published_time
             
-            now = datetime.now(pub_time.tzinfo)
+            if now is None:
+                now = datetime.now(pub_time.tzinfo)
+            elif pub_time.tzinfo is None and now.tzinfo is not None:
+                now = now.astimezone().replace(tzinfo=None)
+            elif pub_time.tzinfo is not None and now.tzinfo is None:
+                now = now.astimezone(pub_time.tzinfo)
             time_diff = now - pub_time
-            
-            # 時間差に基づく減衰率
-            if time_diff <= timedelta(hours=1):
-                multiplier = self.time_decay["1h"]
-            elif time_diff <= timedelta(hours=6):
-                multiplier = self.time_decay["6h"]
-            elif time_diff <= timedelta(hours=24):
-                multiplier = self.time_decay["24h"]
-            elif time_diff <= timedelta(hours=48):
-                multiplier = self.time_decay["48h"]
-            elif time_diff <= timedelta(days=7):
-                multiplier = self.time_decay["week"]
-            else:
-                multiplier = 0.2  # 1週間以上古い記事は大幅減衰
+            multiplier = self._decay_multiplier(time_diff // _MICROSECOND)
             
             logger.debug(f"Time decay: {multiplier} for {time_diff}")
             return multiplier
@@ -252,6 +270,13 @@ class ContentScorer:
             logger.error(f"Error calculating time decay: {e}")
             return 1.0
     
+    def _decay_multiplier(self, age_microseconds: int) -> float:
+        """経過時間（マイクロ秒）に対する減衰率"""
+        age_hours = max(0, age_microseconds) / 3_600_000_000
+        multiplier = 0.5 ** (age_hours / self.time_decay["half_life_hours"])
+        # 小数4桁に量子化（score_columns と同じ値にするため）
+        return max(self.time_decay["min_multiplier"], round(multiplier * 10000) / 10000)
+    
     def _determine_priority(self, score: float) -> str:
         """スコアから優先度を決定"""
         if score >= 85:
@@ -263,40 +288,217 @@ class ContentScorer:
         else:
             return "low"
     
-    def batch_score_topics(self, topics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """複数のトピックを一括スコアリング"""
-        scored_topics = []
+    def batch_score_topics(self, topics: List[Dict[str, Any]],
+                           now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        複数のトピックを一括スコアリング
         
-        for topic in topics:
-            try:
-                # スコアリング実行
-                score_result = self.score_content(
-                    title=topic.get('title', ''),
-                    summary=topic.get('summary', ''),
-                    coins=topic.get('coins', []),
-                    price_change=topic.get('primaryData', {}).get('change24h'),
-                    published_time=topic.get('collectedAt')
-                )
-                
-                # 結果をトピックに統合
-                topic['score'] = score_result['score']
-                topic['priority'] = score_result['priority']
-                topic['scoring_breakdown'] = score_result['breakdown']
-                topic['scoring_factors'] = score_result['factors']
-                
-                scored_topics.append(topic)
-                
-            except Exception as e:
-                logger.error(f"Error scoring topic {topic.get('id', 'unknown')}: {e}")
-                # エラーの場合はデフォルト値を設定
-                topic['score'] = 50
-                topic['priority'] = 'medium'
-                scored_topics.append(topic)
+        numpyが利用できる場合はトピックを列データに変換して score_columns() で一括計算し、
+        結果は1件ずつの score_content() と同一になる。
+        """
+        if np is not None and topics:
+            scored_topics = self._batch_score_columnar(topics, now)
+        else:
+            scored_topics = [self._score_topic(topic, now) for topic in topics]
         
         # スコア順にソート
         scored_topics.sort(key=lambda x: x.get('score', 0), reverse=True)
         
         return scored_topics
+    
+    def _score_topic(self, topic: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+        """1件のトピックをスコアリングして結果を統合"""
+        try:
+            # スコアリング実行
+            score_result = self.score_content(
+                title=topic.get('title', ''),
+                summary=topic.get('summary', ''),
+                coins=topic.get('coins', []),
+                price_change=topic.get('primaryData', {}).get('change24h'),
+                published_time=topic.get('collectedAt'),
+                now=now
+            )
+            
+            # 結果をトピックに統合
+            topic['score'] = score_result['score']
+            topic['priority'] = score_result['priority']
+            topic['scoring_breakdown'] = score_result['breakdown']
+            topic['scoring_factors'] = score_result['factors']
+            
+        except Exception as e:
+            logger.error(f"Error scoring topic {topic.get('id', 'unknown')}: {e}")
+            # エラーの場合はデフォルト値を設定
+            topic['score'] = 50
+            topic['priority'] = 'medium'
+        
+        return topic
+    
+    def topic_columns(self, topics: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[int]]:
+        """
+        トピックを score_columns() の入力列に変換
+        
+        列に変換できないトピック（型が想定外など）の位置は2番目の戻り値で返し、
+        スカラー計算で処理する。
+        """
+        categories = list(self.scoring_rules)
+        counts, price_changes, coin_multipliers, timestamps, major_coins, rows = [], [], [], [], [], []
+        fallback = []
+        
+        for index, topic in enumerate(topics):
+            try:
+                title = topic.get('title', '')
+                summary = topic.get('summary', '')
+                coins = topic.get('coins', [])
+                price_change = topic.get('primaryData', {}).get('change24h')
+                if price_change is not None and not isinstance(price_change, (int, float)):
+                    raise TypeError("price change is not numeric")
+                
+                category_counts = self.keyword_matcher.counts((title + " " + summary).lower())
+                counts.append([category_counts[category] for category in categories])
+                price_changes.append(float('nan') if price_change is None else float(price_change))
+                coin_multipliers.append(self._coin_multiplier(coins))
+                timestamp = to_epoch_microseconds(topic.get('collectedAt'))
+                timestamps.append(float('nan') if timestamp is None else float(timestamp))
+                major_coins.append(bool(coins and any(coin in ["BTC", "ETH"] for coin in coins)))
+                rows.append(index)
+            except Exception:
+                fallback.append(index)
+        
+        columns = {
+            'keyword_counts': np.array(counts, dtype=np.int64).reshape(len(rows), len(categories)),
+            'price_changes': np.array(price_changes, dtype=np.float64),
+            'coin_multipliers': np.array(coin_multipliers, dtype=np.float64),
+            'timestamps': np.array(timestamps, dtype=np.float64),
+            'major_coins': np.array(major_coins, dtype=bool),
+            'rows': rows,
+        }
+        return columns, fallback
+    
+    def _coin_multiplier(self, coins: List[str] = None) -> float:
+        """_calculate_coin_importance と同じ値（ログ出力なし）"""
+        if not coins:
+            return 1.0
+        return max([1.0] + [self.coin_importance.get(coin, 1.0) for coin in coins])
+    
+    def score_columns(self, keyword_counts, price_changes, coin_multipliers, timestamps,
+                      now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        列データをまとめてスコアリング（numpyによる一括計算）
+        
+        Args:
+            keyword_counts: カテゴリ別の一致キーワード数 (件数 × scoring_rules のカテゴリ数)
+            price_changes: 価格変動率（不明は NaN）
+            coin_multipliers: 通貨重要度補正
+            timestamps: 公開時刻（UNIXエポックからのマイクロ秒、不明は NaN）
+            now: 時間減衰の基準時刻（省略時は現在時刻）
+            
+        Returns:
+            score_content() の各項目に対応する配列の辞書（score は丸め前）
+        """
+        if np is None:
+            raise RuntimeError("numpy is required for columnar scoring")
+        
+        counts = np.asarray(keyword_counts, dtype=np.int64)
+        price_changes = np.asarray(price_changes, dtype=np.float64)
+        coin_multipliers = np.asarray(coin_multipliers, dtype=np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        
+        # コンテンツスコア: カテゴリごとの base + weight × 一致数 の最大値（0-100）
+        rules = list(self.scoring_rules.values())
+        base = np.array([r["base_score"] for r in rules], dtype=np.int64)
+        weight = np.array([r["weight"] for r in rules], dtype=np.int64)
+        category_scores = base + weight * counts
+        content_score = np.minimum(100, np.maximum(0, category_scores.max(axis=1, initial=0)))
+        
+        # 価格変動ボーナス: 定義順で最初に閾値を超えたルール、20%以上は1.5倍
+        abs_change = np.abs(price_changes)
+        price_bonus = np.select(
+            [abs_change >= r["threshold"] for r in self.price_impact_rules.values()],
+            [float(r["bonus"]) for r in self.price_impact_rules.values()],
+            default=0.0
+        )
+        extreme = (price_bonus > 0) & (abs_change >= 20)
+        price_bonus = np.where(extreme, price_bonus * 1.5, price_bonus)
+        
+        # 時間減衰（経過時間はマイクロ秒、_decay_multiplier と同じく小数4桁に量子化）
+        now_us = float(to_epoch_microseconds(now or datetime.now(timezone.utc)))
+        age_hours = np.maximum(0.0, now_us - timestamps) / 3_600_000_000
+        time_multiplier = np.rint(np.exp2(-age_hours / self.time_decay["half_life_hours"]) * 10000) / 10000
+        time_multiplier = np.maximum(self.time_decay["min_multiplier"], time_multiplier)
+        time_multiplier = np.where(np.isnan(timestamps), 1.0, time_multiplier)
+        
+        raw_score = (content_score + price_bonus) * coin_multipliers * time_multiplier
+        score = np.minimum(100, np.maximum(0, raw_score))
+        priority = np.select(
+            [score >= 85, score >= 70, score >= 50], ["urgent", "high", "medium"], default="low"
+        )
+        
+        return {
+            'content_score': content_score,
+            'price_bonus': price_bonus,
+            'extreme_price_change': extreme,
+            'coin_multiplier': coin_multipliers,
+            'time_multiplier': time_multiplier,
+            'raw_score': raw_score,
+            'score': score,
+            'priority': priority,
+            'urgent_signals': content_score >= 90,
+            'price_impact': abs_change >= 5.0,
+            'recent': time_multiplier >= 0.8,
+        }
+    
+    def _batch_score_columnar(self, topics: List[Dict[str, Any]],
+                              now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        # 全トピックで同じ基準時刻を使う
+        now = now or datetime.now(timezone.utc)
+        columns, fallback = self.topic_columns(topics)
+        result = self.score_columns(
+            columns['keyword_counts'], columns['price_changes'],
+            columns['coin_multipliers'], columns['timestamps'], now=now
+        )
+        
+        content_score = result['content_score'].tolist()
+        price_bonus = result['price_bonus'].tolist()
+        extreme = result['extreme_price_change'].tolist()
+        coin_multiplier = result['coin_multiplier'].tolist()
+        time_multiplier = result['time_multiplier'].tolist()
+        raw_score = result['raw_score'].tolist()
+        score = result['score'].tolist()
+        priority = result['priority'].tolist()
+        urgent_signals = result['urgent_signals'].tolist()
+        price_impact = result['price_impact'].tolist()
+        recent = result['recent'].tolist()
+        major_coins = columns['major_coins'].tolist()
+        
+        for i, index in enumerate(columns['rows']):
+            topic = topics[index]
+            # スカラー計算の min(100, max(0, raw)) は境界で整数を返す
+            if raw_score[i] >= 100:
+                topic['score'] = 100
+            elif raw_score[i] <= 0:
+                topic['score'] = 0
+            else:
+                topic['score'] = round(score[i], 1)
+            topic['priority'] = priority[i]
+            topic['scoring_breakdown'] = {
+                "content_score": content_score[i],
+                # ボーナスは1.5倍した場合のみ小数（スカラー計算と同じ型）
+                "price_bonus": price_bonus[i] if extreme[i] else int(price_bonus[i]),
+                "coin_multiplier": coin_multiplier[i],
+                "time_multiplier": time_multiplier[i],
+                "raw_score": raw_score[i]
+            }
+            topic['scoring_factors'] = {
+                "urgent_signals": urgent_signals[i],
+                "price_impact": price_impact[i],
+                "major_coins": major_coins[i],
+                "recent": recent[i]
+            }
+        
+        for index in fallback:
+            self._score_topic(topics[index], now)
+        
+        return list(topics)
 
 # グローバルスコアラーインスタンス
 _scorer = None
@@ -114,13 +114,10 @@ class GeneratedArticle:
 class ArticleTemplates:
     """記事テンプレート管理"""
     
-    @staticmethod
-    def get_prompt_template(article_type: ArticleType, depth: ArticleDepth) -> str:
-        """記事タイプと深度に応じたプロンプトテンプレートを返す"""
-        
-        templates = {
-            ArticleType.BREAKING_NEWS: {
-                ArticleDepth.SHALLOW: """
+    # 記事タイプ・深度別のプロンプトテンプレート（クラス定義時に一度だけ構築）
+    TEMPLATES = {
+        ArticleType.BREAKING_NEWS: {
+            ArticleDepth.SHALLOW: """
 暗号通貨{coin_name}（{coin_symbol}）に関する最新ニュース記事を書いてください。
 
 トピック: {title}
@@ -136,7 +133,7 @@ class ArticleTemplates:
 
 キーワード: {keywords}
 """,
-                ArticleDepth.MEDIUM: """
+            ArticleDepth.MEDIUM: """
 暗号通貨{coin_name}（{coin_symbol}）に関するニュース記事を書いてください。
 
 トピック: {title}
@@ -154,9 +151,9 @@ class ArticleTemplates:
 
 キーワード: {keywords}
 """
-            },
-            ArticleType.PRICE_ANALYSIS: {
-                ArticleDepth.SHALLOW: """
+        },
+        ArticleType.PRICE_ANALYSIS: {
+            ArticleDepth.SHALLOW: """
 {coin_name}（{coin_symbol}）の価格分析記事を書いてください。
 
 トピック: {title}
@@ -172,7 +169,7 @@ class ArticleTemplates:
 
 キーワード: {keywords}
 """,
-                ArticleDepth.DEEP: """
+            ArticleDepth.DEEP: """
 {coin_name}（{coin_symbol}）の詳細な価格分析記事を書いてください。
 
 トピック: {title}
@@ -192,9 +189,9 @@ class ArticleTemplates:
 
 キーワード: {keywords}
 """
-            },
-            ArticleType.EDUCATIONAL: {
-                ArticleDepth.MEDIUM: """
+        },
+        ArticleType.EDUCATIONAL: {
+            ArticleDepth.MEDIUM: """
 {coin_name}（{coin_symbol}）に関する教育的な記事を書いてください。
 
 トピック: {title}
@@ -212,11 +209,11 @@ class ArticleTemplates:
 
 キーワード: {keywords}
 """
-            }
         }
-        
-        # デフォルトテンプレート
-        default_template = """
+    }
+    
+    # デフォルトテンプレート
+    DEFAULT_TEMPLATE = """
 {coin_name}（{coin_symbol}）に関する記事を書いてください。
 
 トピック: {title}
@@ -225,14 +222,17 @@ class ArticleTemplates:
 
 読者に価値のある情報を提供する記事を作成してください。
 """
-        
-        return templates.get(article_type, {}).get(depth, default_template)
+    
+    @staticmethod
+    def get_prompt_template(article_type: ArticleType, depth: ArticleDepth) -> str:
+        """記事タイプと深度に応じたプロンプトテンプレートを返す"""
+        return ArticleTemplates.TEMPLATES.get(article_type, {}).get(depth, ArticleTemplates.DEFAULT_TEMPLATE)
 
 
 class LLMClient:
     """LLM API クライアント（OpenAI/Claude/Gemini対応・2025年版）"""
     
-    def __init__(self, ai_config: Optional[AIConfig] = None):
+    def __init__(self, ai_config: Optional[AIConfig] = None, session: Optional[requests.Session] = None):
         self.ai_config = ai_config or AIConfig(
             provider=AIProvider.OPENAI,
             model=AIModel.GPT_4O,
@@ -240,6 +240,9 @@ class LLMClient:
             max_tokens=2000
         )
         
+        # HTTPコネクションプール（記事生成ごとの接続確立を避けるため使い回す）
+        self.session = session or requests.Session()
+        
         # APIキーを環境変数から取得
         self.api_keys = {
             AIProvider.OPENAI: os.getenv("OPENAI_API_KEY"),
@@ -282,7 +285,7 @@ class LLMClient:
             "presence_penalty": self.ai_config.presence_penalty
         }
         
-        response = requests.post(
+        response = self.session.post(
             "https://api.openai.com/v1/chat/completions",
             headers=headers,
             json=data,
@@ -315,7 +318,7 @@ class LLMClient:
             ]
         }
         
-        response = requests.post(
+        response = self.session.post(
             "https://api.anthropic.com/v1/messages",
             headers=headers,
             json=data,
@@ -350,7 +353,7 @@ class LLMClient:
         
         url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.ai_config.model.value}:generateContent?key={api_key}"
         
-        response = requests.post(url, headers=headers, json=data, timeout=60)
+        response = self.session.post(url, headers=headers, json=data, timeout=60)
         
         if response.status_code == 200:
             result = response.json()
@@ -456,7 +459,7 @@ class CryptoArticleGenerator:
         
         # 設定が変更されている場合はLLMクライアントを更新
         if topic.ai_config and topic.ai_config != self.ai_config:
-            llm_client = LLMClient(topic.ai_config)
+            llm_client = LLMClient(topic.ai_config, session=self.llm_client.session)
         else:
             llm_client = self.llm_client
         
@@ -4,10 +4,12 @@
 """
 
 import os
+import threading
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, Boolean, JSON, ForeignKey
+from sqlalchemy import create_engine, event, Column, Integer, BigInteger, String, Text, Float, DateTime, Boolean, JSON, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -18,8 +20,142 @@ DATABASE_URL = os.getenv(
     'sqlite:///crypto_articles.db'
 )
 
+# 接続プールの設定（PostgreSQL などのサーバー型データベース）
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # 秒（サーバー側で切られる前に張り直す）
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+DB_ECHO = os.getenv('DB_ECHO', 'false').lower() == 'true'
+
+# SQLite の設定（WAL で読み込みと書き込みを並行させ、ロック中は待ってから失敗させる）
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+
+class PoolMetrics:
+    """接続プールのイベント数（接続・貸し出し・返却・破棄）と同時貸し出し数の最大値"""
+    
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self._lock = threading.Lock()
+    
+    def attach(self, engine: Engine) -> None:
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+    
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+    
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+    
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+            self.checked_out = max(0, self.checked_out - 1)
+    
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+    
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'checkedOut': self.checked_out,
+                'peakCheckedOut': self.peak_checked_out,
+            }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+    finally:
+        cursor.close()
+
+
+def engine_options(database_url) -> dict:
+    """
+    方言に合わせた create_engine の設定
+    
+    - SQLite: スレッド間で接続を共有できるようにし、ファイルの場合はプールの大きさを設定
+    - PostgreSQL など: プールの大きさ・超過数・待ち時間・再接続間隔と pre-ping
+    """
+    database_url = make_url(database_url)
+    options = {'echo': DB_ECHO}
+    if database_url.get_backend_name() == 'sqlite':
+        options['connect_args'] = {'check_same_thread': False}
+        if not is_memory_database(database_url):
+            options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    else:
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING
+        )
+    return options
+
+
+def is_memory_database(database_url) -> bool:
+    database_url = make_url(database_url)
+    return database_url.get_backend_name() == 'sqlite' and database_url.database in (None, '', ':memory:')
+
+
+def instrument_engine(target: Engine) -> Engine:
+    """SQLite の接続ごとの PRAGMA（WAL・synchronous・busy_timeout）とプールのイベント数を設定"""
+    if target.dialect.name == 'sqlite':
+        event.listen(target, 'connect', _set_sqlite_pragmas)
+    target.pool_metrics = PoolMetrics()
+    target.pool_metrics.attach(target)
+    return target
+
+
+def create_database_engine(url: str = DATABASE_URL, **overrides) -> Engine:
+    """方言に合わせて設定したエンジンを作成（overrides は create_engine にそのまま渡し、設定より優先）"""
+    options = engine_options(url)
+    options.update(overrides)
+    return instrument_engine(create_engine(make_url(url), **options))
+
+
+def pool_status(target: Optional[Engine] = None) -> dict:
+    """接続プールの現在の状態とイベント数"""
+    target = target or engine
+    pool = target.pool
+    status = {'pool': type(pool).__name__, 'dialect': target.dialect.name}
+    # QueuePool のみが大きさ・貸し出し数を持つ
+    for key, attribute in (('size', 'size'), ('checkedIn', 'checkedin'), ('overflow', 'overflow')):
+        method = getattr(pool, attribute, None)
+        if callable(method):
+            status[key] = method()
+    metrics = getattr(target, 'pool_metrics', None)
+    if metrics:
+        status.update(metrics.snapshot())
+    return status
+
+
 # SQLAlchemyエンジンとセッション
-engine = create_engine(DATABASE_URL, echo=False)
+engine = create_database_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -61,6 +197,13 @@ class Topic(Base):
     # リレーション
     articles = relationship("Article", back_populates="topic")
     
+    __table_args__ = (
+        # 未処理トピックのスコア順（get_unprocessed_topics）
+        Index('ix_topics_processed_score', 'processed', 'score'),
+        # スコア順（get_topics_by_score）
+        Index('ix_topics_score', 'score'),
+    )
+    
     def __repr__(self):
         return f"<Topic(id={self.id}, title='{self.title}', score={self.score})>"
 
@@ -76,6 +219,7 @@ class Article(Base):
     title = Column(String(500), nullable=False, index=True)
     content = Column(Text)
     html_content = Column(Text)
+    html_blob_hash = Column(String(64), index=True)  # ブロブ保存領域のHTML（SHA-256）
     summary = Column(Text)
     
     # 分類
@@ -104,6 +248,13 @@ class Article(Base):
     topic = relationship("Topic", back_populates="articles")
     fact_check_results = relationship("FactCheckResult", back_populates="article")
     
+    __table_args__ = (
+        # 記事一覧（新しい順、ステータス・種別での絞り込み）
+        Index('ix_articles_generated_at', 'generated_at'),
+        Index('ix_articles_status_generated', 'status', 'generated_at'),
+        Index('ix_articles_type_generated', 'type', 'generated_at'),
+    )
+    
     def __repr__(self):
         return f"<Article(id={self.id}, title='{self.title}', type='{self.type}')>"
 
@@ -134,6 +285,11 @@ class FactCheckResult(Base):
     # リレーション
     article = relationship("Article", back_populates="fact_check_results")
     
+    __table_args__ = (
+        # 記事ごとの最新結果（チェッカーバージョン別）
+        Index('ix_fact_check_results_article_version', 'article_id', 'checker_version'),
+    )
+    
     def __repr__(self):
         return f"<FactCheckResult(id={self.id}, article_id={self.article_id}, score={self.reliability_score})>"
 
@@ -167,6 +323,11 @@ class GenerationTask(Base):
     started_at = Column(DateTime)
     completed_at = Column(DateTime)
     
+    __table_args__ = (
+        # タスク種別ごとの期間集計用
+        Index('ix_generation_tasks_type_created', 'task_type', 'created_at'),
+    )
+    
     def __repr__(self):
         return f"<GenerationTask(id={self.id}, task_id='{self.task_id}', status='{self.status}')>"
 
@@ -178,7 +339,7 @@ class SystemMetrics(Base):
     id = Column(Integer, primary_key=True, index=True)
     
     # メトリクス名と値
-    metric_name = Column(String(100), nullable=False, index=True)
+    metric_name = Column(String(100), nullable=False)
     metric_value = Column(Float, nullable=False)
     metric_unit = Column(String(50))  # count, percent, seconds, etc.
     
@@ -189,10 +350,26 @@ class SystemMetrics(Base):
     # タイムスタンプ
     recorded_at = Column(DateTime, default=datetime.utcnow, index=True)
     
+    __table_args__ = (
+        # メトリクスごとの時系列（metric_name だけの検索もこの索引で引ける）
+        Index('ix_system_metrics_name_recorded', 'metric_name', 'recorded_at'),
+    )
+    
     def __repr__(self):
         return f"<SystemMetrics(metric_name='{self.metric_name}', value={self.metric_value})>"
 
 
+class SystemCounter(Base):
+    """システム統計のカウンター（トリガーで増減、system_counters.py を参照）"""
+    __tablename__ = "system_counters"
+    
+    name = Column(String(100), primary_key=True)  # topics_total, articles_status:draft など
+    value = Column(BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<SystemCounter(name='{self.name}', value={self.value})>"
+
+
 class ArticleTemplate(Base):
     """記事テンプレートテーブル"""
     __tablename__ = "article_templates"
@@ -235,12 +412,65 @@ class ArticleTemplate(Base):
         return f"<ArticleTemplate(id={self.id}, name='{self.name}', category='{self.category}')>"
 
 
+class QuotaEvent(Base):
+    """生成クォータの消費記録テーブル（スライディングウィンドウ集計用）"""
+    __tablename__ = "quota_events"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    quota_key = Column(String(100), nullable=False)  # articles など
+    token = Column(String(64), unique=True, nullable=False)  # 予約トークン（返却時に使用）
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_quota_events_key_created', 'quota_key', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f"<QuotaEvent(quota_key='{self.quota_key}', created_at='{self.created_at}')>"
+
+
+class PublishRecord(Base):
+    """WordPress投稿台帳（記事本文のハッシュごとに1件、重複投稿の防止と一括投稿の再開用）"""
+    __tablename__ = "publish_records"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    site = Column(String(255), nullable=False)  # 投稿先WordPressのURL
+    content_hash = Column(String(64), nullable=False)  # タイトルと本文のSHA-256
+    status = Column(String(20), nullable=False, default='pending')  # pending, published, failed
+    post_id = Column(Integer)  # WordPressの投稿ID
+    
+    title = Column(String(500))
+    article_path = Column(Text)
+    batch_id = Column(String(64))  # 一括投稿の識別子
+    attempts = Column(Integer, default=0, nullable=False)
+    error = Column(Text)
+    record_metadata = Column(JSON)  # 記事のメタデータ
+    
+    # タイムスタンプ
+    claimed_at = Column(DateTime)  # 投稿処理を開始した時刻（中断した処理の検出用）
+    published_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('site', 'content_hash', name='uq_publish_records_site_hash'),
+        Index('ix_publish_records_batch_status', 'batch_id', 'status'),
+    )
+    
+    def __repr__(self):
+        return f"<PublishRecord(content_hash='{self.content_hash[:12]}', status='{self.status}', post_id={self.post_id})>"
+
+
 # データベース初期化関数
 def create_tables():
     """テーブルを作成"""
     # 認証関連テーブルも含めて作成
     from .auth_models import User, APIKey, RefreshToken, LoginSession
+    from .search_index import install_search_index
+    from .system_counters import install_system_counters
     Base.metadata.create_all(bind=engine)
+    install_search_index(engine)
+    install_system_counters(engine)
 
 
 def drop_tables():
@@ -283,25 +513,16 @@ class DatabaseUtils:
         return db.query(Topic).filter(Topic.processed == False).order_by(Topic.score.desc()).limit(limit).all()
     
     @staticmethod
-    def search_articles(db, query: str, limit: int = 20) -> List[Article]:
-        """記事をタイトルと内容で検索"""
-        search_pattern = f"%{query}%"
-        return db.query(Article).filter(
-            (Article.title.ilike(search_pattern)) |
-            (Article.content.ilike(search_pattern))
-        ).limit(limit).all()
+    def search_articles(db, query: str, limit: int = 20, offset: int = 0) -> List[Article]:
+        """記事をタイトルと内容で検索（全文検索索引を使い、関連度順）"""
+        from .search_index import search_articles
+        return search_articles(db, query, limit=limit, offset=offset)
     
     @staticmethod
     def get_system_stats(db) -> dict:
-        """システム統計を取得"""
-        stats = {
-            'total_topics': db.query(Topic).count(),
-            'total_articles': db.query(Article).count(),
-            'published_articles': db.query(Article).filter(Article.status == 'published').count(),
-            'draft_articles': db.query(Article).filter(Article.status == 'draft').count(),
-            'unprocessed_topics': db.query(Topic).filter(Topic.processed == False).count(),
-        }
-        return stats
+        """システム統計を取得（トリガーで保守しているカウンターを1回のクエリで読む）"""
+        from .system_counters import read_system_stats
+        return read_system_stats(db)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+リアルタイムイベント配信
+Celeryタスクの進捗と新規トピックをServer-Sent Events (SSE) でプッシュ配信する
+"""
+
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Redis pub/sub チャンネル
+TASK_EVENTS_CHANNEL = "events:tasks"
+TOPIC_EVENTS_CHANNEL = "events:topics"
+ALL_CHANNELS = (TASK_EVENTS_CHANNEL, TOPIC_EVENTS_CHANNEL)
+
+# SSEクライアント向けのチャンネル名
+CHANNEL_ALIASES = {
+    "tasks": TASK_EVENTS_CHANNEL,
+    "topics": TOPIC_EVENTS_CHANNEL,
+}
+
+# タスクの終了ステータス
+TERMINAL_TASK_STATUSES = {"completed", "failed"}
+
+# キープアライブ間隔（秒）
+HEARTBEAT_INTERVAL = 15.0
+
+
+def encode_event(event: Dict[str, Any]) -> str:
+    """イベントをpub/sub用のJSON文字列に変換"""
+    return json.dumps(event, ensure_ascii=False, default=str)
+
+
+def publish_event(redis_client, channel: str, event: Dict[str, Any]) -> None:
+    """同期Redisクライアントでイベントを発行（Celeryワーカー用）"""
+    if redis_client is None:
+        return
+    try:
+        redis_client.publish(channel, encode_event(event))
+    except Exception as e:
+        logger.warning(f"Failed to publish event to {channel}: {e}")
+
+
+def topic_event(topics: Iterable[Any]) -> Dict[str, Any]:
+    """新規トピックの通知イベントを作成"""
+    summaries = []
+    for topic in topics:
+        summaries.append({
+            "id": str(hash(topic.title)),
+            "title": topic.title,
+            "priority": topic.priority.name.lower(),
+            "score": topic.score,
+            "coins": topic.coins,
+            "source": topic.source.value if topic.source else None,
+            "sourceUrl": topic.source_url,
+            "collectedAt": topic.collected_at.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+    return {"type": "topics", "count": len(summaries), "topics": summaries}
+
+
+def format_sse(event: Dict[str, Any], event_name: Optional[str] = None) -> str:
+    """SSEフレーム形式に整形"""
+    name = event_name or event.get("type", "message")
+    return f"event: {name}\ndata: {encode_event(event)}\n\n"
+
+
+class EventBroadcaster:
+    """
+    プロセス内のSSE購読者へイベントをファンアウトするブロードキャスター
+
+    Redisが利用可能な場合は pub/sub を購読してワーカーからのイベントを中継し、
+    利用できない場合はプロセス内イベントのみを配信する。
+    """
+
+    def __init__(self, redis_url: Optional[str] = None, queue_size: int = 100):
+        self.redis_url = redis_url
+        self.queue_size = queue_size
+        self._subscribers: Set[Tuple[asyncio.Queue, frozenset]] = set()
+        self._redis = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def redis_enabled(self) -> bool:
+        return self._redis is not None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def start(self) -> None:
+        """Redis pub/sub の購読を開始"""
+        self._loop = asyncio.get_running_loop()
+        if not self.redis_url:
+            return
+
+        try:
+            from redis import asyncio as redis_asyncio
+            self._redis = redis_asyncio.from_url(self.redis_url)
+            await self._redis.ping()
+        except Exception as e:
+            logger.warning(f"Event broadcaster running without Redis: {e}")
+            self._redis = None
+            return
+
+        self._listener_task = asyncio.create_task(self._listen())
+        logger.info("Event broadcaster subscribed to Redis channels")
+
+    async def stop(self) -> None:
+        """購読を停止"""
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def _listen(self) -> None:
+        """Redisからのメッセージを購読者へ中継"""
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(*ALL_CHANNELS)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                channel = message["channel"]
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                try:
+                    event = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    logger.warning(f"Ignoring malformed event on {channel}")
+                    continue
+                self._fan_out(channel, event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Event listener stopped: {e}")
+        finally:
+            await pubsub.close()
+
+    def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        """
+        イベントを発行（スレッドセーフ）
+
+        Redis有効時はRedis経由で全APIプロセスへ、無効時はこのプロセスの購読者へ配信する。
+        """
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._publish_on_loop, channel, event)
+
+    def _publish_on_loop(self, channel: str, event: Dict[str, Any]) -> None:
+        if self._redis is not None:
+            asyncio.ensure_future(self._publish_to_redis(channel, event))
+        else:
+            self._fan_out(channel, event)
+
+    async def _publish_to_redis(self, channel: str, event: Dict[str, Any]) -> None:
+        try:
+            await self._redis.publish(channel, encode_event(event))
+        except Exception as e:
+            logger.warning(f"Redis publish failed, delivering locally: {e}")
+            self._fan_out(channel, event)
+
+    def _fan_out(self, channel: str, event: Dict[str, Any]) -> None:
+        """購読者キューへ配信（溢れた場合は最古のイベントを破棄）"""
+        for queue, channels in list(self._subscribers):
+            if channel not in channels:
+                continue
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait((channel, event))
+
+    @asynccontextmanager
+    async def subscribe(self, channels: Iterable[str] = ALL_CHANNELS) -> AsyncIterator[asyncio.Queue]:
+        """指定チャンネルの購読キューを取得"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        entry = (queue, frozenset(channels))
+        self._subscribers.add(entry)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(entry)
+
+
+def resolve_channels(channels: Optional[str]) -> List[str]:
+    """クエリパラメータ（例: "tasks,topics"）をチャンネル名に変換"""
+    if not channels:
+        return list(ALL_CHANNELS)
+    resolved = []
+    for name in channels.split(","):
+        channel = CHANNEL_ALIASES.get(name.strip().lower())
+        if channel and channel not in resolved:
+            resolved.append(channel)
+    return resolved or list(ALL_CHANNELS)
+
+
+async def sse_stream(
+    broadcaster: EventBroadcaster,
+    channels: List[str],
+    task_id: Optional[str] = None,
+    initial_events: Optional[List[Dict[str, Any]]] = None,
+    is_disconnected=None,
+) -> AsyncIterator[str]:
+    """
+    SSEレスポンス用のジェネレーター
+
+    task_id 指定時はそのタスクのイベントのみを流し、終了ステータスで切断する。
+    """
+    async with broadcaster.subscribe(channels) as queue:
+        for event in initial_events or []:
+            yield format_sse(event, "task")
+            if task_id and event.get("status") in TERMINAL_TASK_STATUSES:
+                return
+
+        while True:
+            if is_disconnected is not None and await is_disconnected():
+                return
+            try:
+                channel, event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            if channel == TASK_EVENTS_CHANNEL:
+                if task_id and event.get("task_id") != task_id:
+                    continue
+                yield format_sse(event, "task")
+                if task_id and event.get("status") in TERMINAL_TASK_STATUSES:
+                    return
+            else:
+                yield format_sse(event)
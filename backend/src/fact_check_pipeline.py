@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+一括ファクトチェックパイプライン
+複数記事の事実抽出をプロセスプールで並列化し、価格検証をチャンク単位で
+まとめて行い、FactCheckResult を一括で書き込む。
+結果は段落ごとに本文ハッシュ付きで保存し、再チェック時は変更された段落だけを検証する
+"""
+
+import os
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import func
+
+from .database import SessionLocal, Article, FactCheckResult
+from .fact_checker import (
+    FactChecker, FactExtractor, FactCheckItem, split_paragraphs, paragraph_hash, result_items
+)
+
+logger = logging.getLogger(__name__)
+
+# 1.1.0: 段落単位で抽出・検証し、結果に段落ごとのハッシュを保存
+# （項目は段落ごとにだけ保存し、記事全体の一覧は result_items() で展開する。以前の結果も読める）
+CHECKER_VERSION = "1.1.0"
+
+
+def build_fact_check_record(article_id: int, check_result: Dict,
+                            checked_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """check_article / check_paragraphs の結果を FactCheckResult のカラム値に変換"""
+    items = result_items(check_result)
+    total_facts = len(items)
+    verified_facts = sum(1 for item in items if item.get('verified') is True)
+    failed_facts = sum(1 for item in items if item.get('verified') is False)
+
+    return {
+        'article_id': article_id,
+        # check_article のスコアは 0-100
+        'reliability_score': int(round(check_result.get('reliability_score', 0))),
+        'total_facts': total_facts,
+        'verified_facts': verified_facts,
+        'failed_facts': failed_facts,
+        'skipped_facts': total_facts - verified_facts - failed_facts,
+        'results': check_result,
+        'checker_version': CHECKER_VERSION,
+        'checked_at': checked_at or datetime.utcnow()
+    }
+
+
+def summarize_record(record: Dict[str, Any], include_items: bool = True) -> Dict[str, Any]:
+    """FactCheckResult のカラム値をAPIレスポンス形式に変換"""
+    items = result_items(record['results'])
+    summary = {
+        "articleId": record['article_id'],
+        "totalFacts": record['total_facts'],
+        "verified": record['verified_facts'],
+        "failed": record['failed_facts'],
+        "reliabilityScore": record['reliability_score'],
+    }
+    if 'checked_paragraphs' in record['results']:
+        summary["checkedParagraphs"] = record['results']['checked_paragraphs']
+        summary["reusedParagraphs"] = record['results']['reused_paragraphs']
+    if include_items:
+        summary["items"] = items
+    else:
+        summary["failedItems"] = [item for item in items if item.get('verified') is False]
+    return summary
+
+
+# プロセスプール内で使う抽出器（ワーカープロセスごとに1つ）
+_process_extractor: Optional[FactExtractor] = None
+
+
+def _extract_facts(content: str) -> List[FactCheckItem]:
+    """プロセスプールから呼び出す抽出処理"""
+    global _process_extractor
+    if _process_extractor is None:
+        _process_extractor = FactExtractor()
+    return _process_extractor.extract_facts(content)
+
+
+def load_previous_results(db, article_ids: List[int]) -> Dict[int, Dict]:
+    """記事ごとの最新のファクトチェック結果（同じチェッカーバージョンのもの）を取得"""
+    if not article_ids:
+        return {}
+    latest_ids = (
+        db.query(func.max(FactCheckResult.id))
+        .filter(
+            FactCheckResult.article_id.in_(article_ids),
+            FactCheckResult.checker_version == CHECKER_VERSION
+        )
+        .group_by(FactCheckResult.article_id)
+    )
+    rows = (
+        db.query(FactCheckResult.article_id, FactCheckResult.results)
+        .filter(FactCheckResult.id.in_(latest_ids.scalar_subquery()))
+        .all()
+    )
+    return {article_id: results for article_id, results in rows if results}
+
+
+def select_article_ids(db, article_ids: Optional[List[int]] = None,
+                       since: Optional[datetime] = None, status: Optional[str] = None,
+                       limit: Optional[int] = None) -> List[int]:
+    """対象記事のIDを取得（ID指定、または生成日時・ステータスで絞り込み）"""
+    query = db.query(Article.id)
+    if article_ids:
+        query = query.filter(Article.id.in_(article_ids))
+    if since:
+        query = query.filter(Article.generated_at >= since)
+    if status:
+        query = query.filter(Article.status == status)
+    query = query.order_by(Article.id)
+    if limit:
+        query = query.limit(limit)
+    return [article_id for (article_id,) in query.all()]
+
+
+class BulkFactChecker:
+    """
+    複数記事のファクトチェック
+
+    記事はチャンク単位で処理する:
+    1. 本文と前回の結果をまとめて読み込み、変更された段落だけをプロセスプールで並列に抽出
+       （同じ本文の段落は記事をまたいで1回だけ抽出）
+    2. チャンク内の価格検証に必要なコインを1回の一括取得でキャッシュ
+    3. 検証結果を FactCheckResult へ一括挿入し、記事ごとの結果を順に返す
+    """
+
+    def __init__(self, checker: Optional[FactChecker] = None, session_factory=None,
+                 chunk_size: int = 50, max_workers: Optional[int] = None,
+                 min_parallel: int = 64, incremental: bool = True):
+        self.checker = checker or FactChecker()
+        self.session_factory = session_factory or SessionLocal
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers or int(os.getenv('FACT_CHECK_WORKERS', os.cpu_count() or 1))
+        self.min_parallel = min_parallel
+        self.incremental = incremental
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _can_use_pool(self) -> bool:
+        # Celeryのpreforkワーカーなどデーモンプロセスは子プロセスを持てない
+        return self.max_workers > 1 and not multiprocessing.current_process().daemon
+
+    def _extract(self, texts: List[str]) -> List[List[FactCheckItem]]:
+        """段落ごとの事実抽出（件数が多い場合はプロセスプールで並列実行）"""
+        if len(texts) < self.min_parallel or not self._can_use_pool():
+            return [self.checker.extractor.extract_facts(text) for text in texts]
+        if self._executor is None:
+            # APIサーバーはスレッドを持つため fork ではなく spawn で起動
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        chunksize = max(1, len(texts) // (self.max_workers * 4))
+        return list(self._executor.map(_extract_facts, texts, chunksize=chunksize))
+
+    def _check_chunk(self, db, ids: List[int], contents: Dict[int, str]) -> List[Dict[str, Any]]:
+        previous = load_previous_results(db, ids) if self.incremental else {}
+
+        # 前回から変更された段落を記事をまたいで集める
+        pending: Dict[str, str] = {}
+        for article_id in ids:
+            cached = FactChecker.paragraph_cache(previous.get(article_id))
+            for _, text in split_paragraphs(contents[article_id]):
+                digest = paragraph_hash(text)
+                if digest not in cached:
+                    pending.setdefault(digest, text)
+
+        extracted = dict(zip(pending.keys(), self._extract(list(pending.values()))))
+
+        # チャンク内の価格をまとめて取得
+        coin_ids = set()
+        for facts in extracted.values():
+            coin_ids |= self.checker.collect_coin_ids(facts)
+        if coin_ids:
+            self.checker.price_verifier.oracle.prefetch(coin_ids)
+
+        checked_at = datetime.utcnow()
+        records = []
+        for article_id in ids:
+            check_result = self.checker.check_paragraphs(
+                contents[article_id], previous.get(article_id), extracted
+            )
+            records.append(build_fact_check_record(article_id, check_result, checked_at))
+        return records
+
+    def run(self, article_ids: List[int]) -> Iterator[Dict[str, Any]]:
+        """
+        記事ごとの結果を処理順に返すジェネレーター
+
+        各要素は {'type': 'result' | 'error', ...}、最後に {'type': 'summary', ...} を返す。
+        """
+        start = time.perf_counter()
+        succeeded = 0
+        failed = 0
+        db = self.session_factory()
+
+        try:
+            for offset in range(0, len(article_ids), self.chunk_size):
+                chunk = article_ids[offset:offset + self.chunk_size]
+
+                pending = chunk
+                try:
+                    rows = db.query(Article.id, Article.content).filter(Article.id.in_(chunk)).all()
+                    contents = {article_id: content or '' for article_id, content in rows}
+
+                    for article_id in chunk:
+                        if article_id not in contents:
+                            failed += 1
+                            yield {'type': 'error', 'articleId': article_id, 'error': 'Article not found'}
+
+                    pending = [article_id for article_id in chunk if article_id in contents]
+                    records = self._check_chunk(db, pending, contents)
+
+                    db.bulk_insert_mappings(FactCheckResult, records)
+                    db.commit()
+
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Bulk fact check failed for chunk starting at {chunk[0]}: {e}")
+                    failed += len(pending)
+                    for article_id in pending:
+                        yield {'type': 'error', 'articleId': article_id, 'error': str(e)}
+                    continue
+
+                for record in records:
+                    succeeded += 1
+                    yield {'type': 'result', **summarize_record(record, include_items=False)}
+
+        finally:
+            db.close()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+        yield {
+            'type': 'summary',
+            'total': len(article_ids),
+            'succeeded': succeeded,
+            'failed': failed,
+            'elapsedMs': round((time.perf_counter() - start) * 1000, 1)
+        }
@@ -7,13 +7,15 @@
 import os
 import re
 import json
-import requests
+import hashlib
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import logging
 from dotenv import load_dotenv
 
+from .price_oracle import PriceOracle, get_price_oracle
+
 load_dotenv()
 
 # ログ設定
@@ -38,111 +40,156 @@ class FactCheckItem:
 
 
 class FactExtractor:
-    """記事から事実確認が必要な項目を抽出"""
+    """
+    記事から事実確認が必要な項目を抽出
     
-    def __init__(self):
-        # パターン定義
-        self.patterns = {
-            'price': {
-                'pattern': r'\$[\d,]+\.?\d*|[\d,]+\.?\d*\s*ドル|[\d,]+\.?\d*\s*円',
-                'type': 'price'
-            },
-            'percentage': {
-                'pattern': r'[\d\.]+\s*%|[\d\.]+\s*パーセント',
-                'type': 'percentage'
-            },
-            'date': {
-                'pattern': r'\d{4}年\d{1,2}月\d{1,2}日|\d{1,2}月\d{1,2}日|\d{4}/\d{1,2}/\d{1,2}',
-                'type': 'date'
-            },
-            'time_period': {
-                'pattern': r'\d+\s*(?:時間|日|週間|ヶ月|年)(?:前|後|以内|以上)',
-                'type': 'time_period'
-            },
-            'market_cap': {
-                'pattern': r'時価総額.*?[\d,]+\.?\d*\s*(?:億|兆|million|billion)',
-                'type': 'market_cap'
-            },
-            'ranking': {
-                'pattern': r'第?\d+位|トップ\d+|ランキング\d+位',
-                'type': 'ranking'
-            }
+    全パターンと暗号通貨名をクラス定義時に1つの正規表現（名前付きグループの先読み選択）へ
+    まとめてコンパイルし、記事を1回走査するだけで全種類の候補を検出する。
+    コンテキストの切り出しは重複除去後の項目に対してのみ行う。
+    """
+    
+    # パターン定義
+    patterns = {
+        'price': {
+            'pattern': r'\$[\d,]+\.?\d*|[\d,]+\.?\d*\s*ドル|[\d,]+\.?\d*\s*円',
+            'type': 'price'
+        },
+        'percentage': {
+            'pattern': r'[\d\.]+\s*%|[\d\.]+\s*パーセント',
+            'type': 'percentage'
+        },
+        'date': {
+            'pattern': r'\d{4}年\d{1,2}月\d{1,2}日|\d{1,2}月\d{1,2}日|\d{4}/\d{1,2}/\d{1,2}',
+            'type': 'date'
+        },
+        'time_period': {
+            'pattern': r'\d+\s*(?:時間|日|週間|ヶ月|年)(?:前|後|以内|以上)',
+            'type': 'time_period'
+        },
+        'market_cap': {
+            'pattern': r'時価総額.*?[\d,]+\.?\d*\s*(?:億|兆|million|billion)',
+            'type': 'market_cap'
+        },
+        'ranking': {
+            'pattern': r'第?\d+位|トップ\d+|ランキング\d+位',
+            'type': 'ranking'
         }
+    }
+    
+    # 暗号通貨名のリスト
+    crypto_names = {
+        'ビットコイン', 'イーサリアム', 'リップル', 'カルダノ', 'ソラナ',
+        'ポルカドット', 'チェーンリンク', 'ポリゴン', 'アバランチ',
+        'Bitcoin', 'Ethereum', 'Ripple', 'Cardano', 'Solana',
+        'Polkadot', 'Chainlink', 'Polygon', 'Avalanche'
+    }
+    
+    # 暗号通貨名を事実項目とみなす文脈キーワード
+    price_keywords = ['価格', '値', 'price', '取引', 'trading']
+    
+    # 各パターンの先頭になり得る文字（走査位置の事前絞り込み用、パターン変更時は要更新）
+    PATTERN_START_CHARS = r'\d\$,\.時第トラ'
+    
+    PATTERN_CONTEXT_CHARS = 50   # パターン項目のコンテキスト幅（前後）
+    NAME_CONTEXT_CHARS = 100     # 暗号通貨名のコンテキスト幅（前後）
+    
+    _combined_regex = None
+    _keyword_regex = None
+    _group_types: Dict[str, str] = {}
+    _type_order: Dict[str, int] = {}
+    
+    def __init__(self):
+        self._compile()
+    
+    @classmethod
+    def _compile(cls):
+        """全パターンを1つの正規表現にコンパイル（初回のみ）"""
+        if cls._combined_regex is not None:
+            return
         
-        # 暗号通貨名のリスト
-        self.crypto_names = {
-            'ビットコイン', 'イーサリアム', 'リップル', 'カルダノ', 'ソラナ',
-            'ポルカドット', 'チェーンリンク', 'ポリゴン', 'アバランチ',
-            'Bitcoin', 'Ethereum', 'Ripple', 'Cardano', 'Solana',
-            'Polkadot', 'Chainlink', 'Polygon', 'Avalanche'
-        }
+        alternatives = []
+        group_types = {}
+        for index, (pattern_name, pattern_info) in enumerate(cls.patterns.items()):
+            group = f"g{index}"
+            group_types[group] = pattern_info['type']
+            # 先読みにすることで、種類の異なる一致が重なっていても全て検出できる
+            alternatives.append(f"(?=(?P<{group}>{pattern_info['pattern']}))")
+        
+        names = sorted(cls.crypto_names, key=len, reverse=True)
+        name_group = "g_name"
+        group_types[name_group] = 'crypto_name'
+        alternatives.append(
+            rf"(?=(?P<{name_group}>\b(?:{'|'.join(re.escape(n) for n in names)})\b))"
+        )
+        
+        cls._group_types = group_types
+        cls._type_order = {fact_type: i for i, fact_type in enumerate(group_types.values())}
+        # 先頭文字で候補位置を絞り込んでから各先読みを試す
+        start_chars = cls.PATTERN_START_CHARS + ''.join(sorted({re.escape(n[0]) for n in names}))
+        cls._combined_regex = re.compile(
+            f"(?=[{start_chars}])(?:{'|'.join(alternatives)})", re.IGNORECASE
+        )
+        cls._keyword_regex = re.compile('|'.join(re.escape(k) for k in cls.price_keywords))
     
     def extract_facts(self, content: str) -> List[FactCheckItem]:
         """記事から事実確認項目を抽出"""
-        facts = []
+        group_types = self._group_types
+        keyword_search = self._keyword_regex.search
+        content_length = len(content)
+        name_context = self.NAME_CONTEXT_CHARS
         
-        # 各パターンでマッチング
-        for pattern_name, pattern_info in self.patterns.items():
-            pattern = pattern_info['pattern']
-            fact_type = pattern_info['type']
-            
-            for match in re.finditer(pattern, content, re.IGNORECASE):
-                # コンテキストを取得（前後50文字）
-                start = max(0, match.start() - 50)
-                end = min(len(content), match.end() + 50)
-                context = content[start:end]
-                
-                fact = FactCheckItem(
-                    text=match.group(),
-                    fact_type=fact_type,
-                    context=context,
-                    position=match.start()
-                )
-                facts.append(fact)
+        # 種類ごとに、直前の一致の終端より前は無視する（個別にfinditerした場合と同じ非重複規則）
+        next_allowed: Dict[str, int] = {}
+        seen = set()
+        found = []  # (position, end, text, fact_type)
         
-        # プロジェクト名の抽出
-        for crypto_name in self.crypto_names:
-            pattern = rf'\b{crypto_name}\b'
-            for match in re.finditer(pattern, content, re.IGNORECASE):
+        for match in self._combined_regex.finditer(content):
+            group = match.lastgroup
+            fact_type = group_types[group]
+            start, end = match.span(group)
+            
+            if start < next_allowed.get(fact_type, 0):
+                continue
+            next_allowed[fact_type] = end
+            
+            text = match.group(group)
+            key = (text, fact_type)
+            if key in seen:
+                continue
+            
+            if fact_type == 'crypto_name':
                 # 価格や数値に関連する文脈かチェック
-                context_start = max(0, match.start() - 100)
-                context_end = min(len(content), match.end() + 100)
-                context = content[context_start:context_end]
-                
-                if any(keyword in context for keyword in ['価格', '値', 'price', '取引', 'trading']):
-                    fact = FactCheckItem(
-                        text=match.group(),
-                        fact_type='crypto_name',
-                        context=context,
-                        position=match.start()
-                    )
-                    facts.append(fact)
+                context_start = max(0, start - name_context)
+                context_end = min(content_length, end + name_context)
+                if not keyword_search(content, context_start, context_end):
+                    continue
+            
+            seen.add(key)
+            found.append((start, end, text, fact_type))
         
-        # 重複を除去
-        unique_facts = self._remove_duplicates(facts)
+        facts = []
+        for start, end, text, fact_type in found:
+            facts.append(FactCheckItem(
+                text=text,
+                fact_type=fact_type,
+                context=self._get_context(content, start, end, fact_type),
+                position=start
+            ))
         
-        return sorted(unique_facts, key=lambda x: x.position)
+        return sorted(facts, key=lambda x: (x.position, self._type_order[x.fact_type]))
     
-    def _remove_duplicates(self, facts: List[FactCheckItem]) -> List[FactCheckItem]:
-        """重複する事実項目を除去"""
-        unique = []
-        seen_texts = set()
-        
-        for fact in facts:
-            key = f"{fact.text}_{fact.fact_type}"
-            if key not in seen_texts:
-                seen_texts.add(key)
-                unique.append(fact)
-        
-        return unique
+    def _get_context(self, content: str, start: int, end: int, fact_type: str) -> str:
+        """項目の周辺コンテキストを取得"""
+        width = self.NAME_CONTEXT_CHARS if fact_type == 'crypto_name' else self.PATTERN_CONTEXT_CHARS
+        return content[max(0, start - width):min(len(content), end + width)]
 
 
 class PriceVerifier:
     """価格データの検証"""
     
-    def __init__(self):
-        self.coingecko_url = 'https://api.coingecko.com/api/v3'
-        self.cache = {}  # APIレスポンスのキャッシュ
+    def __init__(self, oracle: Optional[PriceOracle] = None):
+        # 価格はプロセス共有のオラクル経由で取得（キャッシュ・一括取得）
+        self.oracle = oracle or get_price_oracle()
     
     def verify_price(self, crypto_name: str, price_text: str, context: str) -> Tuple[bool, Optional[str]]:
         """価格の妥当性を検証"""
@@ -207,28 +254,7 @@ class PriceVerifier:
     
     def _get_current_price(self, coin_id: str) -> Optional[float]:
         """現在価格を取得"""
-        if coin_id in self.cache:
-            cached_data, timestamp = self.cache[coin_id]
-            if datetime.now() - timestamp < timedelta(minutes=5):
-                return cached_data
-        
-        try:
-            response = requests.get(
-                f"{self.coingecko_url}/simple/price",
-                params={'ids': coin_id, 'vs_currencies': 'usd'}
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                price = data.get(coin_id, {}).get('usd')
-                if price:
-                    self.cache[coin_id] = (price, datetime.now())
-                    return price
-                    
-        except Exception as e:
-            logger.error(f"API error: {e}")
-        
-        return None
+        return self.oracle.get_price(coin_id)
 
 
 class DateVerifier:
@@ -282,6 +308,44 @@ class DateVerifier:
         return None
 
 
+def split_paragraphs(content: str) -> List[Tuple[int, str]]:
+    """記事を段落（空行以外の各行）に分割し、(記事内の開始位置, 前後の空白を除いた本文) を返す"""
+    paragraphs = []
+    offset = 0
+    for line in content.split('\n'):
+        text = line.strip()
+        if text:
+            paragraphs.append((offset + len(line) - len(line.lstrip()), text))
+        offset += len(line) + 1
+    return paragraphs
+
+
+def result_items(results: Dict) -> List[Dict]:
+    """
+    検証結果の項目（記事内の位置、記事全体で重複を除去して最初の出現を残す）
+
+    check_paragraphs の結果は項目を段落ごとにだけ持つので、ここで記事全体の一覧に展開する
+    （check_article の結果や、両方を保存していた以前の結果は items をそのまま返す）。
+    """
+    if 'items' in results or 'paragraphs' not in results:
+        return results.get('items', [])
+    items = []
+    seen = set()
+    for paragraph in results['paragraphs']:
+        for item in paragraph['items']:
+            key = (item['text'], item['type'])
+            if key in seen:
+                continue
+            seen.add(key)
+            items.append({**item, 'position': paragraph['offset'] + item['position']})
+    return items
+
+
+def paragraph_hash(text: str) -> str:
+    """段落本文のハッシュ（段落単位の検証結果のキー）"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
 class FactChecker:
     """ファクトチェックのメインクラス"""
     
@@ -295,7 +359,13 @@ class FactChecker:
         # 事実項目を抽出
         facts = self.extractor.extract_facts(content)
         
-        # 各項目を検証
+        # 検証に必要な価格をまとめて取得
+        self.prefetch_prices(facts)
+        
+        return self.verify_facts(facts, content)
+    
+    def verify_facts(self, facts: List[FactCheckItem], content: str) -> Dict:
+        """抽出済みの事実項目を検証して集計（価格は事前取得済みのキャッシュを使用）"""
         results = {
             'total_facts': len(facts),
             'verified': 0,
@@ -326,6 +396,97 @@ class FactChecker:
         
         return results
     
+    def check_paragraphs(self, content: str, previous: Optional[Dict] = None,
+                         extracted: Optional[Dict[str, List[FactCheckItem]]] = None) -> Dict:
+        """
+        段落単位でファクトチェック
+        
+        段落ごとの検証結果を本文ハッシュをキーに results['paragraphs'] へ保存する。
+        項目は段落ごとにだけ保存し、記事全体の一覧は result_items() で展開する。
+        previous（前回の結果）に同じハッシュの段落があればその結果を再利用し、
+        変更された段落だけを抽出・検証する。extracted には抽出済みの段落（ハッシュ → 項目）を渡せる。
+        """
+        paragraphs = [(offset, text, paragraph_hash(text)) for offset, text in split_paragraphs(content)]
+        cached = self.paragraph_cache(previous)
+        
+        # 変更された段落だけを抽出
+        new_facts: Dict[str, List[FactCheckItem]] = {}
+        for _, text, digest in paragraphs:
+            if digest in cached or digest in new_facts:
+                continue
+            if extracted and digest in extracted:
+                new_facts[digest] = extracted[digest]
+            else:
+                new_facts[digest] = self.extractor.extract_facts(text)
+        
+        self.prefetch_prices([fact for facts in new_facts.values() for fact in facts])
+        verified = {
+            digest: [self._verify_fact(fact, content) for fact in facts]
+            for digest, facts in new_facts.items()
+        }
+        
+        results = {
+            'total_facts': 0,
+            'verified': 0,
+            'failed': 0,
+            'skipped': 0,
+            'paragraphs': [
+                {'hash': digest, 'offset': offset,
+                 'items': cached[digest] if digest in cached else verified[digest]}
+                for offset, _, digest in paragraphs
+            ],
+            'reused_paragraphs': sum(1 for _, _, digest in paragraphs if digest in cached),
+            'checked_paragraphs': len(new_facts)
+        }
+        
+        # 集計は記事全体で重複を除いた項目で行う
+        for item in result_items(results):
+            results['total_facts'] += 1
+            if item['verified'] is True:
+                results['verified'] += 1
+            elif item['verified'] is False:
+                results['failed'] += 1
+            else:
+                results['skipped'] += 1
+        
+        if results['total_facts'] > 0:
+            results['reliability_score'] = (
+                results['verified'] / results['total_facts'] * 100
+            )
+        else:
+            results['reliability_score'] = 100
+        
+        return results
+    
+    @staticmethod
+    def paragraph_cache(previous: Optional[Dict]) -> Dict[str, List[Dict]]:
+        """前回の結果から段落ハッシュ → 検証済み項目（段落内の位置）を取得"""
+        if not previous:
+            return {}
+        return {
+            paragraph['hash']: paragraph['items']
+            for paragraph in previous.get('paragraphs', [])
+            if 'hash' in paragraph
+        }
+    
+    def collect_coin_ids(self, facts: List[FactCheckItem]) -> set:
+        """価格検証で参照するコインIDを収集"""
+        coin_ids = set()
+        for fact in facts:
+            if fact.fact_type != 'price':
+                continue
+            crypto_name = self._find_crypto_name(fact.context)
+            coin_id = self.price_verifier._get_coin_id(crypto_name) if crypto_name else None
+            if coin_id:
+                coin_ids.add(coin_id)
+        return coin_ids
+    
+    def prefetch_prices(self, facts: List[FactCheckItem]):
+        """記事（または記事バッチ）の価格を1回のリクエストで取得しておく"""
+        coin_ids = self.collect_coin_ids(facts)
+        if coin_ids:
+            self.price_verifier.oracle.prefetch(coin_ids)
+    
     def _verify_fact(self, fact: FactCheckItem, full_content: str) -> Dict:
         """個別の事実項目を検証"""
         result = {
@@ -397,7 +558,7 @@ class FactChecker:
         
         if check_results['failed'] > 0:
             report.append("\n【要確認項目】")
-            for item in check_results['items']:
+            for item in result_items(check_results):
                 if item['verified'] is False:
                     report.append(f"\n✗ {item['text']}")
                     report.append(f"  種類: {item['type']}")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+キーワードマッチャー
+複数のキーワードグループを事前にコンパイルし、テキストを1回走査するだけで
+各グループのヒットを判定する
+"""
+
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+
+def _has_whitespace(keyword: str) -> bool:
+    return any(char.isspace() for char in keyword)
+
+
+def _build_trie_pattern(keywords: Iterable[str]) -> str:
+    """キーワード群を共通接頭辞でまとめた正規表現（同じ位置では最長のキーワードに一致）"""
+    trie: Dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # ここで終わるキーワードがある場合、続きは貪欲な省略可能部分
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    キーワードグループの部分文字列一致判定
+
+    判定結果は各キーワードについて `keyword in text` を評価した場合と同じになる。
+    空白を含まないキーワードは、テキストを空白で区切った語のいずれかに含まれる場合に
+    限り一致するため、語ごとの判定結果をキャッシュして再利用する（語彙は限られるため
+    ほとんどの語はキャッシュに当たる）。未知の語は共通接頭辞でまとめた正規表現で1回走査する。
+    空白を含むフレーズは、先頭の語が含まれる場合だけ直接 `in` で判定する。
+    大文字小文字は区別するので、必要に応じて呼び出し側でテキストを正規化すること。
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]], cache_size: int = 65536):
+        self.groups: Dict[str, List[str]] = {name: list(keywords) for name, keywords in groups.items()}
+        self.cache_size = cache_size
+
+        # キーワード → グループごとの出現数（同じキーワードの重複定義もそのまま数える）
+        self._group_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for name, keywords in self.groups.items():
+            for keyword in keywords:
+                if keyword:
+                    self._group_counts[keyword][name] += 1
+
+        # フレーズは先頭の語（空白の手前）が一致した場合だけ `in` で判定する
+        self._phrases = []
+        for keyword in self._group_counts:
+            if _has_whitespace(keyword):
+                gate = keyword.split(None, 1)[0] if not keyword[0].isspace() else ''
+                self._phrases.append((gate, keyword))
+
+        self._keywords = frozenset(self._group_counts)
+        # first_group 用（グループごとの重複・空文字を除いたキーワード）
+        self._group_keywords: Dict[str, tuple] = {
+            name: tuple(dict.fromkeys(k for k in keywords if k)) for name, keywords in self.groups.items()
+        }
+        words = sorted({k for k in self._group_counts if not _has_whitespace(k)} |
+                       {gate for gate, _ in self._phrases if gate})
+        self._regex = re.compile(_build_trie_pattern(words)) if words else None
+
+        # 同じ位置で最長のキーワードが一致したとき、その接頭辞であるキーワードも一致している
+        self._prefixes: Dict[str, FrozenSet[str]] = {
+            word: frozenset(other for other in words if word.startswith(other))
+            for word in words
+        }
+
+        self._token_cache: Dict[str, FrozenSet[str]] = {}
+        self._cache_lock = threading.Lock()
+
+    def _scan(self, token: str) -> FrozenSet[str]:
+        """語に含まれるキーワード（重なり合う一致も含む）"""
+        found: Set[str] = set()
+        search = self._regex.search
+        match = search(token)
+        while match:
+            found.update(self._prefixes[match.group()])
+            match = search(token, match.start() + 1)
+        return frozenset(found)
+
+    def _lookup(self, token: str) -> FrozenSet[str]:
+        """未キャッシュの語を走査してキャッシュへ登録"""
+        hits = self._scan(token)
+        with self._cache_lock:
+            if len(self._token_cache) >= self.cache_size:
+                self._token_cache.clear()
+            self._token_cache[token] = hits
+        return hits
+
+    def find(self, text: str) -> Set[str]:
+        """テキストに含まれるキーワードの集合"""
+        hits: Set[str] = set()
+
+        if self._regex is not None:
+            tokens = text.split()
+            cache = self._token_cache
+            try:
+                cached = list(map(cache.__getitem__, tokens))
+            except KeyError:
+                # 未知の語を含む場合だけ1語ずつ判定
+                cached = [cache[token] if token in cache else self._lookup(token) for token in tokens]
+            # 一致なしの語は空の frozenset なので除外して結合
+            hits.update(*filter(None, cached))
+
+        found = hits & self._keywords if hits else set()
+        for gate, phrase in self._phrases:
+            if (not gate or gate in hits) and phrase in text:
+                found.add(phrase)
+
+        return found
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """グループごとの一致キーワード数"""
+        result = dict.fromkeys(self.groups, 0)
+        for keyword in self.find(text):
+            for name, count in self._group_counts[keyword].items():
+                result[name] += count
+        return result
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """グループごとの一致キーワード（定義順）"""
+        found = self.find(text)
+        return {
+            name: [keyword for keyword in keywords if keyword in found] if found else []
+            for name, keywords in self.groups.items()
+        }
+
+    def groups_for(self, found: Iterable[str]) -> Set[str]:
+        """find() の結果に一致したキーワードを含むグループ名の集合"""
+        hit_groups: Set[str] = set()
+        for keyword in found:
+            hit_groups.update(self._group_counts[keyword])
+        return hit_groups
+
+    def first_group(self, text: str, order: Optional[Iterable[str]] = None) -> Optional[str]:
+        """
+        order（省略時は定義順）で最初に一致したグループ名
+
+        全キーワードを走査する find() は使わず、優先度の高いグループから `in` で判定して
+        最初に一致した時点で打ち切る（優先度の高いグループが一致するテキストが多いため）
+        """
+        for name in (order if order is not None else self.groups):
+            for keyword in self._group_keywords.get(name, ()):
+                if keyword in text:
+                    return name
+        return None
@@ -6,11 +6,10 @@ FastAPI backend server for the crypto article generation system
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, or_
 import json
 import os
 import logging
@@ -25,17 +24,30 @@ from slowapi.errors import RateLimitExceeded
 
 # 自作モジュール
 from .article_pipeline import ArticlePipeline, PipelineConfig
-from .topic_collector import TopicManager, RSSFeedCollector, PriceDataCollector
+from .topic_collector import TopicManager, TopicPriority, RSSFeedCollector, PriceDataCollector
+from .topic_journal import attach_owned_journal
 from .crypto_article_generator_mvp import CryptoArticleGenerator, ArticleTopic, ArticleType, ArticleDepth
 from .fact_checker import FactChecker
+from .fact_check_pipeline import (
+    BulkFactChecker, build_fact_check_record, load_previous_results, select_article_ids, summarize_record
+)
 from .wordpress_publisher import WordPressClient, ArticlePublisher
 from .config_manager import get_config_manager, ConfigValidator
 from .database import (
     get_db, Topic, Article, FactCheckResult, GenerationTask, SystemMetrics, ArticleTemplate,
-    DatabaseUtils, create_tables
+    DatabaseUtils, create_tables, SessionLocal, pool_status
 )
-from .celery_app import app as celery_app, generate_article_async, collect_topics_async
+from .async_database import get_async_db, get_async_engine, async_session_mode
+from .article_repository import get_article_repository
+from .search_index import search_articles
+from .system_counters import get_counter_cache, generated_counter
+from .pagination import InvalidCursorError, encode_topic_cursor, decode_topic_cursor
+from .celery_app import app as celery_app, generate_article_async, collect_topics_async, fact_check_bulk_async
 from .scheduler import get_scheduler, start_scheduler, stop_scheduler, get_scheduler_status
+from .task_tracker import get_task_stats
+from .event_stream import (
+    EventBroadcaster, TOPIC_EVENTS_CHANNEL, resolve_channels, sse_stream, topic_event
+)
 
 # 認証関連モジュール
 from .auth_models import User, APIKey
@@ -57,7 +69,9 @@ topic_manager: Optional[TopicManager] = None
 article_generator: Optional[CryptoArticleGenerator] = None
 fact_checker: Optional[FactChecker] = None
 wordpress_client: Optional[WordPressClient] = None
+article_publisher: Optional[ArticlePublisher] = None
 redis_client: Optional[Redis] = None
+event_broadcaster = EventBroadcaster(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
 
 # キャッシュ管理
 import time
@@ -82,6 +96,11 @@ async def lifespan(app: FastAPI):
     # サービスを初期化
     pipeline = ArticlePipeline(config)
     topic_manager = TopicManager()
+    # 再起動前に収集・編集したトピックをジャーナルから復元（TOPIC_JOURNAL_OWNER=api の場合）
+    attach_owned_journal(topic_manager, 'api', config.output_dir)
+    topic_manager.add_listener(
+        lambda topics: event_broadcaster.publish(TOPIC_EVENTS_CHANNEL, topic_event(topics))
+    )
     article_generator = CryptoArticleGenerator()
     fact_checker = FactChecker()
     
@@ -102,6 +121,13 @@ async def lifespan(app: FastAPI):
         logger.warning(f"Redis client not available: {e}")
         redis_client = None
     
+    # イベント配信（SSE）を開始
+    try:
+        await event_broadcaster.start()
+        logger.info("Event broadcaster started")
+    except Exception as e:
+        logger.warning(f"Event broadcaster initialization failed: {e}")
+    
     # データベーステーブルを作成
     try:
         create_tables()
@@ -139,6 +165,12 @@ async def lifespan(app: FastAPI):
         logger.info("Topic collection scheduler stopped")
     except Exception as e:
         logger.warning(f"Scheduler shutdown failed: {e}")
+    
+    # イベント配信を停止
+    try:
+        await event_broadcaster.stop()
+    except Exception as e:
+        logger.warning(f"Event broadcaster shutdown failed: {e}")
 
 # FastAPI アプリケーション
 app = FastAPI(
@@ -203,6 +235,13 @@ class APIConfigRequest(BaseModel):
     wordpress_password: Optional[str] = None
     coinmarketcap_api_key: Optional[str] = None
 
+class BulkFactCheckRequest(BaseModel):
+    articleIds: Optional[List[int]] = None
+    since: Optional[datetime] = None
+    status: Optional[str] = None
+    limit: Optional[int] = None
+    background: Optional[bool] = False
+
 class SourceRequest(BaseModel):
     name: str
     type: str  # 'rss', 'api', 'web'
@@ -325,38 +364,29 @@ async def use_template(template_id: int, db: Session = Depends(get_db)):
 
 # システム関連のエンドポイント  
 @app.get("/api/system/stats")
-@limiter.limit("10/minute")
+@limiter.limit("120/minute")
 async def get_system_stats(
     request: Request
 ):
-    """システムの統計情報を取得"""
+    """システムの統計情報を取得（件数はカウンターから、STATS_CACHE_SECONDS の間キャッシュ）"""
     try:
         # パイプラインの統計を取得
         stats = pipeline.quota.get_stats() if pipeline else {}
         
-        # ファイルベースの統計を計算
-        output_dir = "./output/articles"
+        # 本日（UTC）生成した記事数と有効なテンプレート数
         articles_today = 0
-        if os.path.exists(output_dir):
-            today = datetime.now().strftime("%Y%m%d")
-            articles_today = len([
-                f for f in os.listdir(output_dir) 
-                if f.startswith(today) and f.endswith('.html')
-            ])
+        templates_count = 4  # デフォルト値
+        try:
+            today_counter = generated_counter(datetime.utcnow().date())
+            counters = get_counter_cache().get([today_counter, 'templates_active'])
+            articles_today = counters[today_counter]
+            templates_count = counters['templates_active']
+        except Exception as e:
+            logger.warning(f"Failed to read system counters: {e}")
         
         # トピック数を計算
         topics_count = len(topic_manager.topics) if topic_manager else 0
         
-        # データベースが利用可能な場合はテンプレート数も取得
-        templates_count = 4  # デフォルト値
-        try:
-            from src.database import SessionLocal, ArticleTemplate
-            db = SessionLocal()
-            templates_count = db.query(ArticleTemplate).filter(ArticleTemplate.is_active == True).count()
-            db.close()
-        except Exception:
-            pass  # データベースが利用できない場合はデフォルト値を使用
-        
         # スケジューラーの状態を取得
         scheduler_status = get_scheduler_status()
         
@@ -383,6 +413,19 @@ async def get_system_stats(
         logger.error(f"Error getting system stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/system/db-pool")
+async def get_db_pool_status():
+    """データベース接続プールの状態（大きさ・貸し出し数・接続数など）"""
+    try:
+        status = {**pool_status(), "asyncMode": async_session_mode()}
+        async_engine = get_async_engine()
+        if async_engine is not None:
+            status["async"] = pool_status(async_engine.sync_engine)
+        return status
+    except Exception as e:
+        logger.error(f"Error getting database pool status: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/system/control")
 @limiter.limit("5/minute")
 async def control_system(
@@ -448,12 +491,13 @@ async def run_pipeline_once():
 async def get_topics(
     limit: int = 20, 
     offset: int = 0,
+    cursor: Optional[str] = None,
     priority: Optional[str] = None,
     source: Optional[str] = None,
     sortBy: Optional[str] = None,
     force_refresh: bool = False
 ):
-    """トピック一覧を取得（ページネーション・フィルタ対応）"""
+    """トピック一覧を取得（ページネーション・フィルタ対応、次のページは nextCursor を cursor に渡す）"""
     try:
         if not topic_manager:
             return {"topics": []}
@@ -481,18 +525,8 @@ async def get_topics(
         else:
             logger.info("Using cached topics (collection interval not reached)")
         
-        # 全トピックを取得
-        all_topics = topic_manager.get_top_topics(count=1000)  # 大きな数で全取得
-        logger.info(f"📈 Total topics available: {len(all_topics)}, All topics in manager: {len(topic_manager.topics)}")
-        
-        # フィルタリング
-        filtered_topics = all_topics
-        
-        # 優先度でフィルタ
-        if priority:
-            filtered_topics = [t for t in filtered_topics if t.priority.name.lower() == priority.lower()]
-        
-        # ソースでフィルタ
+        # フィルタ条件
+        source_value = None
         if source:
             source_mapping = {
                 "rss": "rss_feed",
@@ -502,22 +536,50 @@ async def get_topics(
                 "onchain": "onchain_data"
             }
             source_value = source_mapping.get(source.lower(), source.lower())
-            filtered_topics = [t for t in filtered_topics if t.source.value == source_value]
-        
-        # ソート機能を適用
-        if sortBy == 'time':
-            # 更新時間順（新しい順）
-            filtered_topics = sorted(filtered_topics, key=lambda x: x.collected_at, reverse=True)
-        elif sortBy == 'title':
-            # タイトル順（アルファベット順）
-            filtered_topics = sorted(filtered_topics, key=lambda x: x.title.lower())
-        else:
-            # デフォルト: スコア順（高い順）
-            filtered_topics = sorted(filtered_topics, key=lambda x: x.score, reverse=True)
         
-        # ページネーション適用
-        total_count = len(filtered_topics)
-        topics = filtered_topics[offset:offset + limit]
+        def matches(topic) -> bool:
+            if priority and topic.priority.name.lower() != priority.lower():
+                return False
+            if source_value and topic.source.value != source_value:
+                return False
+            return True
+        
+        total_count = None
+        next_cursor = None
+        if sortBy == 'title':
+            # タイトル順（アルファベット順）は全件を並べ替えて offset で切り出す
+            if cursor:
+                raise InvalidCursorError("Cursor pagination is not available for sortBy=title")
+            filtered_topics = sorted(
+                (t for t in topic_manager.get_top_topics(count=len(topic_manager.topics)) if matches(t)),
+                key=lambda x: x.title.lower()
+            )
+            total_count = len(filtered_topics)
+            topics = filtered_topics[offset:offset + limit]
+            has_more = offset + limit < total_count
+        else:
+            # スコア順（既定）・更新時間順は索引をカーソルの位置から読む（読むのはページ分だけ）
+            order = 'time' if sortBy == 'time' else 'score'
+            after = decode_topic_cursor(cursor, order, topic_manager.cursor_epoch) if cursor else None
+            skip = 0 if cursor else offset
+            topics, positions = [], []
+            for topic, position in topic_manager.iter_topics(order, after=after, min_score=10):
+                if not matches(topic):
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                topics.append(topic)
+                positions.append(position)
+                if len(topics) > limit:
+                    break
+            has_more = len(topics) > limit
+            topics = topics[:limit]
+            if not cursor:
+                # offset 指定（従来のクライアント）には総件数も返す
+                total_count = sum(1 for topic, _ in topic_manager.iter_topics(order, min_score=10) if matches(topic))
+            if has_more:
+                next_cursor = encode_topic_cursor(order, topic_manager.cursor_epoch, positions[limit - 1])
         
         topics_data = []
         for topic in topics:
@@ -584,13 +646,16 @@ async def get_topics(
                 "total": total_count,
                 "offset": offset,
                 "limit": limit,
-                "hasMore": offset + limit < total_count
+                "hasMore": has_more,
+                "nextCursor": next_cursor
             }
         }
         
-        logger.info(f"📊 API Response: {len(topics_data)} topics out of {total_count} total (limit: {limit}, offset: {offset})")
+        logger.info(f"📊 API Response: {len(topics_data)} topics (limit: {limit}, offset: {offset}, cursor: {bool(cursor)})")
         return response_data
         
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting topics: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -612,18 +677,17 @@ async def update_topic(topic_id: str, updates: dict):
         if not topic_found:
             raise HTTPException(status_code=404, detail="Topic not found")
         
-        # 更新可能なフィールドのみ適用
-        if 'title' in updates:
-            topic_found.title = updates['title']
+        # 更新可能なフィールドのみ適用（タイトル・優先度の変更はジャーナルに記録される）
+        priority = None
         if 'priority' in updates:
-            # 優先度を変更
-            from src.topic_collector import Priority
-            for priority in Priority:
-                if priority.name.lower() == updates['priority'].lower():
-                    topic_found.priority = priority
+            for candidate in TopicPriority:
+                if candidate.name.lower() == updates['priority'].lower():
+                    priority = candidate
                     break
+        if 'title' in updates or priority is not None:
+            topic_manager.update_topic(topic_found, title=updates.get('title'), priority=priority)
         if 'score' in updates:
-            topic_found.score = float(updates['score'])
+            topic_manager.set_topic_score(topic_found, float(updates['score']))
         
         return {"success": True, "message": "Topic updated successfully"}
         
@@ -640,18 +704,16 @@ async def delete_topic(topic_id: str):
         
         # トピックを検索
         topic_found = None
-        topic_index = -1
-        for i, topic in enumerate(topic_manager.topics):
+        for topic in topic_manager.topics:
             if str(hash(topic.title)) == topic_id:
                 topic_found = topic
-                topic_index = i
                 break
         
         if not topic_found:
             raise HTTPException(status_code=404, detail="Topic not found")
         
-        # トピックを削除
-        topic_manager.topics.pop(topic_index)
+        # トピックを削除（スコア索引からも除く）
+        topic_manager.remove_topic(topic_found)
         
         return {"success": True, "message": "Topic deleted successfully"}
         
@@ -663,65 +725,71 @@ async def delete_topic(topic_id: str):
 @app.get("/api/articles")
 async def get_articles(
     limit: int = 20, 
+    offset: int = 0,
+    cursor: Optional[str] = None,
     status: Optional[str] = None, 
     type: Optional[str] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db=Depends(get_async_db)
 ):
-    """記事一覧をデータベースから取得"""
+    """記事一覧をデータベースから取得（次のページは nextCursor を cursor に渡す）"""
     try:
-        query = db.query(Article)
-        
-        # フィルタリング
-        if status:
-            query = query.filter(Article.status == status)
-        if type:
-            query = query.filter(Article.type == type)
-        if search:
-            search_pattern = f"%{search}%"
-            query = query.filter(
-                or_(
-                    Article.title.ilike(search_pattern),
-                    Article.content.ilike(search_pattern)
+        def load(session: Session):
+            next_cursor = None
+            if search:
+                # 全文検索索引で関連度順に取得（関連度順のためページは offset で指定）
+                articles = search_articles(session, search, limit=limit, offset=offset, status=status, article_type=type)
+            else:
+                # 新しい順に取得
+                articles, next_cursor = get_article_repository().list_page(
+                    session, limit=limit, cursor=cursor, status=status, article_type=type, offset=offset
                 )
-            )
-        
-        # 新しい順で取得
-        articles = query.order_by(desc(Article.generated_at)).limit(limit).all()
-        
-        articles_data = []
-        for article in articles:
-            article_data = {
-                "id": str(article.id),
-                "title": article.title,
-                "type": article.type,
-                "wordCount": article.word_count or 0,
-                "status": article.status,
-                "generatedAt": article.generated_at.isoformat() if article.generated_at else '',
-                "coins": article.coins or [],
-                "source": article.source,
-                "sourceUrl": article.source_url
-            }
-            articles_data.append(article_data)
+            
+            articles_data = []
+            for article in articles:
+                article_data = {
+                    "id": str(article.id),
+                    "title": article.title,
+                    "type": article.type,
+                    "wordCount": article.word_count or 0,
+                    "status": article.status,
+                    "generatedAt": article.generated_at.isoformat() if article.generated_at else '',
+                    "coins": article.coins or [],
+                    "source": article.source,
+                    "sourceUrl": article.source_url
+                }
+                articles_data.append(article_data)
+            return articles_data, next_cursor
         
-        return {"articles": articles_data}
+        # クエリはイベントループの外で実行（非同期ドライバまたはワーカースレッド）
+        articles_data, next_cursor = await db.run_sync(load)
+        return {"articles": articles_data, "nextCursor": next_cursor}
         
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting articles from database: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _load_article_html(repository, article: Article) -> str:
+    """記事のHTML本文（ブロブ保存領域のファイルはイベントループの外で読む）"""
+    if article.html_blob_hash:
+        return await asyncio.to_thread(repository.get_html, article)
+    return repository.get_html(article)
+
 @app.get("/api/articles/{article_id}/content")
-async def get_article_content(article_id: str, db: Session = Depends(get_db)):
+async def get_article_content(article_id: str, db=Depends(get_async_db)):
     """記事のコンテンツをデータベースから取得"""
     try:
-        article = DatabaseUtils.get_article_by_id(db, int(article_id))
+        repository = get_article_repository()
         
+        article = await db.run_sync(lambda session: repository.get(session, int(article_id)))
         if not article:
             raise HTTPException(status_code=404, detail="Article not found")
         
         return {
             "content": article.content or '',
-            "htmlContent": article.html_content or '',
+            "htmlContent": await _load_article_html(repository, article),
             "title": article.title,
             "type": article.type,
             "status": article.status,
@@ -731,6 +799,8 @@ async def get_article_content(article_id: str, db: Session = Depends(get_db)):
             "sourceUrl": article.source_url
         }
         
+    except HTTPException:
+        raise
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid article ID")
     except Exception as e:
@@ -780,61 +850,63 @@ async def update_article(article_id: str, updates: dict, db: Session = Depends(g
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/articles/{article_id}")
-async def delete_article(article_id: str):
-    """記事を削除"""
+async def delete_article(article_id: str, db: Session = Depends(get_db)):
+    """記事をデータベースから削除"""
     try:
-        articles_dir = "./output/articles"
-        html_path = os.path.join(articles_dir, f"{article_id}.html")
-        meta_path = os.path.join(articles_dir, f"{article_id}_meta.json")
-        
-        # ファイルを削除
-        if os.path.exists(html_path):
-            os.remove(html_path)
-        if os.path.exists(meta_path):
-            os.remove(meta_path)
+        if not get_article_repository().delete(db, int(article_id)):
+            raise HTTPException(status_code=404, detail="Article not found")
         
         return {"success": True, "message": "Article deleted successfully"}
         
+    except HTTPException:
+        raise
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid article ID")
     except Exception as e:
         logger.error(f"Error deleting article: {e}")
+        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+def _get_article_publisher() -> ArticlePublisher:
+    """WordPress投稿用のパブリッシャー（設定変更後は作り直す）"""
+    global article_publisher
+    if article_publisher is None:
+        article_publisher = ArticlePublisher()
+    return article_publisher
+
 @app.post("/api/articles/{article_id}/publish")
-async def publish_article(article_id: str):
+async def publish_article(article_id: str, db: Session = Depends(get_db)):
     """記事をWordPressに公開"""
     try:
         if not wordpress_client:
             raise HTTPException(status_code=500, detail="WordPress client not initialized")
         
-        articles_dir = "./output/articles"
-        html_path = os.path.join(articles_dir, f"{article_id}.html")
-        meta_path = os.path.join(articles_dir, f"{article_id}_meta.json")
-        
-        if not os.path.exists(html_path) or not os.path.exists(meta_path):
+        repository = get_article_repository()
+        article = repository.get(db, int(article_id))
+        if not article:
             raise HTTPException(status_code=404, detail="Article not found")
         
-        # 記事コンテンツとメタデータを読み込み
-        with open(html_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        with open(meta_path, 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
-        
-        # WordPressに投稿
-        title = metadata.get('article', {}).get('title', 'Untitled')
-        wordpress_client.publish_article(title, content)
+        # WordPressに投稿（投稿済みの記事は既存の投稿IDが返る）
+        publisher = _get_article_publisher()
+        post_id = await asyncio.to_thread(
+            publisher.publish_content, await _load_article_html(repository, article),
+            repository.publish_metadata(article)
+        )
+        if not post_id:
+            raise HTTPException(status_code=502, detail="Failed to publish article to WordPress")
         
         # ステータスを更新
-        if 'article' not in metadata:
-            metadata['article'] = {}
-        metadata['article']['status'] = 'published'
-        with open(meta_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        repository.mark_published(db, article, post_id)
         
-        return {"success": True, "message": "Article published successfully"}
+        return {"success": True, "message": "Article published successfully", "postId": post_id}
         
+    except HTTPException:
+        raise
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid article ID")
     except Exception as e:
         logger.error(f"Error publishing article: {e}")
+        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/articles/generate")
@@ -854,12 +926,16 @@ async def generate_article(request: ArticleGenerationRequest):
         if not topic_found:
             raise HTTPException(status_code=404, detail="Topic not found")
         
+        # スコアを現在の減衰後の値にしてから渡す
+        topic_manager.current_score(topic_found)
+        
         # Celeryタスクで非同期実行
         task = generate_article_async.delay(
             topic_id=request.topicId,
             article_type=request.type or 'analysis',
             depth=request.depth or 'comprehensive',
-            publish=False
+            publish=False,
+            topic_data=topic_found.to_dict()
         )
         
         return {
@@ -873,6 +949,16 @@ async def generate_article(request: ArticleGenerationRequest):
         logger.error(f"Error generating article: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# タスク統計の取得エンドポイント
+@app.get("/api/tasks/stats")
+async def get_task_statistics(hours: int = 24, task_type: Optional[str] = None, db: Session = Depends(get_db)):
+    """タスク種別ごとのスループット・失敗率・所要時間を取得"""
+    try:
+        return get_task_stats(db, hours=hours, task_type=task_type)
+    except Exception as e:
+        logger.error(f"Error getting task stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # タスクステータスの取得エンドポイント
 @app.get("/api/tasks/{task_id}/status")
 async def get_task_status(task_id: str):
@@ -908,21 +994,78 @@ async def get_task_status(task_id: str):
             }
         
         # Redisから詳細ステータスを取得（利用可能な場合）
+        redis_found = False
         if redis_client:
             try:
                 redis_status = redis_client.get(f"task:{task_id}:status")
                 if redis_status:
                     redis_data = json.loads(redis_status)
                     response.update(redis_data)
+                    redis_found = True
             except Exception as e:
                 logger.warning(f"Failed to get Redis status: {e}")
         
+        # Redisのステータスが失効している場合はタスク履歴から取得
+        if not redis_found and response['status'] == 'pending':
+            db = SessionLocal()
+            try:
+                task = db.query(GenerationTask).filter(GenerationTask.task_id == task_id).first()
+                if task:
+                    response.update({
+                        'status': task.status,
+                        'task_type': task.task_type,
+                        'progress': task.progress,
+                        'result': task.result,
+                        'error': task.error_message,
+                        'started_at': task.started_at.isoformat() if task.started_at else None,
+                        'completed_at': task.completed_at.isoformat() if task.completed_at else None
+                    })
+                    response.pop('message', None)
+            finally:
+                db.close()
+        
         return response
         
     except Exception as e:
         logger.error(f"Error getting task status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# リアルタイムイベントストリーム（SSE）
+@app.get("/api/events/stream")
+async def stream_events(request: Request, channels: Optional[str] = None, task_id: Optional[str] = None):
+    """タスク進捗・新規トピックをServer-Sent Eventsで配信"""
+    try:
+        resolved = resolve_channels(channels)
+        
+        # タスク指定時は現在のステータスを最初に送る
+        initial_events = []
+        if task_id and redis_client:
+            try:
+                redis_status = redis_client.get(f"task:{task_id}:status")
+                if redis_status:
+                    initial_events.append({'type': 'task', 'task_id': task_id, **json.loads(redis_status)})
+            except Exception as e:
+                logger.warning(f"Failed to get Redis status: {e}")
+        
+        return StreamingResponse(
+            sse_stream(
+                event_broadcaster,
+                resolved,
+                task_id=task_id,
+                initial_events=initial_events,
+                is_disconnected=request.is_disconnected
+            ),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"
+            }
+        )
+        
+    except Exception as e:
+        logger.error(f"Error starting event stream: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # トピック収集の非同期エンドポイント
 @app.post("/api/topics/collect")
 async def collect_topics_async_endpoint():
@@ -944,8 +1087,13 @@ async def collect_topics_async_endpoint():
 
 # ファクトチェックエンドポイント
 @app.post("/api/articles/{article_id}/fact-check")
-async def run_fact_check(article_id: str, db: Session = Depends(get_db)):
-    """記事のファクトチェックを実行しデータベースに保存"""
+async def run_fact_check(article_id: str, full: bool = False, db: Session = Depends(get_db)):
+    """
+    記事のファクトチェックを実行しデータベースに保存
+    
+    前回の結果から本文が変わっていない段落は再利用し、編集された段落だけを検証する。
+    full=true の場合は全段落を検証し直す。
+    """
     try:
         if not fact_checker:
             raise HTTPException(status_code=500, detail="Fact checker not initialized")
@@ -956,39 +1104,19 @@ async def run_fact_check(article_id: str, db: Session = Depends(get_db)):
         if not article:
             raise HTTPException(status_code=404, detail="Article not found")
         
-        # ファクトチェックを実行
+        # ファクトチェックを実行（CPU処理と価格取得はスレッドプールで）
         text_content = article.content or ''
-        fact_check_result = fact_checker.check_article(text_content)
-        
-        # 結果を整形
-        total_facts = len(fact_check_result.get('items', []))
-        verified_facts = sum(1 for item in fact_check_result.get('items', []) if item.get('verified') is True)
-        failed_facts = sum(1 for item in fact_check_result.get('items', []) if item.get('verified') is False)
-        reliability_score = int(fact_check_result.get('reliability_score', 0) * 100)
-        
-        # ファクトチェック結果をデータベースに保存
-        fact_check_record = FactCheckResult(
-            article_id=article.id,
-            reliability_score=reliability_score,
-            total_facts=total_facts,
-            verified_facts=verified_facts,
-            failed_facts=failed_facts,
-            skipped_facts=total_facts - verified_facts - failed_facts,
-            results=fact_check_result,
-            checker_version="1.0.0",
-            checked_at=datetime.utcnow()
+        previous = {} if full else load_previous_results(db, [article.id])
+        fact_check_result = await asyncio.to_thread(
+            fact_checker.check_paragraphs, text_content, previous.get(article.id)
         )
         
-        db.add(fact_check_record)
+        # ファクトチェック結果をデータベースに保存
+        record = build_fact_check_record(article.id, fact_check_result)
+        db.add(FactCheckResult(**record))
         db.commit()
         
-        results = {
-            "totalFacts": total_facts,
-            "verified": verified_facts,
-            "failed": failed_facts,
-            "reliabilityScore": reliability_score,
-            "items": fact_check_result.get('items', [])
-        }
+        results = summarize_record(record)
         
         return {
             "success": True,
@@ -1002,68 +1130,86 @@ async def run_fact_check(article_id: str, db: Session = Depends(get_db)):
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/articles/{article_id}")
-async def get_article_content(article_id: str):
-    """記事の詳細を取得"""
+@app.post("/api/fact-check/bulk")
+async def run_bulk_fact_check(request: BulkFactCheckRequest, db: Session = Depends(get_db)):
+    """
+    複数記事をまとめてファクトチェック
+    
+    articleIds を指定するか、since（と status='draft' など）で対象を絞り込む。
+    結果は記事ごとにNDJSONで逐次返す。background=true の場合はCeleryタスクとして実行する。
+    """
     try:
-        articles_dir = "./output/articles"
-        html_path = os.path.join(articles_dir, f"{article_id}.html")
-        meta_path = os.path.join(articles_dir, f"{article_id}_meta.json")
+        if not request.articleIds and not request.since:
+            raise HTTPException(status_code=400, detail="articleIds or since is required")
+        
+        if request.background:
+            task = fact_check_bulk_async.delay(
+                article_ids=request.articleIds,
+                since=request.since.isoformat() if request.since else None,
+                status=request.status,
+                limit=request.limit
+            )
+            return {
+                "success": True,
+                "message": "ファクトチェックタスクを開始しました",
+                "taskId": task.id,
+                "status": "started"
+            }
         
-        if not os.path.exists(html_path) or not os.path.exists(meta_path):
-            raise HTTPException(status_code=404, detail="Article not found")
+        if not fact_checker:
+            raise HTTPException(status_code=500, detail="Fact checker not initialized")
         
-        # HTMLコンテンツを読み込み
-        with open(html_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
+        article_ids = select_article_ids(
+            db,
+            article_ids=request.articleIds,
+            since=request.since,
+            status=request.status,
+            limit=request.limit
+        )
+        checker = BulkFactChecker(checker=fact_checker)
         
-        # メタデータを読み込み
-        with open(meta_path, 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
+        def ndjson_lines():
+            for event in checker.run(article_ids):
+                yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
         
-        return {
-            "id": article_id,
-            "title": metadata.get('topic', {}).get('title', 'Unknown'),
-            "content": html_content,  # プレーンテキスト（簡易変換）
-            "htmlContent": html_content,
-            "type": metadata.get('article', {}).get('type', 'unknown'),
-            "status": "draft",
-            "wordCount": metadata.get('article', {}).get('word_count', 0),
-            "generatedAt": metadata.get('generated_at', ''),
-            "coins": metadata.get('article', {}).get('coins', [])
-        }
+        # 同期ジェネレーターはStreamingResponseがスレッドプールで順に評価する
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error getting article content: {e}")
+        logger.error(f"Error running bulk fact check: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/articles/{article_id}/fact-check")
-async def run_fact_check(article_id: str):
-    """ファクトチェックを実行"""
+@app.get("/api/articles/{article_id}")
+async def get_article_detail(article_id: str, db=Depends(get_async_db)):
+    """記事の詳細をデータベースから取得"""
     try:
-        if not fact_checker:
-            raise HTTPException(status_code=500, detail="Fact checker not initialized")
+        repository = get_article_repository()
         
-        # 記事内容を取得
-        articles_dir = "./output/articles"
-        html_path = os.path.join(articles_dir, f"{article_id}.html")
-        
-        if not os.path.exists(html_path):
+        article = await db.run_sync(lambda session: repository.get(session, int(article_id)))
+        if not article:
             raise HTTPException(status_code=404, detail="Article not found")
         
-        with open(html_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # ファクトチェック実行
-        results = fact_checker.check_article(content)
-        
+        html_content = await _load_article_html(repository, article)
         return {
-            "success": True,
-            "results": results
+            "id": str(article.id),
+            "title": article.title,
+            "content": html_content,  # プレーンテキスト（簡易変換）
+            "htmlContent": html_content,
+            "type": article.type,
+            "status": article.status,
+            "wordCount": article.word_count or 0,
+            "generatedAt": article.generated_at.isoformat() if article.generated_at else '',
+            "coins": article.coins or []
         }
         
+    except HTTPException:
+        raise
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid article ID")
     except Exception as e:
-        logger.error(f"Error running fact check: {e}")
+        logger.error(f"Error getting article detail: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # WordPress関連のエンドポイント
@@ -1244,8 +1390,9 @@ async def update_api_config(request: APIConfigRequest):
             os.environ[key] = value
         
         # WordPress クライアントを再初期化
-        global wordpress_client
+        global wordpress_client, article_publisher
         if any(k.startswith('WORDPRESS_') for k in updates.keys()):
+            article_publisher = None
             try:
                 wordpress_client = WordPressClient()
                 logger.info("WordPress client reinitialized")
@@ -1393,8 +1540,9 @@ async def update_secure_config(config_updates: Dict[str, Any]):
                     os.environ['COINMARKETCAP_API_KEY'] = value
             
             # WordPress クライアントを再初期化
-            global wordpress_client
+            global wordpress_client, article_publisher
             if any(k.startswith('wordpress_') for k in config_updates.keys()):
+                article_publisher = None
                 try:
                     wordpress_client = WordPressClient()
                     logger.info("WordPress client reinitialized with secure config")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+カーソル（キーセット）ページネーション
+並び順のキー（例: 生成日時と記事ID）を不透明な文字列にして受け渡し、
+次のページはそのキーより後ろから取得する（OFFSET のように読み飛ばさない）
+"""
+
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, List, Optional
+
+
+class InvalidCursorError(ValueError):
+    """カーソルが壊れている・別の並び順のもの・期限切れ"""
+
+
+def encode_cursor(kind: str, values: List[Any]) -> str:
+    """並び順の種類とキーをカーソル文字列に変換"""
+    payload = json.dumps([kind, values], separators=(',', ':'), ensure_ascii=False, default=str)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, kind: str, length: int) -> List[Any]:
+    """カーソル文字列からキーを取り出す（種類・個数が合わなければ InvalidCursorError）"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        decoded_kind, values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        raise InvalidCursorError("Invalid cursor")
+    if decoded_kind != kind or not isinstance(values, list) or len(values) != length:
+        raise InvalidCursorError("Cursor does not match this listing")
+    return values
+
+
+def encode_article_cursor(generated_at: datetime, article_id: int) -> str:
+    return encode_cursor('articles', [generated_at.isoformat(), article_id])
+
+
+def decode_article_cursor(cursor: str):
+    """記事一覧のカーソル → (生成日時, 記事ID)"""
+    generated_at, article_id = decode_cursor(cursor, 'articles', 2)
+    try:
+        return datetime.fromisoformat(generated_at), int(article_id)
+    except (TypeError, ValueError):
+        raise InvalidCursorError("Invalid cursor")
+
+
+def encode_topic_cursor(order: str, epoch: float, position) -> str:
+    return encode_cursor(f'topics:{order}', [epoch, position[0], position[1]])
+
+
+def decode_topic_cursor(cursor: str, order: str, epoch: float) -> Optional[tuple]:
+    """
+    トピック一覧のカーソル → 索引上の位置
+
+    トピックはプロセス内の索引にあるため、索引が作り直された（サーバーが再起動した）
+    後のカーソルは期限切れとして扱う。
+    """
+    cursor_epoch, key, sequence = decode_cursor(cursor, f'topics:{order}', 3)
+    if cursor_epoch != epoch:
+        raise InvalidCursorError("Cursor has expired")
+    try:
+        return float(key), int(sequence)
+    except (TypeError, ValueError):
+        raise InvalidCursorError("Invalid cursor")
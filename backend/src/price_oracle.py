@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+共有価格オラクル
+CoinGeckoの現在価格をプロセス全体で共有するTTL付きLRUキャッシュと、
+複数コインの一括取得・同時リクエストの集約を提供する
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+COINGECKO_API_URL = "https://api.coingecko.com/api/v3"
+
+
+class PriceOracle:
+    """
+    暗号通貨の現在価格を提供するオラクル
+
+    - キャッシュはTTL付きLRU（プロセス内で共有）
+    - キャッシュにないコインは simple/price の複数ID指定でまとめて取得
+    - 同じコインを取得中のリクエストがあれば、その結果を待って使い回す
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 1024,
+                 vs_currency: str = 'usd', session: Optional[requests.Session] = None,
+                 base_url: str = COINGECKO_API_URL, batch_size: int = 100,
+                 request_timeout: float = 10.0):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.vs_currency = vs_currency
+        self.session = session or requests.Session()
+        self.base_url = base_url
+        self.batch_size = batch_size
+        self.request_timeout = request_timeout
+
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()  # coin_id -> (価格, 失効時刻)
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        # 統計
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+
+    def get_price(self, coin_id: str) -> Optional[float]:
+        """1コインの現在価格を取得"""
+        return self.get_prices([coin_id]).get(coin_id)
+
+    def get_prices(self, coin_ids: Iterable[str]) -> Dict[str, Optional[float]]:
+        """複数コインの現在価格を取得（未キャッシュ分は1リクエストにまとめる）"""
+        results: Dict[str, Optional[float]] = {}
+        to_fetch: List[str] = []
+        waiting: Dict[str, Future] = {}
+        now = time.monotonic()
+
+        with self._lock:
+            for coin_id in dict.fromkeys(c for c in coin_ids if c):
+                cached = self._cache.get(coin_id)
+                if cached and cached[1] > now:
+                    self._cache.move_to_end(coin_id)
+                    results[coin_id] = cached[0]
+                    self.hits += 1
+                elif coin_id in self._in_flight:
+                    waiting[coin_id] = self._in_flight[coin_id]
+                else:
+                    self._in_flight[coin_id] = Future()
+                    to_fetch.append(coin_id)
+                    self.misses += 1
+
+        if to_fetch:
+            results.update(self._fetch(to_fetch))
+
+        for coin_id, future in waiting.items():
+            try:
+                results[coin_id] = future.result(timeout=self.request_timeout)
+            except Exception:
+                results[coin_id] = None
+
+        return results
+
+    def prefetch(self, coin_ids: Iterable[str]) -> None:
+        """検証前に必要なコインの価格をまとめて取得しておく"""
+        self.get_prices(coin_ids)
+
+    def prime(self, prices: Dict[str, Optional[float]]) -> None:
+        """他のAPIレスポンスで得た価格をキャッシュへ登録"""
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for coin_id, price in prices.items():
+                if coin_id and price:
+                    self._store(coin_id, price, expires_at)
+
+    def prime_from_markets(self, markets: Optional[List[Dict]], vs_currency: str = 'usd') -> None:
+        """/coins/markets のレスポンスから価格をキャッシュへ登録"""
+        if not markets or vs_currency != self.vs_currency:
+            return
+        self.prime({coin.get('id'): coin.get('current_price') for coin in markets})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'requests': self.requests
+            }
+
+    def _store(self, coin_id: str, price: float, expires_at: float) -> None:
+        # ロック取得済みで呼び出すこと
+        self._cache[coin_id] = (price, expires_at)
+        self._cache.move_to_end(coin_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def _fetch(self, coin_ids: List[str]) -> Dict[str, Optional[float]]:
+        """simple/price をバッチ単位で呼び出し、待機中のリクエストへ結果を渡す"""
+        prices: Dict[str, Optional[float]] = {coin_id: None for coin_id in coin_ids}
+        try:
+            for i in range(0, len(coin_ids), self.batch_size):
+                batch = coin_ids[i:i + self.batch_size]
+                try:
+                    self.requests += 1
+                    response = self.session.get(
+                        f"{self.base_url}/simple/price",
+                        params={'ids': ','.join(batch), 'vs_currencies': self.vs_currency},
+                        timeout=self.request_timeout
+                    )
+                    if response.status_code == 200:
+                        data = response.json()
+                        for coin_id in batch:
+                            price = data.get(coin_id, {}).get(self.vs_currency)
+                            if price:
+                                prices[coin_id] = price
+                    else:
+                        logger.warning(f"Price API returned HTTP {response.status_code}")
+                except Exception as e:
+                    logger.error(f"API error: {e}")
+        finally:
+            expires_at = time.monotonic() + self.ttl_seconds
+            with self._lock:
+                for coin_id, price in prices.items():
+                    if price:
+                        self._store(coin_id, price, expires_at)
+                    future = self._in_flight.pop(coin_id, None)
+                    if future is not None:
+                        future.set_result(price)
+
+        return prices
+
+
+# グローバルインスタンス
+_price_oracle: Optional[PriceOracle] = None
+_oracle_lock = threading.Lock()
+
+
+def get_price_oracle() -> PriceOracle:
+    """プロセス共有の価格オラクルを取得（CoinGeckoClientのセッションを使用）"""
+    global _price_oracle
+    if _price_oracle is None:
+        with _oracle_lock:
+            if _price_oracle is None:
+                from .coingecko_client import get_client
+                client = get_client()
+                _price_oracle = PriceOracle(
+                    ttl_seconds=float(os.getenv('PRICE_CACHE_TTL_SECONDS', 300)),
+                    max_entries=int(os.getenv('PRICE_CACHE_MAX_ENTRIES', 1024)),
+                    session=client.session,
+                    base_url=client.base_url
+                )
+    return _price_oracle
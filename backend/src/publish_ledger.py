@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+WordPress投稿台帳
+記事本文のハッシュをキーに投稿状況を publish_records テーブルへ記録し、
+重複投稿の防止（冪等な投稿）と中断した一括投稿の再開に使う
+"""
+
+import os
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+
+from .database import SessionLocal, PublishRecord
+
+logger = logging.getLogger(__name__)
+
+# 投稿処理中（pending）のまま放置された記録を再取得できるまでの秒数
+DEFAULT_CLAIM_TIMEOUT = int(os.getenv('PUBLISH_CLAIM_TIMEOUT', 600))
+
+# IN 句に渡すハッシュ数の上限
+_IN_CHUNK = 500
+
+
+def article_content_hash(title: str, html_content: str) -> str:
+    """台帳のキー（タイトルと本文のSHA-256）"""
+    return hashlib.sha256(f"{title}\n{html_content}".encode('utf-8')).hexdigest()
+
+
+@dataclass
+class ClaimResult:
+    """投稿権の取得結果"""
+    claimed: bool
+    post_id: Optional[int] = None  # 投稿済みの場合のWordPress投稿ID
+
+
+class PublishLedger:
+    """
+    サイトごとの投稿台帳
+
+    claim() で pending の記録を作ってから投稿し、結果を mark_published() / mark_failed()
+    で記録する。投稿済みの記事は claim できないため、同じ記事を何度投稿しようとしても
+    WordPressには1件しか作られない。claim_timeout を過ぎた pending は中断したものとみなし、
+    失敗した記録と同様に再取得できる（WordPressへの作成後、記録前に中断した場合に限り
+    重複の可能性が残る）。
+    """
+
+    def __init__(self, site: str, session_factory=None, claim_timeout: int = DEFAULT_CLAIM_TIMEOUT):
+        self.site = site.rstrip('/')
+        self.session_factory = session_factory or SessionLocal
+        self.claim_timeout = claim_timeout
+
+    def _query(self, db, content_hashes: List[str]):
+        return db.query(PublishRecord).filter(
+            PublishRecord.site == self.site,
+            PublishRecord.content_hash.in_(content_hashes)
+        )
+
+    def published_posts(self, content_hashes: Iterable[str]) -> Dict[str, int]:
+        """投稿済みの記事（ハッシュ → WordPress投稿ID）"""
+        content_hashes = list(dict.fromkeys(content_hashes))
+        published = {}
+        db = self.session_factory()
+        try:
+            for offset in range(0, len(content_hashes), _IN_CHUNK):
+                rows = db.query(PublishRecord.content_hash, PublishRecord.post_id).filter(
+                    PublishRecord.site == self.site,
+                    PublishRecord.content_hash.in_(content_hashes[offset:offset + _IN_CHUNK]),
+                    PublishRecord.status == 'published'
+                ).all()
+                published.update(rows)
+        finally:
+            db.close()
+        return published
+
+    def get_post_id(self, content_hash: str) -> Optional[int]:
+        """投稿済みならWordPress投稿ID"""
+        return self.published_posts([content_hash]).get(content_hash)
+
+    def claim(self, content_hash: str, title: Optional[str] = None,
+              article_path: Optional[str] = None, batch_id: Optional[str] = None) -> ClaimResult:
+        """記事の投稿権を取得"""
+        return self.claim_many([{
+            'content_hash': content_hash, 'title': title,
+            'article_path': article_path, 'batch_id': batch_id
+        }])[content_hash]
+
+    def claim_many(self, entries: List[Dict[str, Any]]) -> Dict[str, ClaimResult]:
+        """
+        複数記事の投稿権をまとめて取得
+
+        entries の各要素は content_hash（必須）、title、article_path、batch_id を持つ辞書。
+        新しい記事は pending で登録し、失敗した記事・中断した記事は再取得する。
+        """
+        entries = list({entry['content_hash']: entry for entry in entries}.values())
+        results: Dict[str, ClaimResult] = {}
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            stale = now - timedelta(seconds=self.claim_timeout)
+
+            for offset in range(0, len(entries), _IN_CHUNK):
+                chunk = entries[offset:offset + _IN_CHUNK]
+                existing = {
+                    record.content_hash: record
+                    for record in self._query(db, [entry['content_hash'] for entry in chunk])
+                }
+                for entry in chunk:
+                    record = existing.get(entry['content_hash'])
+                    if record is None:
+                        db.add(PublishRecord(
+                            site=self.site, content_hash=entry['content_hash'], status='pending',
+                            title=entry.get('title'), article_path=entry.get('article_path'),
+                            batch_id=entry.get('batch_id'), attempts=1, claimed_at=now
+                        ))
+                        results[entry['content_hash']] = ClaimResult(True)
+                    elif record.status == 'published':
+                        results[entry['content_hash']] = ClaimResult(False, record.post_id)
+                    else:
+                        results[entry['content_hash']] = ClaimResult(False)
+
+            # 失敗・中断した記録は、他のプロセスが先に取得していない場合だけ取り直す
+            for entry in entries:
+                content_hash = entry['content_hash']
+                if results[content_hash].claimed or results[content_hash].post_id:
+                    continue
+                updated = db.query(PublishRecord).filter(
+                    PublishRecord.site == self.site,
+                    PublishRecord.content_hash == content_hash,
+                    PublishRecord.status != 'published',
+                    or_(PublishRecord.status == 'failed', PublishRecord.claimed_at < stale)
+                ).update({
+                    'status': 'pending',
+                    'claimed_at': now,
+                    'attempts': PublishRecord.attempts + 1,
+                    'batch_id': entry.get('batch_id'),
+                    'article_path': entry.get('article_path'),
+                    'error': None
+                }, synchronize_session=False)
+                results[content_hash] = ClaimResult(bool(updated))
+
+            db.commit()
+            return results
+
+        except IntegrityError:
+            # 他のプロセスが同じ記事を同時に登録した場合は1件ずつ取り直す
+            db.rollback()
+            if len(entries) == 1:
+                return {entries[0]['content_hash']: self._current_claim(entries[0]['content_hash'])}
+            results = {}
+            for entry in entries:
+                results.update(self.claim_many([entry]))
+            return results
+        finally:
+            db.close()
+
+    def _current_claim(self, content_hash: str) -> ClaimResult:
+        post_id = self.get_post_id(content_hash)
+        return ClaimResult(False, post_id)
+
+    def record_results(self, post_ids: Dict[str, Optional[int]],
+                       metadata: Optional[Dict[str, Dict]] = None,
+                       errors: Optional[Dict[str, str]] = None) -> None:
+        """投稿結果をまとめて記録（post_id が None の記事は失敗）"""
+        if not post_ids:
+            return
+        metadata = metadata or {}
+        errors = errors or {}
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            for content_hash, post_id in post_ids.items():
+                if post_id:
+                    values = {'status': 'published', 'post_id': post_id, 'published_at': now, 'error': None}
+                    if content_hash in metadata:
+                        values['record_metadata'] = metadata[content_hash]
+                else:
+                    values = {'status': 'failed', 'error': errors.get(content_hash, 'Failed to create post')}
+                db.query(PublishRecord).filter(
+                    PublishRecord.site == self.site,
+                    PublishRecord.content_hash == content_hash
+                ).update(values, synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def mark_published(self, content_hash: str, post_id: int, metadata: Optional[Dict] = None) -> None:
+        self.record_results({content_hash: post_id}, {content_hash: metadata} if metadata else None)
+
+    def mark_failed(self, content_hash: str, error: str) -> None:
+        self.record_results({content_hash: None}, errors={content_hash: error})
+
+    def batch_progress(self, batch_id: str) -> Dict[str, int]:
+        """一括投稿の状態別件数"""
+        db = self.session_factory()
+        try:
+            rows = db.query(PublishRecord.status, func.count(PublishRecord.id)).filter(
+                PublishRecord.site == self.site,
+                PublishRecord.batch_id == batch_id
+            ).group_by(PublishRecord.status).all()
+            return {status: count for status, count in rows}
+        finally:
+            db.close()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+記事生成クォータサービス
+API・パイプライン・Celeryワーカー間で共有されるスライディングウィンドウ型のクォータ管理
+"""
+
+import os
+import uuid
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, case, text
+
+from .database import SessionLocal, QuotaEvent
+
+logger = logging.getLogger(__name__)
+
+HOUR_SECONDS = 3600
+DAY_SECONDS = 86400
+
+# クォータの記録先（redis / database）。全プロセスで同じ値にすること
+QUOTA_BACKEND = os.getenv('QUOTA_BACKEND', 'redis').lower()
+
+# 予約・参照を1回のEVALSHAで行うLuaスクリプト
+# sorted set (member=トークン, score=取得時刻ms) で直近24時間の消費を保持する
+# 時刻はワーカー間の時計ずれを避けるためRedisサーバー時刻を使用
+_SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local hour_limit = tonumber(ARGV[1])
+local day_limit = tonumber(ARGV[2])
+local token = ARGV[3]
+local acquire = ARGV[4] == '1'
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - 86400000)
+local day_count = redis.call('ZCARD', key)
+local hour_count = redis.call('ZCOUNT', key, '(' .. (now - 3600000), '+inf')
+local allowed = hour_count < hour_limit and day_count < day_limit
+
+if acquire then
+    if not allowed then
+        return {0, hour_count, day_count}
+    end
+    redis.call('ZADD', key, now, token)
+    redis.call('PEXPIRE', key, 86400000)
+    return {1, hour_count + 1, day_count + 1}
+end
+
+if allowed then
+    return {1, hour_count, day_count}
+end
+return {0, hour_count, day_count}
+"""
+
+
+@dataclass
+class QuotaResult:
+    """クォータ判定結果"""
+    allowed: bool
+    hourly_count: int
+    daily_count: int
+    token: Optional[str] = None
+    available: bool = True  # False ならバックエンドに届かず判定できなかった（allowed も False）
+
+
+class RedisQuotaBackend:
+    """Redisの sorted set + Lua によるアトミックなスライディングウィンドウ"""
+
+    def __init__(self, redis_client, key_prefix: str = "quota"):
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self._script = redis_client.register_script(_SLIDING_WINDOW_SCRIPT)
+
+    def _key(self, quota_key: str) -> str:
+        return f"{self.key_prefix}:{quota_key}"
+
+    def check(self, quota_key: str, hour_limit: int, day_limit: int,
+              token: Optional[str] = None) -> QuotaResult:
+        """token 指定時は枠を予約、未指定時は参照のみ"""
+        allowed, hourly, daily = self._script(
+            keys=[self._key(quota_key)],
+            args=[hour_limit, day_limit, token or '', '1' if token else '0']
+        )
+        return QuotaResult(
+            allowed=bool(allowed),
+            hourly_count=int(hourly),
+            daily_count=int(daily),
+            token=token if token and allowed else None
+        )
+
+    def release(self, quota_key: str, token: str) -> None:
+        self.redis_client.zrem(self._key(quota_key), token)
+
+
+class DatabaseQuotaBackend:
+    """
+    quota_events テーブルによるスライディングウィンドウ
+
+    予約はロック付きトランザクション内で集計と挿入を行う
+    （SQLite: BEGIN IMMEDIATE / PostgreSQL: トランザクションアドバイザリロック）。
+    """
+
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory or SessionLocal
+
+    def _lock(self, db, quota_key: str) -> None:
+        dialect = db.bind.dialect.name
+        if dialect == 'sqlite':
+            db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+        elif dialect == 'postgresql':
+            db.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+                {"key": f"quota:{quota_key}"}
+            )
+
+    def _counts(self, db, quota_key: str, now: datetime):
+        hour_ago = now - timedelta(seconds=HOUR_SECONDS)
+        day_ago = now - timedelta(seconds=DAY_SECONDS)
+        daily, hourly = db.query(
+            func.count(QuotaEvent.id),
+            func.sum(case((QuotaEvent.created_at > hour_ago, 1), else_=0)),
+        ).filter(
+            QuotaEvent.quota_key == quota_key,
+            QuotaEvent.created_at > day_ago
+        ).one()
+        return int(hourly or 0), int(daily or 0)
+
+    def check(self, quota_key: str, hour_limit: int, day_limit: int,
+              token: Optional[str] = None) -> QuotaResult:
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            if token:
+                self._lock(db, quota_key)
+
+            hourly, daily = self._counts(db, quota_key, now)
+            allowed = hourly < hour_limit and daily < day_limit
+
+            if token and allowed:
+                # ウィンドウ外の記録を削除してから予約
+                db.query(QuotaEvent).filter(
+                    QuotaEvent.quota_key == quota_key,
+                    QuotaEvent.created_at <= now - timedelta(seconds=DAY_SECONDS)
+                ).delete(synchronize_session=False)
+                db.add(QuotaEvent(quota_key=quota_key, token=token, created_at=now))
+                hourly += 1
+                daily += 1
+
+            db.commit()
+            return QuotaResult(
+                allowed=allowed,
+                hourly_count=hourly,
+                daily_count=daily,
+                token=token if token and allowed else None
+            )
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def release(self, quota_key: str, token: str) -> None:
+        db = self.session_factory()
+        try:
+            db.query(QuotaEvent).filter(QuotaEvent.token == token).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+class QuotaService:
+    """
+    記事生成クォータ
+
+    直近1時間・直近24時間のスライディングウィンドウで上限を判定する。
+    acquire() で枠を予約し、生成に失敗した場合は release() で返却する。
+    記録先は QUOTA_BACKEND の1か所だけで、届かない場合は別の記録先で数えずに生成を止める（allowed=False）。
+    """
+
+    def __init__(self, max_per_hour: int, max_per_day: int,
+                 quota_key: str = "articles", backend=None):
+        self.max_per_hour = max_per_hour
+        self.max_per_day = max_per_day
+        self.quota_key = quota_key
+        self.backend = backend or get_quota_backend()
+
+    def _check(self, token: Optional[str] = None) -> QuotaResult:
+        try:
+            return self.backend.check(self.quota_key, self.max_per_hour, self.max_per_day, token)
+        except Exception as e:
+            logger.error(f"Quota backend unavailable, denying generation: {e}")
+            return QuotaResult(
+                allowed=False,
+                hourly_count=self.max_per_hour,
+                daily_count=self.max_per_day,
+                available=False
+            )
+
+    def peek(self) -> QuotaResult:
+        """現在の消費状況を取得（予約しない）"""
+        return self._check()
+
+    def acquire(self) -> QuotaResult:
+        """枠を1件予約（上限に達している場合は allowed=False）"""
+        return self._check(token=uuid.uuid4().hex)
+
+    def release(self, token: str) -> None:
+        """予約した枠を返却"""
+        try:
+            self.backend.release(self.quota_key, token)
+        except Exception as e:
+            # 返却できなかった枠はウィンドウから外れるまで消費扱いになる（多く数える側に倒れる）
+            logger.warning(f"Failed to release quota token: {e}")
+
+    def get_stats(self) -> dict:
+        """統計情報を取得"""
+        result = self.peek()
+        return {
+            'available': result.available,
+            'daily_count': result.daily_count,
+            'hourly_count': result.hourly_count,
+            'daily_remaining': max(0, self.max_per_day - result.daily_count),
+            'hourly_remaining': max(0, self.max_per_hour - result.hourly_count)
+        }
+
+
+# グローバルインスタンス
+_quota_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_quota_backend():
+    """
+    クォータバックエンドのシングルトンを取得（QUOTA_BACKEND で選ぶ）
+
+    起動時の接続可否では切り替えない。プロセスごとに別の記録先を数えると上限を超えて生成されるため。
+    """
+    global _quota_backend
+    if _quota_backend is None:
+        with _backend_lock:
+            if _quota_backend is None:
+                if QUOTA_BACKEND == 'redis':
+                    from redis import Redis
+                    client = Redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+                    _quota_backend = RedisQuotaBackend(client)
+                elif QUOTA_BACKEND == 'database':
+                    _quota_backend = DatabaseQuotaBackend()
+                else:
+                    raise ValueError(f"Unknown QUOTA_BACKEND: {QUOTA_BACKEND}")
+                logger.info(f"Quota service using {QUOTA_BACKEND} backend")
+    return _quota_backend
+
+
+def get_quota_service(max_per_hour: Optional[int] = None, max_per_day: Optional[int] = None) -> QuotaService:
+    """記事生成クォータサービスを取得（上限は未指定時に環境変数から）"""
+    return QuotaService(
+        max_per_hour=max_per_hour if max_per_hour is not None else int(os.getenv('MAX_ARTICLES_PER_HOUR', 10)),
+        max_per_day=max_per_day if max_per_day is not None else int(os.getenv('MAX_ARTICLES_PER_DAY', 50))
+    )
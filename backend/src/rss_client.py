@@ -11,6 +11,8 @@ from datetime import datetime, timezone
 from urllib.parse import urlparse
 import requests
 
+from .keyword_matcher import KeywordMatcher
+
 logger = logging.getLogger(__name__)
 
 class RSSClient:
@@ -53,6 +55,7 @@ class RSSClient:
                 "prediction", "forecast", "trend", "market", "price"
             ]
         }
+        self.urgency_matcher = KeywordMatcher(self.urgency_keywords)
     
     def get_feeds_from_db(self) -> Dict[str, str]:
         """データベースからアクティブなRSSフィードを取得"""
@@ -188,12 +191,8 @@ class RSSClient:
         """記事の重要度を計算"""
         text = (title + " " + summary).lower()
         
-        # 緊急度の高いキーワードをチェック
-        for urgency_level, keywords in self.urgency_keywords.items():
-            if any(keyword in text for keyword in keywords):
-                return urgency_level
-        
-        return "low"
+        # 緊急度の高いレベルから順に判定し、キーワードが含まれる最初のレベルで打ち切る
+        return self.urgency_matcher.first_group(text) or "low"
     
     def _extract_coins(self, text: str) -> List[str]:
         """テキストから暗号通貨シンボルを抽出"""
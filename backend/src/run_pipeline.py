@@ -13,6 +13,7 @@ from dotenv import load_dotenv
 
 # 自作モジュール
 from article_pipeline import ArticlePipeline, PipelineConfig
+from article_repository import get_article_repository
 from fact_checker import FactChecker
 from wordpress_publisher import ArticlePublisher
 
@@ -70,22 +71,25 @@ def run_demo():
     pipeline = ArticlePipeline(config)
     pipeline.run_once()
     
-    # 生成された記事をチェック
-    articles_dir = os.path.join(config.output_dir, 'articles')
-    if os.path.exists(articles_dir):
-        files = [f for f in os.listdir(articles_dir) if f.endswith('.html')]
-        if files:
-            print(f"\n✓ 記事が生成されました: {files[0]}")
-            
-            # ファクトチェックを実行
-            article_path = os.path.join(articles_dir, files[0])
-            with open(article_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            print("\nファクトチェック中...")
-            checker = FactChecker()
-            results = checker.check_article(content)
-            print(checker.generate_report(results))
+    # 生成された記事（記事リポジトリの最新の記事）をチェック
+    repository = get_article_repository()
+    db = repository.session_factory()
+    try:
+        articles, _ = repository.list_page(db, limit=1)
+        if articles:
+            print(f"\n✓ 記事が生成されました: {articles[0].title}")
+            content = repository.get_html(articles[0])
+        else:
+            content = None
+    finally:
+        db.close()
+    
+    if content:
+        # ファクトチェックを実行
+        print("\nファクトチェック中...")
+        checker = FactChecker()
+        results = checker.check_article(content)
+        print(checker.generate_report(results))
 
 
 def run_full_pipeline(args):
@@ -105,6 +109,7 @@ def run_full_pipeline(args):
     
     # パイプラインを実行
     pipeline = ArticlePipeline(config)
+    pipeline.attach_topic_journal()
     
     if args.once:
         # 1回だけ実行
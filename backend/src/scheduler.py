@@ -196,15 +196,56 @@ class TopicCollectionScheduler:
     async def _monitor_collection_task(self, task_id: str):
         """
         収集タスクの完了を監視
+        
+        SSEストリームで完了通知を待ち、利用できない場合のみポーリングする
         """
+        max_wait_time = 120  # 最大2分間待機
+        
+        headers = {}
+        if self.api_key:
+            headers["X-API-Key"] = self.api_key
+        
         try:
-            max_wait_time = 120  # 最大2分間待機
-            check_interval = 5   # 5秒間隔でチェック
-            
-            headers = {}
-            if self.api_key:
-                headers["X-API-Key"] = self.api_key
+            status = await asyncio.wait_for(
+                self._stream_task_status(task_id, headers),
+                timeout=max_wait_time
+            )
+            if status is not None:
+                self._log_task_result(task_id, status)
+                return
+        except asyncio.TimeoutError:
+            logger.warning(f"Collection task {task_id} did not finish within {max_wait_time} seconds")
+            return
+        except Exception as e:
+            logger.warning(f"Task event stream unavailable, falling back to polling: {e}")
+        
+        await self._poll_task_status(task_id, headers, max_wait_time)
+    
+    async def _stream_task_status(self, task_id: str, headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """SSEストリームからタスクの終了ステータスを受信"""
+        timeout = httpx.Timeout(10.0, read=None)
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            async with client.stream(
+                "GET",
+                f"{self.api_base_url}/api/events/stream",
+                params={"channels": "tasks", "task_id": task_id},
+                headers={**headers, "Accept": "text/event-stream"}
+            ) as response:
+                if response.status_code != 200:
+                    raise RuntimeError(f"HTTP {response.status_code}")
                 
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[len("data:"):].strip())
+                    if event.get('status') in ('completed', 'failed'):
+                        return event
+        return None
+    
+    async def _poll_task_status(self, task_id: str, headers: Dict[str, str], max_wait_time: int):
+        """ステータスAPIのポーリングで完了を監視（フォールバック）"""
+        check_interval = 5   # 5秒間隔でチェック
+        try:
             async with httpx.AsyncClient(timeout=10.0) as client:
                 for _ in range(max_wait_time // check_interval):
                     try:
@@ -215,13 +256,8 @@ class TopicCollectionScheduler:
                         
                         if response.status_code == 200:
                             task_status = response.json()
-                            status = task_status.get('status')
-                            
-                            if status == 'completed':
-                                logger.info(f"Collection task {task_id} completed successfully")
-                                break
-                            elif status == 'failed':
-                                logger.error(f"Collection task {task_id} failed: {task_status.get('error', 'Unknown error')}")
+                            if task_status.get('status') in ('completed', 'failed'):
+                                self._log_task_result(task_id, task_status)
                                 break
                             # pending or in_progress の場合は継続
                         
@@ -234,6 +270,13 @@ class TopicCollectionScheduler:
         except Exception as e:
             logger.warning(f"Task monitoring failed: {e}")
     
+    def _log_task_result(self, task_id: str, task_status: Dict[str, Any]):
+        """タスクの終了ステータスをログ出力"""
+        if task_status.get('status') == 'completed':
+            logger.info(f"Collection task {task_id} completed successfully")
+        else:
+            logger.error(f"Collection task {task_id} failed: {task_status.get('error', 'Unknown error')}")
+    
     def _job_executed(self, event):
         """ジョブ実行完了イベント"""
         logger.debug(f"Job {event.job_id} executed successfully")
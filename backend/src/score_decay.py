@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+スコアの時間減衰
+スコアを「ベーススコア × exp(-λ × 経過時間)」で表し、減衰後の順位を
+全件の再計算なしで取得できる索引を提供する
+"""
+
+import math
+import time
+import itertools
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# log() に渡すベーススコアの下限（0以下のスコアも順位付けできるように）
+_MIN_BASE_SCORE = 1e-9
+
+
+def decay_rate(half_life_hours: float) -> float:
+    """半減期（時間）から1秒あたりの減衰率 λ を求める"""
+    return math.log(2) / (half_life_hours * 3600)
+
+
+def decay_multiplier(age_seconds: float, half_life_hours: float) -> float:
+    """経過時間に対する減衰率（未来の時刻は減衰なし）"""
+    if age_seconds <= 0:
+        return 1.0
+    return 0.5 ** (age_seconds / (half_life_hours * 3600))
+
+
+class DecayingScoreIndex:
+    """
+    一様に指数減衰するスコアの降順索引
+
+    時刻 t に登録したベーススコア b の現在のスコアは b × exp(-λ(now - t))。
+    全要素が同じ λ で減衰するため、順位は log(b) + λt（時刻に依存しないキー）の
+    順位と常に一致する。キーは登録時に1回だけ計算してソート済みリストに挿入し、
+    読み出し時は上位から必要な件数だけ現在のスコアを計算する。
+
+    同じキーの要素は登録順に並ぶ。(キー, 登録番号) は要素ごとに一意で時間が経っても
+    変わらないため、position() をページングのカーソルに使える。
+    """
+
+    def __init__(self, half_life_hours: float, reference: Optional[float] = None):
+        self.half_life_hours = half_life_hours
+        self.rate = decay_rate(half_life_hours)
+        # キーの桁を小さく保つための基準時刻（UNIX秒）
+        self.reference = time.time() if reference is None else reference
+
+        # (符号反転したキー, 登録番号) を昇順に保持（先頭がスコア最大）
+        self._keys: List[Tuple[float, int]] = []
+        self._items: List[Any] = []
+        # id(item) → ((符号反転したキー, 登録番号), ベーススコア, 登録時刻)
+        self._entries: Dict[int, Tuple[Tuple[float, int], float, float]] = {}
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item: Any) -> bool:
+        return id(item) in self._entries
+
+    def key(self, base_score: float, timestamp: float) -> float:
+        """順位付け用のキー log(b) + λ(t - reference)"""
+        return math.log(max(base_score, _MIN_BASE_SCORE)) + self.rate * (timestamp - self.reference)
+
+    def score(self, base_score: float, timestamp: float, now: Optional[float] = None) -> float:
+        """時刻 now における減衰後のスコア"""
+        if now is None:
+            now = time.time()
+        return base_score * math.exp(-self.rate * (now - timestamp))
+
+    def add(self, item: Any, base_score: float, timestamp: float) -> None:
+        """要素を登録（登録済みの場合は置き換え）"""
+        self.remove(item)
+        sort_key = (-self.key(base_score, timestamp), next(self._sequence))
+        position = bisect_right(self._keys, sort_key)
+        self._keys.insert(position, sort_key)
+        self._items.insert(position, item)
+        self._entries[id(item)] = (sort_key, base_score, timestamp)
+
+    def remove(self, item: Any) -> bool:
+        """要素を削除（未登録なら False）"""
+        entry = self._entries.pop(id(item), None)
+        if entry is None:
+            return False
+        position = bisect_left(self._keys, entry[0])
+        del self._keys[position]
+        del self._items[position]
+        return True
+
+    def current_score(self, item: Any, now: Optional[float] = None) -> Optional[float]:
+        """登録済み要素の減衰後のスコア（未登録なら None）"""
+        entry = self._entries.get(id(item))
+        if entry is None:
+            return None
+        return self.score(entry[1], entry[2], now)
+
+    def position(self, item: Any) -> Optional[Tuple[float, int]]:
+        """登録済み要素の並び順の位置（iter_top の after に渡すと、その次から返す）"""
+        entry = self._entries.get(id(item))
+        return entry[0] if entry else None
+
+    def iter_top(self, min_score: Optional[float] = None, now: Optional[float] = None,
+                 after: Optional[Tuple[float, int]] = None) -> Iterator[Tuple[Any, float]]:
+        """
+        減衰後のスコアの降順に (要素, スコア) を返す
+
+        min_score を指定した場合、スコアが min_score 未満になった時点で打ち切る
+        （閾値もキーと同じ空間に変換して比較するため、評価するのは返す要素だけ）。
+        after を指定した場合はその位置より後ろから返す（二分探索で開始位置を求める）。
+        """
+        if now is None:
+            now = time.time()
+        limit = None
+        if min_score is not None and min_score > 0:
+            limit = -(math.log(min_score) + self.rate * (now - self.reference))
+
+        start = bisect_right(self._keys, tuple(after)) if after is not None else 0
+        for index in range(start, len(self._items)):
+            if limit is not None and self._keys[index][0] > limit:
+                break
+            item = self._items[index]
+            entry = self._entries[id(item)]
+            yield item, self.score(entry[1], entry[2], now)
+
+    def top(self, count: int, min_score: Optional[float] = None,
+            now: Optional[float] = None) -> List[Tuple[Any, float]]:
+        """減衰後のスコアの上位 count 件"""
+        result = []
+        if count <= 0:
+            return result
+        for pair in self.iter_top(min_score, now):
+            result.append(pair)
+            if len(result) >= count:
+                break
+        return result
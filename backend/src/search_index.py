@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+記事の全文検索索引
+SQLite では FTS5（trigram トークナイザ）、PostgreSQL では pg_trgm の GIN インデックスを使い、
+日本語を含む部分一致検索を全件走査なしで行う。索引は挿入・更新・削除に合わせてデータベース側で更新される。
+trigram で引けない2文字の語（「規制」「暴落」など）は、記事に含まれる2文字の組（bigram）の索引で引く
+"""
+
+import os
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .database import Article
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'articles_fts'
+# bigram 索引（SQLite）: 記事ごとの bigram の集合と、索引に反映していない記事のID
+BIGRAM_TABLE = 'articles_bigram'
+BIGRAM_PENDING_TABLE = 'articles_bigram_pending'
+
+# trigram 索引で引ける最短の検索語（2文字の語は bigram 索引、1文字の語は索引を使わない部分一致になる）
+MIN_INDEXED_TERM = 3
+BIGRAM_TERM = 2
+
+# bigram 索引に一度に反映する記事数
+BIGRAM_SYNC_BATCH = 500
+
+# 関連度で並べる候補数（一致した記事のうち新しいものから）
+RANK_WINDOW = int(os.getenv('SEARCH_RANK_WINDOW', 200))
+
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"title, content, content='articles', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON articles BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON articles BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) "
+    f"VALUES ('delete', old.id, old.title, old.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, content ON articles BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) "
+    f"VALUES ('delete', old.id, old.title, old.content); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+]
+
+# bigram の計算はアプリ側で行う（トリガーはアプリ定義の関数を呼べないため、変更のあった記事IDだけを記録する）
+SQLITE_BIGRAM_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {BIGRAM_TABLE} USING fts5("
+    f"grams, tokenize='unicode61 remove_diacritics 0')",
+    f"CREATE TABLE IF NOT EXISTS {BIGRAM_PENDING_TABLE} (article_id INTEGER PRIMARY KEY)",
+    f"CREATE TRIGGER IF NOT EXISTS {BIGRAM_TABLE}_ai AFTER INSERT ON articles BEGIN "
+    f"INSERT OR IGNORE INTO {BIGRAM_PENDING_TABLE}(article_id) VALUES (new.id); END",
+    f"CREATE TRIGGER IF NOT EXISTS {BIGRAM_TABLE}_ad AFTER DELETE ON articles BEGIN "
+    f"INSERT OR IGNORE INTO {BIGRAM_PENDING_TABLE}(article_id) VALUES (old.id); END",
+    f"CREATE TRIGGER IF NOT EXISTS {BIGRAM_TABLE}_au AFTER UPDATE OF title, content ON articles BEGIN "
+    f"INSERT OR IGNORE INTO {BIGRAM_PENDING_TABLE}(article_id) VALUES (new.id); END",
+]
+
+# 記事（タイトル + 本文）の bigram 配列。インデックスと検索で同じ式を使う
+POSTGRES_BIGRAM_EXPRESSION = "article_bigrams(coalesce(a.title, '') || E'\\n' || coalesce(a.content, ''))"
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_articles_title_trgm ON articles USING gin (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_articles_content_trgm ON articles USING gin (content gin_trgm_ops)",
+    "CREATE OR REPLACE FUNCTION article_bigrams(body text) RETURNS text[] "
+    "LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ "
+    "SELECT coalesce(array_agg(DISTINCT substr(lower(body), i, 2)), '{}') "
+    "FROM generate_series(1, length(body) - 1) AS i $$",
+    "CREATE INDEX IF NOT EXISTS ix_articles_bigrams ON articles "
+    "USING gin (article_bigrams(coalesce(title, '') || E'\\n' || coalesce(content, '')))",
+]
+
+# 索引が使えるかどうか（エンジンのURLごと）
+_available = {}
+
+
+def split_terms(query: str) -> List[str]:
+    """空白区切りの検索語（すべてを含む記事が対象）"""
+    return [term for term in query.split() if term]
+
+
+def _fts_phrase(term: str) -> str:
+    """FTS5 のフレーズ（記号を演算子として解釈させない）"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _is_bigram_term(term: str) -> bool:
+    return len(term) == BIGRAM_TERM and term.isalnum()
+
+
+def bigrams(value: Optional[str]) -> List[str]:
+    """文字列に含まれる2文字の組（英数字・かな・漢字の並びのみ、小文字、重複なし）"""
+    value = (value or '').lower()
+    return sorted({a + b for a, b in zip(value, value[1:]) if a.isalnum() and b.isalnum()})
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def install_search_index(bind) -> bool:
+    """検索索引を作成（作成済みなら何もしない）。使えない環境では False"""
+    dialect = bind.dialect.name
+    try:
+        if dialect == 'sqlite':
+            with bind.begin() as conn:
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {'name': FTS_TABLE}
+                ).first()
+                bigram_exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {'name': BIGRAM_TABLE}
+                ).first()
+                for statement in SQLITE_DDL + SQLITE_BIGRAM_DDL:
+                    conn.execute(text(statement))
+                if not exists:
+                    # 既存の記事を索引に登録
+                    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+                if not bigram_exists:
+                    conn.execute(text(
+                        f"INSERT OR IGNORE INTO {BIGRAM_PENDING_TABLE}(article_id) SELECT id FROM articles"
+                    ))
+            sync_bigram_index(bind)
+            _available[f"{bind.url}#bigram"] = True
+        elif dialect == 'postgresql':
+            with bind.begin() as conn:
+                for statement in POSTGRES_DDL:
+                    conn.execute(text(statement))
+        else:
+            logger.warning(f"Full-text search index is not supported on {dialect}")
+            return False
+    except Exception as e:
+        # FTS5 の trigram は SQLite 3.34 以降、pg_trgm は拡張の作成権限が必要
+        logger.warning(f"Failed to install article search index: {e}")
+        _available[str(bind.url)] = False
+        return False
+    _available[str(bind.url)] = True
+    return True
+
+
+def _bigram_index_available(db: Session) -> bool:
+    bind = db.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return False
+    key = f"{bind.url}#bigram"
+    if key not in _available:
+        _available[key] = db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': BIGRAM_PENDING_TABLE}
+        ).first() is not None
+    return _available[key]
+
+
+def sync_bigram_index(bind) -> int:
+    """
+    変更のあった記事の bigram を索引に反映する（SQLite。2文字の語を検索する前に呼ぶ）
+
+    書き込みは BEGIN IMMEDIATE で1プロセスずつ行う。戻り値は反映した記事数。
+    """
+    synced = 0
+    with bind.connect() as conn:
+        if conn.execute(text(f"SELECT max(article_id) FROM {BIGRAM_PENDING_TABLE}")).scalar() is None:
+            return 0
+        while True:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            rows = conn.execute(text(
+                f"SELECT p.article_id, a.id, a.title, a.content FROM {BIGRAM_PENDING_TABLE} p "
+                f"LEFT JOIN articles a ON a.id = p.article_id LIMIT :batch"
+            ), {'batch': BIGRAM_SYNC_BATCH}).all()
+            if not rows:
+                conn.commit()
+                break
+            ids = ','.join(str(int(row[0])) for row in rows)
+            conn.execute(text(f"DELETE FROM {BIGRAM_TABLE} WHERE rowid IN ({ids})"))
+            grams = [
+                {'rowid': row[1], 'grams': ' '.join(bigrams(f"{row[2] or ''}\n{row[3] or ''}"))}
+                for row in rows if row[1] is not None
+            ]
+            if grams:
+                conn.execute(text(f"INSERT INTO {BIGRAM_TABLE}(rowid, grams) VALUES (:rowid, :grams)"), grams)
+            conn.execute(text(f"DELETE FROM {BIGRAM_PENDING_TABLE} WHERE article_id IN ({ids})"))
+            conn.commit()
+            synced += len(rows)
+            if len(rows) < BIGRAM_SYNC_BATCH:
+                break
+    return synced
+
+
+def _index_available(db: Session) -> bool:
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _available:
+        if bind.dialect.name == 'sqlite':
+            _available[key] = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': FTS_TABLE}
+            ).first() is not None
+        elif bind.dialect.name == 'postgresql':
+            _available[key] = db.execute(
+                text("SELECT 1 FROM pg_indexes WHERE indexname = 'ix_articles_content_trgm'")
+            ).first() is not None
+        else:
+            _available[key] = False
+        if not _available[key]:
+            logger.warning("Article search index not installed; falling back to ILIKE scan")
+    return _available[key]
+
+
+def _filters(status: Optional[str], article_type: Optional[str]) -> Tuple[str, dict]:
+    clauses, params = [], {}
+    if status:
+        clauses.append("a.status = :status")
+        params['status'] = status
+    if article_type:
+        clauses.append("a.type = :article_type")
+        params['article_type'] = article_type
+    return ''.join(f" AND {clause}" for clause in clauses), params
+
+
+def _short_term_filters(terms: List[str], params: dict) -> str:
+    # 索引で引けない語は、索引で絞り込んだ候補（または記事本体）に対する LIKE で判定する
+    where = ''
+    for i, term in enumerate(terms):
+        where += f" AND (a.title LIKE :short{i} ESCAPE '\\' OR a.content LIKE :short{i} ESCAPE '\\')"
+        params[f'short{i}'] = _like_pattern(term)
+    return where
+
+
+def _ranked_page(db: Session, candidates: str, rowid: str, score: str, params: dict,
+                 limit: int, offset: int) -> List[int]:
+    """
+    一致した記事の新しい RANK_WINDOW 件（rowid の降順）を関連度順に並べ、その後ろに残りを新しい順に続ける
+
+    順序は offset によらず同じなので、ページをまたいで記事が重複・欠落しない。
+    """
+    rows = db.execute(text(
+        f"SELECT a.id, a.generated_at, {score} AS score {candidates} "
+        f"ORDER BY {rowid} DESC LIMIT :window"
+    ), {**params, 'window': RANK_WINDOW}).all()
+    # 候補は RANK_WINDOW 件までなので、関連度順の並べ替えはアプリ側で行う
+    ranked = sorted(rows, key=lambda row: (row.score or 0, str(row.generated_at or ''), row.id), reverse=True)
+    window = [row.id for row in ranked]
+
+    page = window[offset:offset + limit]
+    if len(window) < RANK_WINDOW or len(page) == limit:
+        return page
+
+    # 関連度で並べる範囲の外は rowid（= 記事ID）の降順
+    tail = db.execute(text(
+        f"SELECT a.id {candidates} AND {rowid} < :boundary "
+        f"ORDER BY {rowid} DESC LIMIT :limit OFFSET :offset"
+    ), {
+        **params,
+        'boundary': min(window),
+        'limit': limit - len(page),
+        'offset': max(0, offset - RANK_WINDOW),
+    })
+    return page + [row[0] for row in tail]
+
+
+def _title_score(terms: List[str], params: dict) -> str:
+    """タイトルに含む検索語の数"""
+    hits = []
+    for i, term in enumerate(terms):
+        params[f'title{i}'] = _like_pattern(term)
+        hits.append(f"(a.title LIKE :title{i} ESCAPE '\\')")
+    return ' + '.join(hits)
+
+
+def _sqlite_ids(db: Session, terms: List[str], status, article_type, limit: int, offset: int) -> List[int]:
+    indexed = [term for term in terms if len(term) >= MIN_INDEXED_TERM]
+    use_bigrams = _bigram_index_available(db)
+    paired = [term for term in terms if use_bigrams and _is_bigram_term(term)]
+    short = [term for term in terms if term not in indexed and term not in paired]
+    where, params = _filters(status, article_type)
+    where += _short_term_filters(short, params)
+
+    if not indexed and not paired:
+        # 新しい順（主キーの降順）に走査し、limit 件見つかった時点で止める
+        params.update({'limit': limit, 'offset': offset})
+        sql = (
+            f"SELECT a.id FROM articles a WHERE 1 = 1{where} "
+            f"ORDER BY a.id DESC LIMIT :limit OFFSET :offset"
+        )
+        return [row[0] for row in db.execute(text(sql), params)]
+
+    if paired:
+        sync_bigram_index(db.get_bind())
+        params['bigrams'] = ' '.join(_fts_phrase(term.lower()) for term in paired)
+
+    # FTS5 は rowid 順に一致を返すので、よく出る語でも処理は候補数に比例する
+    # （bm25 は一致した全記事の統計を取るため、ヒット数に比例して遅くなる）
+    if indexed:
+        params['match'] = ' '.join(_fts_phrase(term) for term in indexed)
+        rowid = f"{FTS_TABLE}.rowid"
+        candidates = (
+            f"FROM {FTS_TABLE} JOIN articles a ON a.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :match{where}"
+        )
+        if paired:
+            candidates += (
+                f" AND a.id IN (SELECT rowid FROM {BIGRAM_TABLE} WHERE {BIGRAM_TABLE} MATCH :bigrams)"
+            )
+    else:
+        rowid = f"{BIGRAM_TABLE}.rowid"
+        candidates = (
+            f"FROM {BIGRAM_TABLE} JOIN articles a ON a.id = {BIGRAM_TABLE}.rowid "
+            f"WHERE {BIGRAM_TABLE} MATCH :bigrams{where}"
+        )
+    return _ranked_page(db, candidates, rowid, _title_score(terms, params), params, limit, offset)
+
+
+def _postgres_ids(db: Session, terms: List[str], status, article_type, limit: int, offset: int) -> List[int]:
+    where, params = _filters(status, article_type)
+    for i, term in enumerate(terms):
+        where += f" AND (a.title ILIKE :term{i} OR a.content ILIKE :term{i})"
+        params[f'term{i}'] = _like_pattern(term)
+    # trigram で引けない2文字の語は bigram 配列の GIN インデックスで絞り込む
+    bigrams = [term.lower() for term in terms if _is_bigram_term(term)]
+    if bigrams and not any(len(term) >= MIN_INDEXED_TERM for term in terms):
+        where += f" AND {POSTGRES_BIGRAM_EXPRESSION} @> CAST(:bigrams AS text[])"
+        params['bigrams'] = bigrams
+    params['query'] = ' '.join(terms)
+    candidates = f"FROM articles a WHERE 1 = 1{where}"
+    return _ranked_page(
+        db, candidates, 'a.id', 'similarity(a.title, :query)', params, limit, offset
+    )
+
+
+def search_articles(db: Session, query: str, limit: int = 20, offset: int = 0,
+                    status: Optional[str] = None, article_type: Optional[str] = None) -> List[Article]:
+    """
+    タイトルと本文の部分一致検索（関連度順）
+
+    空白区切りの語をすべて含む記事を、一致した記事のうち新しい RANK_WINDOW 件はタイトルでの一致を優先し、
+    それより古い一致は新しい順に返す（offset によらず同じ順序）。
+    """
+    terms = split_terms(query)
+    if not terms:
+        return []
+
+    dialect = db.get_bind().dialect.name
+    if not _index_available(db):
+        articles = db.query(Article)
+        for term in terms:
+            pattern = _like_pattern(term)
+            articles = articles.filter(
+                Article.title.ilike(pattern, escape='\\') | Article.content.ilike(pattern, escape='\\')
+            )
+        if status:
+            articles = articles.filter(Article.status == status)
+        if article_type:
+            articles = articles.filter(Article.type == article_type)
+        return articles.order_by(Article.generated_at.desc()).offset(offset).limit(limit).all()
+
+    if dialect == 'sqlite':
+        ids = _sqlite_ids(db, terms, status, article_type, limit, offset)
+    else:
+        ids = _postgres_ids(db, terms, status, article_type, limit, offset)
+    if not ids:
+        return []
+
+    # 関連度順を保ったまま記事を読み込む
+    by_id = {article.id: article for article in db.query(Article).filter(Article.id.in_(ids))}
+    return [by_id[article_id] for article_id in ids if article_id in by_id]
+
+
+def rebuild_search_index(bind) -> None:
+    """索引を作り直す（SQLite のみ。PostgreSQL のインデックスは常に最新）"""
+    if bind.dialect.name == 'sqlite':
+        with bind.begin() as conn:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+            conn.execute(text(f"DELETE FROM {BIGRAM_TABLE}"))
+            conn.execute(text(
+                f"INSERT OR IGNORE INTO {BIGRAM_PENDING_TABLE}(article_id) SELECT id FROM articles"
+            ))
+        sync_bigram_index(bind)
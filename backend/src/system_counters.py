@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+システム統計のカウンター
+トピック・記事・テンプレートの件数を system_counters テーブルに保持し、データベースのトリガーで
+挿入・削除・状態変更のたびに増減させる。統計は COUNT(*) ではなくカウンターを1回のクエリで読む
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, SystemCounter, Topic, Article, ArticleTemplate
+
+logger = logging.getLogger(__name__)
+
+COUNTER_TABLE = 'system_counters'
+
+# 統計APIがカウンターを読み直す間隔（秒）
+STATS_CACHE_SECONDS = float(os.getenv('STATS_CACHE_SECONDS', 5))
+
+# テーブルごとのカウンター: (監視する列, [(カウンター名の式, 数える行の条件)])
+# {r} は行（new / old / 集計時のテーブル別名）、{false} {true} {day} は方言ごとの表記に置き換える
+COUNTER_RULES = {
+    'topics': (['processed'], [
+        ("'topics_total'", "1 = 1"),
+        ("'topics_unprocessed'", "{r}.processed = {false}"),
+    ]),
+    'articles': (['status', 'generated_at'], [
+        ("'articles_total'", "1 = 1"),
+        ("'articles_status:' || {r}.status", "{r}.status IS NOT NULL"),
+        ("'articles_generated:' || {day}", "{r}.generated_at IS NOT NULL"),
+    ]),
+    'article_templates': (['is_active'], [
+        ("'templates_active'", "{r}.is_active = {true}"),
+    ]),
+}
+
+_DIALECT_TERMS = {
+    'sqlite': {'false': '0', 'true': '1', 'day': "date({r}.generated_at)"},
+    'postgresql': {'false': 'FALSE', 'true': 'TRUE', 'day': "to_char({r}.generated_at, 'YYYY-MM-DD')"},
+}
+
+# カウンターが使えるかどうか（エンジンのURLごと）
+_available = {}
+
+
+def status_counter(status: str) -> str:
+    return f"articles_status:{status}"
+
+
+def generated_counter(day) -> str:
+    """生成日（UTC）ごとの記事数のカウンター名"""
+    return f"articles_generated:{day.isoformat()}"
+
+
+def _expand(expression: str, dialect: str, row: str) -> str:
+    terms = _DIALECT_TERMS[dialect]
+    return expression.format(
+        r=row, false=terms['false'], true=terms['true'], day=terms['day'].format(r=row)
+    )
+
+
+def _bump(dialect: str, name: str, condition: str, row: str, delta: int) -> str:
+    """条件を満たす行についてカウンターを delta だけ増減する文（なければ作る）"""
+    return (
+        f"INSERT INTO {COUNTER_TABLE} (name, value) "
+        f"SELECT {_expand(name, dialect, row)}, {delta} WHERE {_expand(condition, dialect, row)} "
+        f"ON CONFLICT (name) DO UPDATE SET value = {COUNTER_TABLE}.value + excluded.value;"
+    )
+
+
+def trigger_names(dialect: str) -> List[str]:
+    if dialect == 'postgresql':
+        return [f"{COUNTER_TABLE}_{table}" for table in COUNTER_RULES]
+    return [f"{COUNTER_TABLE}_{table}_{suffix}" for table in COUNTER_RULES for suffix in ('ai', 'ad', 'au')]
+
+
+def trigger_ddl(dialect: str) -> List[str]:
+    """カウンターを保守するトリガーのDDL（SQLite / PostgreSQL）"""
+    statements = []
+    for table, (columns, rules) in COUNTER_RULES.items():
+        on_insert = ' '.join(_bump(dialect, name, cond, 'new', 1) for name, cond in rules)
+        on_delete = ' '.join(_bump(dialect, name, cond, 'old', -1) for name, cond in rules)
+        if dialect == 'sqlite':
+            changed = ' OR '.join(f"old.{column} IS NOT new.{column}" for column in columns)
+            prefix = f"{COUNTER_TABLE}_{table}"
+            statements += [
+                f"CREATE TRIGGER IF NOT EXISTS {prefix}_ai AFTER INSERT ON {table} BEGIN {on_insert} END",
+                f"CREATE TRIGGER IF NOT EXISTS {prefix}_ad AFTER DELETE ON {table} BEGIN {on_delete} END",
+                f"CREATE TRIGGER IF NOT EXISTS {prefix}_au AFTER UPDATE OF {', '.join(columns)} ON {table} "
+                f"WHEN {changed} BEGIN {on_delete} {on_insert} END",
+            ]
+        elif dialect == 'postgresql':
+            changed = ' OR '.join(f"OLD.{column} IS DISTINCT FROM NEW.{column}" for column in columns)
+            function = f"{COUNTER_TABLE}_{table}_fn"
+            statements += [
+                f"CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$ BEGIN "
+                f"IF TG_OP IN ('DELETE', 'UPDATE') AND (TG_OP = 'DELETE' OR {changed}) THEN {on_delete} END IF; "
+                f"IF TG_OP IN ('INSERT', 'UPDATE') AND (TG_OP = 'INSERT' OR {changed}) THEN {on_insert} END IF; "
+                f"RETURN NULL; END $$ LANGUAGE plpgsql",
+                f"DROP TRIGGER IF EXISTS {COUNTER_TABLE}_{table} ON {table}",
+                f"CREATE TRIGGER {COUNTER_TABLE}_{table} AFTER INSERT OR UPDATE OR DELETE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION {function}()",
+            ]
+    return statements
+
+
+def drop_trigger_ddl(dialect: str) -> List[str]:
+    if dialect == 'postgresql':
+        statements = []
+        for table in COUNTER_RULES:
+            statements += [
+                f"DROP TRIGGER IF EXISTS {COUNTER_TABLE}_{table} ON {table}",
+                f"DROP FUNCTION IF EXISTS {COUNTER_TABLE}_{table}_fn()",
+            ]
+        return statements
+    return [f"DROP TRIGGER IF EXISTS {name}" for name in trigger_names(dialect)]
+
+
+def rebuild_counters(conn) -> None:
+    """カウンターを元のテーブルから数え直す（トリガー導入時・修復用）"""
+    dialect = conn.dialect.name
+    conn.execute(text(f"DELETE FROM {COUNTER_TABLE}"))
+    for table, (_, rules) in COUNTER_RULES.items():
+        for name, condition in rules:
+            conn.execute(text(
+                f"INSERT INTO {COUNTER_TABLE} (name, value) "
+                f"SELECT counter, COUNT(*) FROM ("
+                f"SELECT {_expand(name, dialect, 't')} AS counter FROM {table} t "
+                f"WHERE {_expand(condition, dialect, 't')}"
+                f") AS counted GROUP BY counter"
+            ))
+
+
+def _triggers_installed(conn) -> bool:
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        found = conn.execute(
+            text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE :prefix"),
+            {'prefix': f"{COUNTER_TABLE}_%"}
+        ).scalar()
+    elif dialect == 'postgresql':
+        found = conn.execute(
+            text("SELECT COUNT(*) FROM pg_trigger WHERE tgname LIKE :prefix"),
+            {'prefix': f"{COUNTER_TABLE}_%"}
+        ).scalar()
+    else:
+        return False
+    return found == len(trigger_names(dialect))
+
+
+def install_system_counters(bind) -> bool:
+    """カウンターのトリガーを作成し、初回は件数を数えて初期化する。使えない環境では False"""
+    dialect = bind.dialect.name
+    if dialect not in _DIALECT_TERMS:
+        logger.warning(f"System counters are not supported on {dialect}")
+        _available[str(bind.url)] = False
+        return False
+    try:
+        with bind.begin() as conn:
+            installed = _triggers_installed(conn)
+            if not installed:
+                for statement in trigger_ddl(dialect):
+                    conn.execute(text(statement))
+                rebuild_counters(conn)
+    except Exception as e:
+        logger.warning(f"Failed to install system counters: {e}")
+        _available[str(bind.url)] = False
+        return False
+    _available[str(bind.url)] = True
+    return True
+
+
+def _counters_available(db: Session) -> bool:
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _available:
+        _available[key] = _triggers_installed(db.connection())
+        if not _available[key]:
+            logger.warning("System counters not installed; falling back to COUNT queries")
+    return _available[key]
+
+
+def _count_fallback(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """トリガーがない場合の数え方（従来どおりの COUNT(*)）"""
+    values = {}
+    for name in names:
+        if name == 'topics_total':
+            values[name] = db.query(Topic).count()
+        elif name == 'topics_unprocessed':
+            values[name] = db.query(Topic).filter(Topic.processed == False).count()
+        elif name == 'articles_total':
+            values[name] = db.query(Article).count()
+        elif name.startswith('articles_status:'):
+            values[name] = db.query(Article).filter(Article.status == name.split(':', 1)[1]).count()
+        elif name.startswith('articles_generated:'):
+            day = datetime.fromisoformat(name.split(':', 1)[1])
+            values[name] = db.query(Article).filter(
+                Article.generated_at >= day, Article.generated_at < day + timedelta(days=1)
+            ).count()
+        elif name == 'templates_active':
+            values[name] = db.query(ArticleTemplate).filter(ArticleTemplate.is_active == True).count()
+        else:
+            values[name] = 0
+    return values
+
+
+def read_counters(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """カウンターの値を1回のクエリで読む（まだ数えていないカウンターは 0）"""
+    names = list(names)
+    if not _counters_available(db):
+        return _count_fallback(db, names)
+    rows = db.query(SystemCounter.name, SystemCounter.value).filter(SystemCounter.name.in_(names)).all()
+    values = {name: 0 for name in names}
+    values.update({name: int(value) for name, value in rows})
+    return values
+
+
+def read_system_stats(db: Session) -> dict:
+    """DatabaseUtils.get_system_stats と同じ形式の統計"""
+    counters = read_counters(db, [
+        'topics_total', 'topics_unprocessed', 'articles_total',
+        status_counter('published'), status_counter('draft'),
+    ])
+    return {
+        'total_topics': counters['topics_total'],
+        'total_articles': counters['articles_total'],
+        'published_articles': counters[status_counter('published')],
+        'draft_articles': counters[status_counter('draft')],
+        'unprocessed_topics': counters['topics_unprocessed'],
+    }
+
+
+class CounterCache:
+    """
+    カウンターの読み取りキャッシュ
+
+    ダッシュボードのポーリングがそれぞれデータベースに届かないよう、
+    同じカウンターの組は ttl_seconds の間プロセス内の値を返す。
+    """
+
+    def __init__(self, session_factory=None, ttl_seconds: float = STATS_CACHE_SECONDS):
+        self.session_factory = session_factory or SessionLocal
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Tuple[str, ...], Tuple[float, Dict[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, names: Iterable[str]) -> Dict[str, int]:
+        key = tuple(sorted(names))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+
+        db = self.session_factory()
+        try:
+            values = read_counters(db, key)
+        finally:
+            db.close()
+
+        with self._lock:
+            # 日付ごとのカウンター名は毎日変わるので、期限切れの組は捨てる
+            self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+            self._entries[key] = (now + self.ttl_seconds, values)
+        return values
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# グローバルインスタンス
+_counter_cache: Optional[CounterCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_counter_cache() -> CounterCache:
+    """カウンターキャッシュのシングルトンを取得"""
+    global _counter_cache
+    if _counter_cache is None:
+        with _cache_lock:
+            if _counter_cache is None:
+                _counter_cache = CounterCache()
+    return _counter_cache
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+タスク履歴の永続化
+Celeryタスクのライフサイクルをバッファリングしてまとめて
+GenerationTaskテーブルへ書き込み、タスク種別ごとの統計を提供する
+"""
+
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, case
+
+from .database import SessionLocal, GenerationTask
+
+logger = logging.getLogger(__name__)
+
+# タスク種別
+TASK_TYPE_ARTICLE_GENERATION = 'article_generation'
+TASK_TYPE_TOPIC_COLLECTION = 'topic_collection'
+TASK_TYPE_FACT_CHECK = 'fact_check'
+
+# Redisステータス → GenerationTask.status
+STATUS_MAP = {
+    'pending': 'pending',
+    'started': 'in_progress',
+    'progress': 'in_progress',
+    'completed': 'completed',
+    'failed': 'failed',
+}
+
+TERMINAL_STATUSES = {'completed', 'failed'}
+
+# result に含めないステータス項目
+_STATUS_FIELDS = {
+    'status', 'progress', 'message', 'error', 'topic_id',
+    'started_at', 'completed_at', 'failed_at',
+}
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_task_values(task_type: str, data: Dict[str, Any],
+                      started_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """ステータスデータをGenerationTaskのカラム値に変換"""
+    status = data.get('status', 'pending')
+    values: Dict[str, Any] = {
+        'task_type': task_type,
+        'status': STATUS_MAP.get(status, status),
+    }
+
+    if 'progress' in data:
+        values['progress'] = data['progress']
+    elif status == 'completed':
+        values['progress'] = 100
+
+    started = _parse_datetime(data.get('started_at')) or started_at
+    if started:
+        values['started_at'] = started
+
+    finished = _parse_datetime(data.get('completed_at') or data.get('failed_at'))
+    if finished:
+        values['completed_at'] = finished
+
+    if data.get('error'):
+        values['error_message'] = data['error']
+
+    result = {k: v for k, v in data.items() if k not in _STATUS_FIELDS}
+    if status == 'completed' and result:
+        values['result'] = result
+
+    return values
+
+
+class TaskHistoryWriter:
+    """
+    GenerationTaskへのバッファ付きバッチライター
+
+    同一タスクの更新はバッファ内でまとめられ、以下のいずれかで一括書き込みされる:
+    - タスクが終了ステータスになったとき
+    - バッファ内のタスク数が max_buffer に達したとき
+    - flush_interval 秒ごとのバックグラウンドフラッシュ
+
+    書き込みに失敗した後は、バックグラウンドフラッシュが成功するまでタスクのスレッドでは書き込まない
+    （データベース障害中に record() のたびに失敗する書き込みを繰り返さない）。
+    バッファは max_pending 件までで、超えた分は終了していない古いタスクから捨てる。
+    """
+
+    def __init__(self, flush_interval: float = 2.0, max_buffer: int = 100, session_factory=None,
+                 max_pending: int = 1000):
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_pending = max(max_pending, max_buffer)
+        self.session_factory = session_factory or SessionLocal
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._healthy = True
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def record(self, task_id: str, task_type: str, data: Dict[str, Any],
+               started_at: Optional[datetime] = None,
+               parameters: Optional[Dict[str, Any]] = None) -> None:
+        """タスクの状態更新をバッファに追加"""
+        values = build_task_values(task_type, data, started_at)
+        if parameters is not None:
+            values['parameters'] = parameters
+
+        with self._lock:
+            pending = self._pending.setdefault(task_id, {'task_id': task_id})
+            # 開始時刻は最初の値を保持
+            if 'started_at' in pending:
+                values.pop('started_at', None)
+            pending.update(values)
+            self._trim()
+            should_flush = self._healthy and (
+                values['status'] in TERMINAL_STATUSES or
+                len(self._pending) >= self.max_buffer
+            )
+
+        self._ensure_thread()
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> int:
+        """バッファの内容をまとめて書き込み"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = self._pending
+                self._pending = {}
+
+            db = self.session_factory()
+            try:
+                existing = dict(
+                    db.query(GenerationTask.task_id, GenerationTask.id)
+                    .filter(GenerationTask.task_id.in_(list(batch.keys())))
+                    .all()
+                )
+
+                inserts: List[Dict[str, Any]] = []
+                updates: List[Dict[str, Any]] = []
+                for task_id, values in batch.items():
+                    if task_id in existing:
+                        updates.append({'id': existing[task_id], **values})
+                    else:
+                        inserts.append(values)
+
+                if inserts:
+                    db.bulk_insert_mappings(GenerationTask, inserts)
+                if updates:
+                    db.bulk_update_mappings(GenerationTask, updates)
+                db.commit()
+                with self._lock:
+                    self._healthy = True
+                    dropped, self._dropped = self._dropped, 0
+                if dropped:
+                    logger.warning(f"Task history writes recovered; {dropped} task records were dropped")
+                return len(batch)
+
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Failed to flush {len(batch)} task records: {e}")
+                # 失敗分をバッファの先頭（古い側）へ戻す（新しい更新を優先）
+                with self._lock:
+                    self._healthy = False
+                    restored = {}
+                    for task_id, values in batch.items():
+                        restored[task_id] = {**values, **self._pending.get(task_id, {})}
+                    for task_id, values in self._pending.items():
+                        restored.setdefault(task_id, values)
+                    self._pending = restored
+                    self._trim()
+                return 0
+
+            finally:
+                db.close()
+
+    def _trim(self) -> None:
+        """バッファが max_pending を超えた分を捨てる（終了していない古いタスクから。_lock を持って呼ぶ）"""
+        excess = len(self._pending) - self.max_pending
+        if excess <= 0:
+            return
+        running = [task_id for task_id, values in self._pending.items()
+                   if values.get('status') not in TERMINAL_STATUSES]
+        finished = [task_id for task_id, values in self._pending.items()
+                    if values.get('status') in TERMINAL_STATUSES]
+        # 終了したタスクだけで上限を超える場合は、それも古い順に捨てる
+        dropped = (running + finished)[:excess]
+        for task_id in dropped:
+            del self._pending[task_id]
+        # 警告は書き込みが回復するまでに1回だけ（件数は回復時に記録）
+        if not self._dropped:
+            logger.warning(
+                f"Task history buffer is full ({self.max_pending}); dropping unwritten task records"
+            )
+        self._dropped += len(dropped)
+
+    def close(self) -> None:
+        """バックグラウンドフラッシュを停止して残りを書き込み"""
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+
+    def _ensure_thread(self) -> None:
+        # fork後の子プロセスではスレッドを作り直す
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, name="task-history-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Background task flush failed: {e}")
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """線形補間による百分位数（percentile_contと同じ定義）"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * weight
+
+
+def get_task_stats(db, hours: int = 24, task_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    タスク種別ごとのスループット・失敗率・所要時間（p50/p95）を集計
+
+    (task_type, created_at) インデックスで期間を絞り込み、
+    PostgreSQLでは所要時間の百分位数もDB側で計算する。
+    """
+    since = datetime.utcnow() - timedelta(hours=hours)
+    filters = [GenerationTask.created_at >= since]
+    if task_type:
+        filters.append(GenerationTask.task_type == task_type)
+
+    counts = (
+        db.query(
+            GenerationTask.task_type,
+            func.count(GenerationTask.id),
+            func.sum(case((GenerationTask.status == 'completed', 1), else_=0)),
+            func.sum(case((GenerationTask.status == 'failed', 1), else_=0)),
+        )
+        .filter(*filters)
+        .group_by(GenerationTask.task_type)
+        .all()
+    )
+
+    durations = _get_duration_percentiles(db, filters)
+
+    stats = {}
+    for name, total, completed, failed in counts:
+        completed = int(completed or 0)
+        failed = int(failed or 0)
+        finished = completed + failed
+        p50, p95 = durations.get(name, (None, None))
+        stats[name] = {
+            'total': int(total),
+            'completed': completed,
+            'failed': failed,
+            'in_progress': int(total) - finished,
+            'throughput_per_hour': round(completed / hours, 2) if hours else None,
+            'failure_rate': round(failed / finished, 4) if finished else 0.0,
+            'duration_p50_seconds': round(p50, 2) if p50 is not None else None,
+            'duration_p95_seconds': round(p95, 2) if p95 is not None else None,
+        }
+
+    return {
+        'window_hours': hours,
+        'since': since.isoformat(),
+        'task_types': stats,
+    }
+
+
+def _get_duration_percentiles(db, filters) -> Dict[str, tuple]:
+    """完了タスクの所要時間の p50/p95 を種別ごとに取得"""
+    duration_filters = filters + [
+        GenerationTask.status == 'completed',
+        GenerationTask.started_at.isnot(None),
+        GenerationTask.completed_at.isnot(None),
+    ]
+
+    if db.bind.dialect.name == 'postgresql':
+        duration = func.extract('epoch', GenerationTask.completed_at - GenerationTask.started_at)
+        rows = (
+            db.query(
+                GenerationTask.task_type,
+                func.percentile_cont(0.5).within_group(duration),
+                func.percentile_cont(0.95).within_group(duration),
+            )
+            .filter(*duration_filters)
+            .group_by(GenerationTask.task_type)
+            .all()
+        )
+        return {name: (p50, p95) for name, p50, p95 in rows}
+
+    # その他のDBはPython側で計算
+    grouped: Dict[str, List[float]] = {}
+    rows = (
+        db.query(GenerationTask.task_type, GenerationTask.started_at, GenerationTask.completed_at)
+        .filter(*duration_filters)
+        .all()
+    )
+    for name, started_at, completed_at in rows:
+        grouped.setdefault(name, []).append((completed_at - started_at).total_seconds())
+
+    result = {}
+    for name, values in grouped.items():
+        values.sort()
+        result[name] = (_percentile(values, 0.5), _percentile(values, 0.95))
+    return result
+
+
+# グローバルインスタンス
+_task_writer: Optional[TaskHistoryWriter] = None
+
+
+def get_task_writer() -> TaskHistoryWriter:
+    """タスク履歴ライターのシングルトンインスタンスを取得"""
+    global _task_writer
+    if _task_writer is None:
+        _task_writer = TaskHistoryWriter(
+            flush_interval=float(os.getenv('TASK_HISTORY_FLUSH_INTERVAL', 2.0)),
+            max_buffer=int(os.getenv('TASK_HISTORY_MAX_BUFFER', 100)),
+            max_pending=int(os.getenv('TASK_HISTORY_MAX_PENDING', 1000))
+        )
+        atexit.register(_task_writer.close)
+    return _task_writer
+
+
+def record_task(task_id: str, task_type: str, data: Dict[str, Any],
+                started_at: Optional[datetime] = None,
+                parameters: Optional[Dict[str, Any]] = None) -> None:
+    """タスクの状態更新を記録（バッファ経由でGenerationTaskへ書き込み）"""
+    try:
+        get_task_writer().record(task_id, task_type, data, started_at=started_at, parameters=parameters)
+    except Exception as e:
+        logger.warning(f"Failed to record task {task_id}: {e}")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+WordPressタクソノミー索引
+カテゴリ・タグの 名前 → ID を永続的に保持し、APIサーバーとワーカーで共有する。
+初回（または有効期限切れ時）に全ページを取得して構築し、以降は新しいタームを追加していく
+"""
+
+import os
+import html
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 全件取得から再構築までの秒数（WordPress側での削除・名前変更を反映するため）
+DEFAULT_REFRESH_SECONDS = int(os.getenv('WORDPRESS_TAXONOMY_TTL', 86400))
+
+
+def fold_term_name(name: str) -> str:
+    """照合用のターム名（WordPressが返すHTMLエスケープを戻し、大文字小文字を畳み込む）"""
+    return html.unescape(name).strip().casefold()
+
+
+class RedisTaxonomyBackend:
+    """タクソノミーごとのRedisハッシュ（フィールド: 畳み込んだ名前、値: ID）"""
+
+    def __init__(self, redis_client, key_prefix: str = "wp_taxonomy"):
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+
+    def _key(self, scope: str) -> str:
+        return f"{self.key_prefix}:{scope}"
+
+    def get_many(self, scope: str, names: list) -> Dict[str, int]:
+        if not names:
+            return {}
+        values = self.redis_client.hmget(self._key(scope), names)
+        return {name: int(value) for name, value in zip(names, values) if value is not None}
+
+    def add(self, scope: str, terms: Dict[str, int]) -> None:
+        if terms:
+            self.redis_client.hset(self._key(scope), mapping=terms)
+
+    def replace(self, scope: str, terms: Dict[str, int], ttl_seconds: int) -> None:
+        # 一時キーに構築して RENAME で入れ替え（構築中も古い索引を読める）
+        key = self._key(scope)
+        temp_key = f"{key}:building:{os.getpid()}:{threading.get_ident()}"
+        pipe = self.redis_client.pipeline()
+        pipe.delete(temp_key)
+        if terms:
+            pipe.hset(temp_key, mapping=terms)
+            pipe.rename(temp_key, key)
+        else:
+            pipe.delete(key)
+        pipe.set(f"{key}:warm", int(time.time()), ex=ttl_seconds)
+        pipe.execute()
+
+    def is_warm(self, scope: str) -> bool:
+        return bool(self.redis_client.exists(f"{self._key(scope)}:warm"))
+
+    def invalidate(self, scope: str) -> None:
+        self.redis_client.delete(f"{self._key(scope)}:warm")
+
+
+class MemoryTaxonomyBackend:
+    """プロセス内の辞書（Redisが使えない場合）"""
+
+    def __init__(self):
+        self._terms: Dict[str, Dict[str, int]] = {}
+        self._warm_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, scope: str, names: list) -> Dict[str, int]:
+        with self._lock:
+            terms = self._terms.get(scope, {})
+            return {name: terms[name] for name in names if name in terms}
+
+    def add(self, scope: str, terms: Dict[str, int]) -> None:
+        with self._lock:
+            self._terms.setdefault(scope, {}).update(terms)
+
+    def replace(self, scope: str, terms: Dict[str, int], ttl_seconds: int) -> None:
+        with self._lock:
+            self._terms[scope] = dict(terms)
+            self._warm_until[scope] = time.monotonic() + ttl_seconds
+
+    def is_warm(self, scope: str) -> bool:
+        with self._lock:
+            return self._warm_until.get(scope, 0) > time.monotonic()
+
+    def invalidate(self, scope: str) -> None:
+        with self._lock:
+            self._warm_until.pop(scope, None)
+
+
+class TaxonomyIndex:
+    """
+    サイト・タクソノミーごとの 名前 → ID 索引
+
+    索引は WordPress のURLごとに分けて保持する。warm() で全タームを登録した後は
+    作成したタームを add() で追加するだけなので、既存タームの解決にWordPressへの
+    問い合わせは不要になる。
+    """
+
+    def __init__(self, backend, refresh_seconds: int = DEFAULT_REFRESH_SECONDS):
+        self.backend = backend
+        self.refresh_seconds = refresh_seconds
+
+    @staticmethod
+    def _scope(site_url: str, taxonomy: str) -> str:
+        site = hashlib.sha1(site_url.rstrip('/').encode()).hexdigest()[:12]
+        return f"{site}:{taxonomy}"
+
+    def lookup(self, site_url: str, taxonomy: str, names: Iterable[str]) -> Dict[str, int]:
+        """畳み込んだ名前 → ID（索引にない名前は含まない）"""
+        folded = list(dict.fromkeys(fold_term_name(name) for name in names))
+        return self.backend.get_many(self._scope(site_url, taxonomy), folded)
+
+    def get(self, site_url: str, taxonomy: str, name: str) -> Optional[int]:
+        return self.lookup(site_url, taxonomy, [name]).get(fold_term_name(name))
+
+    def add(self, site_url: str, taxonomy: str, terms: Dict[str, int]) -> None:
+        """作成・発見したターム（名前 → ID）を追加"""
+        self.backend.add(
+            self._scope(site_url, taxonomy),
+            {fold_term_name(name): term_id for name, term_id in terms.items()}
+        )
+
+    def warm(self, site_url: str, taxonomy: str, terms: Iterable[Dict]) -> None:
+        """全ターム（REST APIの一覧そのまま）で索引を置き換え"""
+        mapping = {fold_term_name(term['name']): term['id'] for term in terms}
+        self.backend.replace(self._scope(site_url, taxonomy), mapping, self.refresh_seconds)
+        logger.info(f"Taxonomy index warmed: {taxonomy} ({len(mapping)} terms)")
+
+    def is_warm(self, site_url: str, taxonomy: str) -> bool:
+        return self.backend.is_warm(self._scope(site_url, taxonomy))
+
+    def invalidate(self, site_url: str, taxonomy: str) -> None:
+        """次回の解決時に全件を取得し直す"""
+        self.backend.invalidate(self._scope(site_url, taxonomy))
+
+
+# グローバルインスタンス
+_taxonomy_index = None
+_index_lock = threading.Lock()
+
+
+def get_taxonomy_index() -> TaxonomyIndex:
+    """タクソノミー索引のシングルトンを取得（Redis優先、不可ならプロセス内）"""
+    global _taxonomy_index
+    if _taxonomy_index is None:
+        with _index_lock:
+            if _taxonomy_index is None:
+                try:
+                    from redis import Redis
+                    client = Redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+                    client.ping()
+                    _taxonomy_index = TaxonomyIndex(RedisTaxonomyBackend(client))
+                    logger.info("Taxonomy index using Redis backend")
+                except Exception as e:
+                    logger.warning(f"Redis not available for taxonomy index, using memory: {e}")
+                    _taxonomy_index = TaxonomyIndex(MemoryTaxonomyBackend())
+    return _taxonomy_index
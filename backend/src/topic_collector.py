@@ -9,7 +9,7 @@ import json
 import datetime
 import feedparser
 import requests
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Callable, Iterator
 from dataclasses import dataclass, field
 from enum import Enum
 import time
@@ -17,8 +17,16 @@ from collections import defaultdict
 import re
 from dotenv import load_dotenv
 
+from .price_oracle import get_price_oracle
+from .keyword_matcher import KeywordMatcher
+from .score_decay import DecayingScoreIndex
+from .topic_journal import TopicJournal
+
 load_dotenv()
 
+# トピックスコアの半減期（時間）。旧来の線形減衰（72時間で0）と同じく36時間で半分になる
+TOPIC_SCORE_HALF_LIFE_HOURS = float(os.getenv('TOPIC_SCORE_HALF_LIFE_HOURS', '36'))
+
 
 class TopicSource(Enum):
     """トピックの情報源"""
@@ -50,12 +58,86 @@ class CollectedTopic:
     summary: Optional[str]
     collected_at: datetime.datetime
     data: Dict = field(default_factory=dict)  # 追加データ（価格、変動率など）
-    score: float = 0.0  # トピックの重要度スコア
+    score: float = 0.0  # トピックの重要度スコア（最後に評価した時点の減衰後の値）
+    base_score: float = 0.0  # 減衰前のスコア（TopicManager が収集時刻を基準に減衰させる）
+    
+    def to_dict(self) -> Dict:
+        """JSONシリアライズ可能な辞書に変換（プロセス間の受け渡し用）"""
+        return {
+            'title': self.title,
+            'source': self.source.value,
+            'source_url': self.source_url,
+            'priority': self.priority.name,
+            'coins': self.coins,
+            'keywords': self.keywords,
+            'summary': self.summary,
+            'collected_at': self.collected_at.isoformat(),
+            'data': self.data,
+            'score': self.score
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CollectedTopic':
+        """to_dict() の出力から復元"""
+        return cls(
+            title=data['title'],
+            source=TopicSource(data['source']),
+            source_url=data.get('source_url'),
+            priority=TopicPriority[data['priority']],
+            coins=data.get('coins', []),
+            keywords=data.get('keywords', []),
+            summary=data.get('summary'),
+            collected_at=datetime.datetime.fromisoformat(data['collected_at']),
+            data=data.get('data') or {},
+            score=data.get('score', 0.0)
+        )
 
 
 class RSSFeedCollector:
     """RSSフィードからトピックを収集"""
     
+    # 重要なキーワード
+    important_terms = [
+        '価格', '上昇', '下落', '急騰', '急落', '最高値', '最安値',
+        'price', 'surge', 'crash', 'pump', 'dump', 'ATH', 'breakout',
+        'ハッキング', 'hack', '規制', 'regulation', 'SEC', 'ETF',
+        'アップデート', 'update', 'upgrade', 'launch', 'listing',
+        'DeFi', 'NFT', 'メタバース', 'metaverse', 'AI',
+        '半減期', 'halving', 'マイニング', 'mining',
+        'ステーキング', 'staking', 'イールド', 'yield'
+    ]
+    
+    # 優先度判定キーワード（判定は小文字化したテキストに対して行う）
+    priority_keywords = {
+        # 緊急キーワード
+        'urgent': [
+            'breaking', '速報', 'ハッキング', 'hack', 'crash', '急落',
+            '規制', 'ban', '禁止', 'emergency', '緊急'
+        ],
+        # 高優先度キーワード
+        'high': [
+            '最高値', 'ATH', 'surge', '急騰', 'launch', 'listing',
+            'partnership', '提携', 'upgrade', 'アップグレード'
+        ],
+        # 中優先度キーワード
+        'medium': [
+            'analysis', '分析', 'report', 'レポート', 'trend', 'トレンド'
+        ]
+    }
+    
+    PRIORITY_LEVELS = {
+        'urgent': TopicPriority.URGENT,
+        'high': TopicPriority.HIGH,
+        'medium': TopicPriority.MEDIUM
+    }
+    
+    # キーワード抽出と優先度判定はクラス定義時にコンパイルした1つのマッチャーで判定する
+    _important_terms_lower = [(term, term.lower()) for term in important_terms]
+    _keyword_matcher = KeywordMatcher({
+        'terms': [term_lower for _, term_lower in _important_terms_lower],
+        **priority_keywords
+    })
+    
     def __init__(self):
         self.feed_urls = [
             "https://cointelegraph.com/rss",
@@ -120,11 +202,8 @@ class RSSFeedCollector:
             # 関連する暗号通貨を抽出
             coins = self._extract_coins(title + " " + summary)
             
-            # キーワードを抽出
-            keywords = self._extract_keywords(title + " " + summary)
-            
-            # 優先度を判定
-            priority = self._determine_priority(title, summary)
+            # キーワードを抽出し、優先度を判定
+            keywords, priority = self._analyze_keywords(title, summary)
             
             # 公開時刻を取得
             if published:
@@ -167,68 +246,40 @@ class RSSFeedCollector:
         
         return coins
     
+    def _analyze_keywords(self, title: str, summary: str) -> Tuple[List[str], TopicPriority]:
+        """キーワード抽出と優先度判定をテキスト1回の走査で行う"""
+        found = self._keyword_matcher.find((title + " " + summary).lower())
+        return self._keywords_from(found), self._priority_from(found)
+    
     def _extract_keywords(self, text: str) -> List[str]:
         """テキストからキーワードを抽出"""
-        keywords = []
-        
-        # 重要なキーワード
-        important_terms = [
-            '価格', '上昇', '下落', '急騰', '急落', '最高値', '最安値',
-            'price', 'surge', 'crash', 'pump', 'dump', 'ATH', 'breakout',
-            'ハッキング', 'hack', '規制', 'regulation', 'SEC', 'ETF',
-            'アップデート', 'update', 'upgrade', 'launch', 'listing',
-            'DeFi', 'NFT', 'メタバース', 'metaverse', 'AI',
-            '半減期', 'halving', 'マイニング', 'mining',
-            'ステーキング', 'staking', 'イールド', 'yield'
-        ]
-        
-        text_lower = text.lower()
-        for term in important_terms:
-            if term.lower() in text_lower:
-                keywords.append(term)
-        
-        return keywords[:5]  # 最大5個まで
+        return self._keywords_from(self._keyword_matcher.find(text.lower()))
     
     def _determine_priority(self, title: str, summary: str) -> TopicPriority:
         """記事の優先度を判定"""
-        text = (title + " " + summary).lower()
-        
-        # 緊急キーワード
-        urgent_keywords = [
-            'breaking', '速報', 'ハッキング', 'hack', 'crash', '急落',
-            '規制', 'ban', '禁止', 'emergency', '緊急'
-        ]
-        
-        # 高優先度キーワード
-        high_keywords = [
-            '最高値', 'ATH', 'surge', '急騰', 'launch', 'listing',
-            'partnership', '提携', 'upgrade', 'アップグレード'
-        ]
-        
-        # 中優先度キーワード
-        medium_keywords = [
-            'analysis', '分析', 'report', 'レポート', 'trend', 'トレンド'
-        ]
-        
-        for keyword in urgent_keywords:
-            if keyword in text:
-                return TopicPriority.URGENT
-        
-        for keyword in high_keywords:
-            if keyword in text:
-                return TopicPriority.HIGH
-        
-        for keyword in medium_keywords:
-            if keyword in text:
-                return TopicPriority.MEDIUM
-        
+        return self._priority_from(self._keyword_matcher.find((title + " " + summary).lower()))
+    
+    def _keywords_from(self, found) -> List[str]:
+        if not found:
+            return []
+        keywords = [term for term, term_lower in self._important_terms_lower if term_lower in found]
+        return keywords[:5]  # 最大5個まで
+    
+    def _priority_from(self, found) -> TopicPriority:
+        # 緊急 → 高 → 中の順に、キーワードが含まれる最初の優先度を採用
+        if found:
+            hit_groups = self._keyword_matcher.groups_for(found)
+            for level in ('urgent', 'high', 'medium'):
+                if level in hit_groups:
+                    return self.PRIORITY_LEVELS[level]
         return TopicPriority.LOW
 
 
 class PriceDataCollector:
     """価格データからトピックを生成"""
     
-    def __init__(self):
+    def __init__(self, session: Optional[requests.Session] = None):
+        self.session = session or requests.Session()
         self.api_key = os.getenv('COINMARKETCAP_API_KEY')
         self.base_url = 'https://pro-api.coinmarketcap.com/v1'
         
@@ -290,10 +341,13 @@ class PriceDataCollector:
                 'price_change_percentage': '24h'
             }
             
-            response = requests.get(url, params=params)
+            response = self.session.get(url, params=params)
             if response.status_code == 200:
                 coins = response.json()
                 
+                # 取得した価格を共有価格キャッシュへ登録（ファクトチェックで再利用）
+                get_price_oracle().prime_from_markets(coins, params['vs_currency'])
+                
                 # 24時間で10%以上変動したコインを抽出
                 movers = []
                 for coin in coins:
@@ -320,7 +374,7 @@ class PriceDataCollector:
         """トレンドのコインを取得"""
         try:
             url = f"{self.coingecko_url}/search/trending"
-            response = requests.get(url)
+            response = self.session.get(url)
             
             if response.status_code == 200:
                 data = response.json()
@@ -487,22 +541,149 @@ class TopicManager:
         self.topics: List[CollectedTopic] = []
         self.processed_titles: set = set()  # 重複防止
         self.topic_history: Dict[str, datetime.datetime] = {}  # 同じトピックの履歴
+        self._listeners: List[Callable[[List[CollectedTopic]], None]] = []  # 新規トピック通知先
+        # 減衰後のスコア順の索引（base_score × 収集時刻からの指数減衰）
+        self._score_index = DecayingScoreIndex(TOPIC_SCORE_HALF_LIFE_HOURS)
+        # 収集時刻の新しい順の索引（ベーススコアを揃えると順位は収集時刻だけで決まる）
+        self._recency_index = DecayingScoreIndex(TOPIC_SCORE_HALF_LIFE_HOURS, self._score_index.reference)
+        # 変更を記録するジャーナル（attach_journal で設定）
+        self.journal: Optional[TopicJournal] = None
         
         # 初期化時にモックデータを生成
         self._generate_mock_topics()
     
-    def add_topics(self, topics: List[CollectedTopic]):
+    def attach_journal(self, journal: TopicJournal) -> int:
+        """
+        ジャーナルを再生して前回までのトピックを復元し、以降の変更をジャーナルに追記する
+        
+        戻り値は復元したトピック数。
+        """
+        by_title = {topic.title.lower(): topic for topic in self.topics}
+        restored = set()
+        for record in journal.replay():
+            op = record.get('op')
+            title = record.get('title', '').lower()
+            if op == 'add':
+                topic = CollectedTopic.from_dict(record['topic'])
+                title = topic.title.lower()
+                if title in self.processed_titles:
+                    continue
+                self._register(topic, record.get('base_score'))
+                by_title[title] = topic
+                restored.add(title)
+            elif op == 'score' and title in by_title:
+                self._set_base_score(by_title[title], record['base_score'])
+            elif op == 'update' and title in by_title:
+                topic = by_title.pop(title)
+                priority = record.get('priority')
+                self._apply_update(topic, record.get('new_title'), TopicPriority[priority] if priority else None)
+                by_title[topic.title.lower()] = topic
+                if title in restored:
+                    restored.discard(title)
+                    restored.add(topic.title.lower())
+            elif op == 'remove' and title in by_title:
+                self.remove_topic(by_title.pop(title))
+                restored.discard(title)
+        self.journal = journal
+        return len(restored)
+    
+    def _journal(self, records: List[Dict]):
+        """ジャーナルに変更を追記"""
+        if self.journal is not None:
+            self.journal.append(records)
+    
+    def add_listener(self, listener: Callable[[List[CollectedTopic]], None]):
+        """新規トピック追加時に呼び出されるリスナーを登録"""
+        self._listeners.append(listener)
+    
+    def add_topics(self, topics: List[CollectedTopic]) -> List[CollectedTopic]:
         """トピックを追加（重複チェック付き）"""
+        added = []
         for topic in topics:
             if self._is_duplicate(topic):
                 continue
             
-            # スコアを計算
-            topic.score = self._calculate_score(topic)
-            
-            self.topics.append(topic)
-            self.processed_titles.add(topic.title.lower())
-            self.topic_history[topic.title.lower()] = topic.collected_at
+            self._register(topic)
+            added.append(topic)
+        
+        if added:
+            self._journal([
+                {'op': 'add', 'topic': topic.to_dict(), 'base_score': topic.base_score}
+                for topic in added
+            ])
+            self._notify_listeners(added)
+        
+        return added
+    
+    def _register(self, topic: CollectedTopic, base_score: Optional[float] = None):
+        """スコアを計算してトピックを登録（ジャーナルの再生時は記録したベーススコアを使う）"""
+        topic.base_score = self._calculate_score(topic) if base_score is None else base_score
+        timestamp = topic.collected_at.timestamp()
+        self._score_index.add(topic, topic.base_score, timestamp)
+        self._recency_index.add(topic, 1.0, timestamp)
+        topic.score = self._score_index.score(topic.base_score, timestamp)
+        
+        self.topics.append(topic)
+        self.processed_titles.add(topic.title.lower())
+        self.topic_history[topic.title.lower()] = topic.collected_at
+    
+    def remove_topic(self, topic: CollectedTopic) -> bool:
+        """トピックを削除（同じタイトルは再収集しない）"""
+        if not self._score_index.remove(topic):
+            return False
+        self._recency_index.remove(topic)
+        self.topics.remove(topic)
+        self._journal([{'op': 'remove', 'title': topic.title}])
+        return True
+    
+    def update_topic(self, topic: CollectedTopic, title: Optional[str] = None,
+                     priority: Optional[TopicPriority] = None):
+        """タイトル・優先度を変更（ジャーナルには変更前のタイトルで記録する）"""
+        record = {'op': 'update', 'title': topic.title}
+        if title:
+            record['new_title'] = title
+        if priority is not None:
+            record['priority'] = priority.name
+        self._apply_update(topic, title, priority)
+        self._journal([record])
+    
+    def _apply_update(self, topic: CollectedTopic, title: Optional[str], priority: Optional[TopicPriority]):
+        if title:
+            # 変更前のタイトルも重複判定に残す（同じ記事を再収集しない）
+            topic.title = title
+            self.processed_titles.add(title.lower())
+            self.topic_history[title.lower()] = topic.collected_at
+        if priority is not None:
+            topic.priority = priority
+    
+    def set_topic_score(self, topic: CollectedTopic, score: float):
+        """現在のスコアを指定値に変更（以降は指定値から減衰する）"""
+        now = time.time()
+        timestamp = topic.collected_at.timestamp()
+        decay = self._score_index.score(1.0, timestamp, now)
+        self._set_base_score(topic, score / decay if decay > 0 else score)
+        topic.score = score
+        self._journal([{'op': 'score', 'title': topic.title, 'base_score': topic.base_score}])
+    
+    def _set_base_score(self, topic: CollectedTopic, base_score: float):
+        topic.base_score = base_score
+        self._score_index.add(topic, base_score, topic.collected_at.timestamp())
+    
+    def current_score(self, topic: CollectedTopic) -> float:
+        """トピックの現在の（減衰後の）スコア"""
+        score = self._score_index.current_score(topic)
+        if score is None:
+            return topic.score
+        topic.score = score
+        return score
+    
+    def _notify_listeners(self, topics: List[CollectedTopic]):
+        """リスナーへ新規トピックを通知"""
+        for listener in self._listeners:
+            try:
+                listener(topics)
+            except Exception as e:
+                print(f"Error notifying topic listener: {e}")
     
     def _is_duplicate(self, topic: CollectedTopic) -> bool:
         """重複チェック"""
@@ -534,7 +715,7 @@ class TopicManager:
         return len(intersection) / len(union)
     
     def _calculate_score(self, topic: CollectedTopic) -> float:
-        """トピックのスコアを計算"""
+        """トピックの減衰前のベーススコアを計算"""
         score = 0.0
         
         # 優先度によるベーススコア
@@ -547,11 +728,6 @@ class TopicManager:
         }
         score += priority_scores[topic.priority]
         
-        # 時間による減衰（古いニュースはスコアが下がる）
-        hours_old = (datetime.datetime.now() - topic.collected_at).total_seconds() / 3600
-        time_decay = max(0.3, 1 - (hours_old / 72))  # 72時間でも30%は残る
-        score *= time_decay
-        
         # キーワード数によるボーナス
         score += len(topic.keywords) * 2
         
@@ -562,18 +738,45 @@ class TopicManager:
         if topic.score > 0:
             score += topic.score * 0.1
         
+        # 時間による減衰（古いニュースはスコアが下がる）は読み出し時に収集時刻から計算する
         return score
     
     def get_top_topics(self, count: int = 10, min_score: float = 10) -> List[CollectedTopic]:
-        """スコアの高いトピックを取得"""
-        # スコアでソート
-        sorted_topics = sorted(
-            [t for t in self.topics if t.score >= min_score],
-            key=lambda x: x.score,
-            reverse=True
-        )
+        """
+        減衰後のスコアが高いトピックを取得
         
-        return sorted_topics[:count]
+        順位は減衰しても変わらないキーで保持しているため、評価するのは返すトピックだけ。
+        返したトピックの score は現在時刻の値に更新される。
+        """
+        top_topics = []
+        for topic, score in self._score_index.top(count, min_score):
+            topic.score = score
+            top_topics.append(topic)
+        return top_topics
+    
+    @property
+    def cursor_epoch(self) -> float:
+        """索引の基準時刻（位置はこのインスタンスの中でだけ有効）"""
+        return self._score_index.reference
+    
+    def iter_topics(self, order: str = 'score', after: Optional[Tuple[float, int]] = None,
+                    min_score: Optional[float] = None) -> Iterator[Tuple[CollectedTopic, Tuple[float, int]]]:
+        """
+        スコア順（order='score'）または収集時刻の新しい順（order='time'）に
+        (トピック, 位置) を返す。after に前のページの最後の位置を渡すとその次から返す
+        """
+        now = time.time()
+        if order == 'time':
+            for topic, _ in self._recency_index.iter_top(now=now, after=after):
+                score = self._score_index.current_score(topic, now)
+                if min_score is not None and score < min_score:
+                    continue
+                topic.score = score
+                yield topic, self._recency_index.position(topic)
+        else:
+            for topic, score in self._score_index.iter_top(min_score, now, after):
+                topic.score = score
+                yield topic, self._score_index.position(topic)
     
     def get_topics_by_coin(self, coin_symbol: str) -> List[CollectedTopic]:
         """特定のコインに関するトピックを取得"""
@@ -775,12 +978,7 @@ class TopicManager:
                 score=0  # スコアは後で計算される
             )
             
-            # スコアを計算
-            topic.score = self._calculate_score(topic)
-            
-            self.topics.append(topic)
-            self.processed_titles.add(topic.title.lower())
-            self.topic_history[topic.title.lower()] = topic.collected_at
+            self._register(topic)
 
 
 def main():
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+トピックのジャーナル
+TopicManager への追加・スコア変更・削除を追記専用のログに記録し、再起動時に再生して状態を復元する。
+収集のたびに全トピックを JSON に書き出す代わりに、変更のあったトピックだけを書く
+
+形式:
+    各レコードは 4バイト（ビッグエンディアン）の長さ + 区切りなしの JSON（UTF-8）。
+    書き込み中のセグメントは topics-00000001.log、TOPIC_JOURNAL_SEGMENT_BYTES を超えると
+    gzip で圧縮した topics-00000001.log.gz に封じて次のセグメントへ移る
+"""
+
+import os
+import re
+import json
+import gzip
+import struct
+import logging
+import threading
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows など
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# セグメントを封じて圧縮するサイズ（バイト）
+TOPIC_JOURNAL_SEGMENT_BYTES = int(os.getenv('TOPIC_JOURNAL_SEGMENT_BYTES', 4 * 1024 * 1024))
+# 追記のたびに fsync するか（false ならOSのバッファに任せる）
+TOPIC_JOURNAL_FSYNC = os.getenv('TOPIC_JOURNAL_FSYNC', 'false').lower() == 'true'
+# ジャーナルを書く（トピックを収集・編集する）プロセスの種類: api / pipeline / worker / none
+TOPIC_JOURNAL_OWNER = os.getenv('TOPIC_JOURNAL_OWNER', 'api').lower()
+
+ACTIVE_SUFFIX = '.log'
+SEALED_SUFFIX = '.log.gz'
+LOCK_FILE = '.lock'
+_SEGMENT_NAME = re.compile(r'^topics-(\d{8})(\.log|\.log\.gz)$')
+_HEADER = struct.Struct('>I')
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    """レコードを長さ付きの JSON に変換"""
+    payload = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return _HEADER.pack(len(payload)) + payload
+
+
+def read_records(stream: BinaryIO) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """(レコード, 読み終えた位置) を返す。書きかけの末尾（途中で落ちた場合）は読まずに止まる"""
+    offset = 0
+    while True:
+        header = stream.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return
+        (length,) = _HEADER.unpack(header)
+        payload = stream.read(length)
+        if len(payload) < length:
+            return
+        try:
+            record = json.loads(payload)
+        except ValueError:
+            return
+        offset += _HEADER.size + length
+        yield record, offset
+
+
+def segment_name(seq: int, sealed: bool = False) -> str:
+    return f"topics-{seq:08d}{SEALED_SUFFIX if sealed else ACTIVE_SUFFIX}"
+
+
+class TopicJournal:
+    """
+    追記専用のトピックジャーナル
+
+    書き込めるのはディレクトリのロックを取れた1プロセスだけ。どのプロセスが書くかは
+    TOPIC_JOURNAL_OWNER で決め（attach_owned_journal）、ロックは取り違えの検出に使う。
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = TOPIC_JOURNAL_SEGMENT_BYTES,
+                 fsync: bool = TOPIC_JOURNAL_FSYNC):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._file: Optional[BinaryIO] = None
+        self._lock_file = None
+
+        os.makedirs(directory, exist_ok=True)
+        self.writable = self._acquire()
+        segments = self._segments()
+        if self.writable:
+            self._recover(segments)
+            segments = self._segments()
+        # 書き込み中のセグメントがあれば続きに追記し、なければ次の番号から始める
+        if segments and not segments[-1][1]:
+            self._seq = segments[-1][0]
+        else:
+            self._seq = segments[-1][0] + 1 if segments else 1
+
+    def _acquire(self) -> bool:
+        if fcntl is None:
+            return True
+        self._lock_file = open(os.path.join(self.directory, LOCK_FILE), 'a+b')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            logger.warning(f"Topic journal {self.directory} is locked by another process")
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+        return True
+
+    def _segments(self) -> List[Tuple[int, bool, str]]:
+        """(番号, 封じ済みか, パス) を番号順に"""
+        found = {}
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_NAME.match(name)
+            if not match:
+                continue
+            seq, sealed = int(match.group(1)), match.group(2) == SEALED_SUFFIX
+            # 封じる途中で落ちた場合は両方残るので、圧縮済みの方を使う
+            if seq in found and found[seq][0]:
+                continue
+            found[seq] = (sealed, os.path.join(self.directory, name))
+        return [(seq, sealed, path) for seq, (sealed, path) in sorted(found.items())]
+
+    def _recover(self, segments: List[Tuple[int, bool, str]]) -> None:
+        """前回の中断の後始末（封じ損ねた元ファイルの削除、書きかけの末尾の切り詰め）"""
+        for seq, sealed, _ in segments:
+            raw_path = os.path.join(self.directory, segment_name(seq))
+            if sealed and os.path.exists(raw_path):
+                os.remove(raw_path)
+        if segments and not segments[-1][1]:
+            path = segments[-1][2]
+            end = 0
+            with open(path, 'rb') as f:
+                for _, end in read_records(f):
+                    pass
+            if end < os.path.getsize(path):
+                logger.warning(f"Truncating incomplete record at the end of {path}")
+                with open(path, 'r+b') as f:
+                    f.truncate(end)
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """記録したレコードを古い順に返す"""
+        for seq, sealed, path in self._segments():
+            try:
+                f = gzip.open(path, 'rb') if sealed else open(path, 'rb')
+            except FileNotFoundError:
+                # 一覧を取った後に書き込み側のプロセスが封じた（開いた後なら削除されても読める）
+                f = gzip.open(os.path.join(self.directory, segment_name(seq, sealed=True)), 'rb')
+            with f:
+                for record, _ in read_records(f):
+                    yield record
+
+    def append(self, records: Iterable[Dict[str, Any]]) -> int:
+        """レコードを追記し、セグメントが大きくなったら封じる"""
+        if not self.writable:
+            raise RuntimeError(f"Topic journal {self.directory} is read-only in this process")
+        data = b''.join(encode_record(record) for record in records)
+        if not data:
+            return 0
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = open(os.path.join(self.directory, segment_name(self._seq)), 'ab')
+                self._file.write(data)
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+                if self._file.tell() >= self.segment_bytes:
+                    self._roll()
+            except OSError as e:
+                logger.error(f"Failed to append to topic journal: {e}")
+                return 0
+        return len(data)
+
+    def _roll(self) -> None:
+        """書き込み中のセグメントを gzip で封じる（一時ファイルに書いてから置き換える）"""
+        self._file.close()
+        self._file = None
+        raw_path = os.path.join(self.directory, segment_name(self._seq))
+        sealed_path = os.path.join(self.directory, segment_name(self._seq, sealed=True))
+        tmp_path = sealed_path + '.tmp'
+        with open(raw_path, 'rb') as src, gzip.open(tmp_path, 'wb') as dst:
+            while True:
+                chunk = src.read(1024 * 1024)
+                if not chunk:
+                    break
+                dst.write(chunk)
+        os.replace(tmp_path, sealed_path)
+        os.remove(raw_path)
+        self._seq += 1
+
+    def stats(self) -> Dict[str, Any]:
+        segments = self._segments()
+        return {
+            'segments': len(segments),
+            'sealedSegments': sum(1 for _, sealed, _ in segments if sealed),
+            'bytes': sum(os.path.getsize(path) for _, _, path in segments if os.path.exists(path)),
+            'writable': self.writable,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+
+def topic_journal_dir(output_dir: str) -> str:
+    return os.getenv('TOPIC_JOURNAL_DIR', os.path.join(output_dir, 'logs', 'topic_journal'))
+
+
+def attach_owned_journal(topic_manager, role: str, output_dir: str) -> Optional[TopicJournal]:
+    """
+    このプロセスがジャーナルの書き込み担当（TOPIC_JOURNAL_OWNER == role）なら、
+    ジャーナルを再生して topic_manager に取り付ける。担当でなければ何もしない
+
+    担当のはずがロックを取れない場合（同じ担当のプロセスが既にある）は取り付けずにエラーを記録する。
+    """
+    if TOPIC_JOURNAL_OWNER != role:
+        return None
+    journal = TopicJournal(topic_journal_dir(output_dir))
+    if not journal.writable:
+        logger.error(
+            f"TOPIC_JOURNAL_OWNER={role} but another {role} process holds {journal.directory}; "
+            f"topics collected by this process will not be journaled"
+        )
+        journal.close()
+        return None
+    restored = topic_manager.attach_journal(journal)
+    logger.info(f"Restored {restored} topics from the topic journal ({role})")
+    return journal
@@ -6,14 +6,21 @@ WordPress自動投稿システム
 
 import os
 import json
+import asyncio
 import requests
-from typing import Dict, List, Optional, Tuple
-from datetime import datetime
+import httpx
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterable, List, Optional, Tuple
 from dataclasses import dataclass
 import base64
+import uuid
 import logging
 from dotenv import load_dotenv
 
+from .taxonomy_index import TaxonomyIndex, fold_term_name, get_taxonomy_index
+from .publish_ledger import PublishLedger, article_content_hash
+from .article_repository import ArticleRepository, get_article_repository
+
 load_dotenv()
 
 # ログ設定
@@ -37,13 +44,60 @@ class WordPressPost:
     excerpt: Optional[str] = None
 
 
+def _auth_headers(username: str, app_password: str) -> Dict[str, str]:
+    """アプリケーションパスワードによるBasic認証ヘッダー"""
+    credentials = base64.b64encode(
+        f"{username}:{app_password}".encode()
+    ).decode('ascii')
+    return {
+        'Authorization': f'Basic {credentials}',
+        'Content-Type': 'application/json'
+    }
+
+
+def _post_payload(post: WordPressPost) -> Dict:
+    """投稿作成APIのリクエストボディ"""
+    post_data = {
+        'title': post.title,
+        'content': post.content,
+        'status': post.status,
+        'excerpt': post.excerpt or ''
+    }
+    
+    # カテゴリとタグを設定
+    if post.categories:
+        post_data['categories'] = post.categories
+    if post.tags:
+        post_data['tags'] = post.tags
+    
+    # メタデータを設定
+    if post.meta:
+        post_data['meta'] = post.meta
+    
+    return post_data
+
+
+def _existing_term_id(response) -> Optional[int]:
+    """ターム作成APIの term_exists エラーから既存のIDを取り出す"""
+    try:
+        error = response.json()
+    except ValueError:
+        return None
+    if isinstance(error, dict) and error.get('code') == 'term_exists':
+        return error.get('data', {}).get('term_id')
+    return None
+
+
 class WordPressClient:
     """WordPress REST API クライアント"""
     
-    def __init__(self):
-        self.base_url = os.getenv('WORDPRESS_URL')
-        self.username = os.getenv('WORDPRESS_USERNAME')
-        self.app_password = os.getenv('WORDPRESS_APP_PASSWORD')
+    def __init__(self, base_url: Optional[str] = None, username: Optional[str] = None,
+                 app_password: Optional[str] = None, timeout: float = 30.0,
+                 taxonomy_index: Optional[TaxonomyIndex] = None):
+        self.base_url = base_url or os.getenv('WORDPRESS_URL')
+        self.username = username or os.getenv('WORDPRESS_USERNAME')
+        self.app_password = app_password or os.getenv('WORDPRESS_APP_PASSWORD')
+        self.timeout = timeout
         
         if not all([self.base_url, self.username, self.app_password]):
             raise ValueError("WordPress credentials not found in environment variables")
@@ -52,24 +106,28 @@ class WordPressClient:
         self.api_url = f"{self.base_url.rstrip('/')}/wp-json/wp/v2"
         
         # 認証ヘッダー
-        credentials = base64.b64encode(
-            f"{self.username}:{self.app_password}".encode()
-        ).decode('ascii')
-        self.headers = {
-            'Authorization': f'Basic {credentials}',
-            'Content-Type': 'application/json'
-        }
+        self.headers = _auth_headers(self.username, self.app_password)
+        
+        # 接続を使い回すセッション（リクエストごとのTLSハンドシェイクを避ける）
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        pool_size = int(os.getenv('WORDPRESS_MAX_CONNECTIONS', '10'))
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=pool_size))
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=pool_size))
+        
+        # カテゴリ・タグの 名前 → ID 索引（APIサーバーとワーカーで共有）
+        self.taxonomy_index = taxonomy_index or get_taxonomy_index()
         
-        # カテゴリとタグのキャッシュ
+        # カテゴリとタグの一覧キャッシュ
         self._categories_cache = None
         self._tags_cache = None
     
     def test_connection(self) -> bool:
         """接続テスト"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.api_url}/users/me",
-                headers=self.headers
+                timeout=self.timeout
             )
             if response.status_code == 200:
                 user_data = response.json()
@@ -85,29 +143,10 @@ class WordPressClient:
     def create_post(self, post: WordPressPost) -> Optional[int]:
         """投稿を作成"""
         try:
-            # 投稿データを準備
-            post_data = {
-                'title': post.title,
-                'content': post.content,
-                'status': post.status,
-                'excerpt': post.excerpt or ''
-            }
-            
-            # カテゴリとタグを設定
-            if post.categories:
-                post_data['categories'] = post.categories
-            if post.tags:
-                post_data['tags'] = post.tags
-            
-            # メタデータを設定
-            if post.meta:
-                post_data['meta'] = post.meta
-            
-            # 投稿を作成
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/posts",
-                headers=self.headers,
-                json=post_data
+                json=_post_payload(post),
+                timeout=self.timeout
             )
             
             if response.status_code == 201:
@@ -126,10 +165,10 @@ class WordPressClient:
     def update_post(self, post_id: int, updates: Dict) -> bool:
         """投稿を更新"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/posts/{post_id}",
-                headers=self.headers,
-                json=updates
+                json=updates,
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
@@ -143,120 +182,297 @@ class WordPressClient:
             logger.error(f"Error updating post {post_id}: {e}")
             return False
     
+    def _get_all(self, endpoint: str) -> List[Dict]:
+        """一覧APIの全ページを取得（X-WP-TotalPages に従う）"""
+        items = []
+        page = 1
+        while True:
+            response = self.session.get(
+                f"{self.api_url}/{endpoint}",
+                params={'per_page': 100, 'page': page},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            items.extend(response.json())
+            if page >= int(response.headers.get('X-WP-TotalPages', 1)):
+                return items
+            page += 1
+    
+    def _load_terms(self, taxonomy: str) -> List[Dict]:
+        """タクソノミーの全タームを取得して索引を構築し直す"""
+        terms = self._get_all(taxonomy)
+        self.taxonomy_index.warm(self.base_url, taxonomy, terms)
+        setattr(self, f"_{taxonomy}_cache", terms)
+        return terms
+    
     def get_categories(self) -> List[Dict]:
         """カテゴリ一覧を取得"""
         if self._categories_cache is not None:
             return self._categories_cache
         
         try:
-            response = requests.get(
-                f"{self.api_url}/categories",
-                headers=self.headers,
-                params={'per_page': 100}
-            )
-            
-            if response.status_code == 200:
-                self._categories_cache = response.json()
-                return self._categories_cache
-            else:
-                logger.error(f"Failed to get categories: {response.status_code}")
-                return []
-                
+            return self._load_terms('categories')
         except Exception as e:
             logger.error(f"Error getting categories: {e}")
             return []
     
-    def get_or_create_category(self, name: str, description: str = "") -> Optional[int]:
-        """カテゴリを取得または作成"""
-        # 既存のカテゴリを検索
-        categories = self.get_categories()
-        for cat in categories:
-            if cat['name'].lower() == name.lower():
-                return cat['id']
+    def get_tags(self) -> List[Dict]:
+        """タグ一覧を取得"""
+        if self._tags_cache is not None:
+            return self._tags_cache
+        
+        try:
+            return self._load_terms('tags')
+        except Exception as e:
+            logger.error(f"Error getting tags: {e}")
+            return []
+    
+    def _get_or_create_term(self, taxonomy: str, name: str, data: Optional[Dict] = None) -> Optional[int]:
+        """索引からタームのIDを取得し、なければ作成して索引に追加"""
+        term_id = self.taxonomy_index.get(self.base_url, taxonomy, name)
+        if term_id:
+            return term_id
         
-        # 新しいカテゴリを作成
+        # 索引が未構築（または期限切れ）なら全件を取得して構築
+        if not self.taxonomy_index.is_warm(self.base_url, taxonomy):
+            try:
+                self._load_terms(taxonomy)
+                term_id = self.taxonomy_index.get(self.base_url, taxonomy, name)
+                if term_id:
+                    return term_id
+            except Exception as e:
+                logger.error(f"Error loading {taxonomy}: {e}")
+        
+        # 新しいタームを作成
         try:
-            response = requests.post(
-                f"{self.api_url}/categories",
-                headers=self.headers,
-                json={
-                    'name': name,
-                    'description': description
-                }
+            response = self.session.post(
+                f"{self.api_url}/{taxonomy}",
+                json={'name': name, **(data or {})},
+                timeout=self.timeout
             )
             
             if response.status_code == 201:
-                new_cat = response.json()
-                self._categories_cache = None  # キャッシュをクリア
-                logger.info(f"Created new category: {name} (ID={new_cat['id']})")
-                return new_cat['id']
+                term_id = response.json()['id']
+                logger.info(f"Created new {taxonomy} term: {name} (ID={term_id})")
             else:
-                logger.error(f"Failed to create category: {response.status_code}")
-                return None
+                # 他のプロセスが先に作成した場合は既存のIDが返る
+                term_id = _existing_term_id(response)
+                if not term_id:
+                    logger.error(f"Failed to create {taxonomy} term {name}: {response.status_code}")
+                    return None
+            
+            self.taxonomy_index.add(self.base_url, taxonomy, {name: term_id})
+            return term_id
                 
         except Exception as e:
-            logger.error(f"Error creating category: {e}")
+            logger.error(f"Error creating {taxonomy} term {name}: {e}")
             return None
     
-    def get_tags(self) -> List[Dict]:
-        """タグ一覧を取得"""
-        if self._tags_cache is not None:
-            return self._tags_cache
+    def get_or_create_category(self, name: str, description: str = "") -> Optional[int]:
+        """カテゴリを取得または作成"""
+        return self._get_or_create_term('categories', name, {'description': description})
+    
+    def get_or_create_tag(self, name: str) -> Optional[int]:
+        """タグを取得または作成"""
+        return self._get_or_create_term('tags', name)
+
+
+class AsyncWordPressClient:
+    """
+    WordPress REST API の非同期クライアント
+    
+    1つの httpx.AsyncClient で接続を使い回し、同時リクエスト数をセマフォで制限する。
+    カテゴリ・タグは一覧の全ページを並列取得してキャッシュし、バッチに必要な名前を
+    まとめて解決する（未登録の名前だけを作成）。
+    """
+    
+    def __init__(self, base_url: Optional[str] = None, username: Optional[str] = None,
+                 app_password: Optional[str] = None, concurrency: Optional[int] = None,
+                 max_connections: Optional[int] = None, timeout: float = 30.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 taxonomy_index: Optional[TaxonomyIndex] = None):
+        self.base_url = base_url or os.getenv('WORDPRESS_URL')
+        self.username = username or os.getenv('WORDPRESS_USERNAME')
+        self.app_password = app_password or os.getenv('WORDPRESS_APP_PASSWORD')
+        
+        if not all([self.base_url, self.username, self.app_password]):
+            raise ValueError("WordPress credentials not found in environment variables")
+        
+        self.api_url = f"{self.base_url.rstrip('/')}/wp-json/wp/v2"
+        self.concurrency = concurrency or int(os.getenv('WORDPRESS_PUBLISH_CONCURRENCY', '4'))
+        max_connections = max_connections or int(os.getenv('WORDPRESS_MAX_CONNECTIONS', '10'))
+        
+        self._client = httpx.AsyncClient(
+            headers=_auth_headers(self.username, self.app_password),
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            transport=transport
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
         
+        # カテゴリ・タグの 名前 → ID 索引（APIサーバーとワーカーで共有）
+        self.taxonomy_index = taxonomy_index or get_taxonomy_index()
+        self._warm_locks: Dict[str, asyncio.Lock] = {}
+    
+    async def __aenter__(self) -> 'AsyncWordPressClient':
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+    
+    async def aclose(self):
+        await self._client.aclose()
+    
+    async def _request(self, method: str, endpoint: str, **kwargs) -> httpx.Response:
+        async with self._semaphore:
+            return await self._client.request(method, f"{self.api_url}/{endpoint}", **kwargs)
+    
+    async def test_connection(self) -> bool:
+        """接続テスト"""
         try:
-            response = requests.get(
-                f"{self.api_url}/tags",
-                headers=self.headers,
-                params={'per_page': 100}
-            )
-            
+            response = await self._request('GET', 'users/me')
             if response.status_code == 200:
-                self._tags_cache = response.json()
-                return self._tags_cache
-            else:
-                logger.error(f"Failed to get tags: {response.status_code}")
-                return []
-                
+                logger.info(f"Connected as: {response.json()['name']}")
+                return True
+            logger.error(f"Connection failed: {response.status_code} - {response.text}")
+            return False
         except Exception as e:
-            logger.error(f"Error getting tags: {e}")
-            return []
+            logger.error(f"Connection error: {e}")
+            return False
     
-    def get_or_create_tag(self, name: str) -> Optional[int]:
-        """タグを取得または作成"""
-        # 既存のタグを検索
-        tags = self.get_tags()
-        for tag in tags:
-            if tag['name'].lower() == name.lower():
-                return tag['id']
+    async def _get_all(self, endpoint: str, params: Optional[Dict] = None) -> List[Dict]:
+        """一覧APIの全ページを取得（1ページ目の X-WP-TotalPages を見て残りを並列取得）"""
+        params = {'per_page': 100, **(params or {})}
+        response = await self._request('GET', endpoint, params={**params, 'page': 1})
+        response.raise_for_status()
+        items = response.json()
         
-        # 新しいタグを作成
+        total_pages = int(response.headers.get('X-WP-TotalPages', 1))
+        if total_pages > 1:
+            responses = await asyncio.gather(*(
+                self._request('GET', endpoint, params={**params, 'page': page})
+                for page in range(2, total_pages + 1)
+            ))
+            for page_response in responses:
+                page_response.raise_for_status()
+                items.extend(page_response.json())
+        return items
+    
+    async def _warm_terms(self, taxonomy: str) -> None:
+        """索引が未構築（または期限切れ）なら全タームを取得して構築"""
+        lock = self._warm_locks.setdefault(taxonomy, asyncio.Lock())
+        async with lock:
+            if await asyncio.to_thread(self.taxonomy_index.is_warm, self.base_url, taxonomy):
+                return
+            terms = await self._get_all(taxonomy, {'_fields': 'id,name'})
+            await asyncio.to_thread(self.taxonomy_index.warm, self.base_url, taxonomy, terms)
+    
+    async def _create_term(self, taxonomy: str, name: str) -> Optional[int]:
         try:
-            response = requests.post(
-                f"{self.api_url}/tags",
-                headers=self.headers,
-                json={'name': name}
-            )
+            response = await self._request('POST', taxonomy, json={'name': name})
+            if response.status_code == 201:
+                term_id = response.json()['id']
+                logger.info(f"Created new {taxonomy} term: {name} (ID={term_id})")
+                return term_id
             
+            # 同時に作成された場合は既存のIDが返る
+            term_id = _existing_term_id(response)
+            if term_id:
+                return term_id
+            
+            logger.error(f"Failed to create {taxonomy} term {name}: {response.status_code}")
+            return None
+        except Exception as e:
+            logger.error(f"Error creating {taxonomy} term {name}: {e}")
+            return None
+    
+    async def resolve_terms(self, taxonomy: str, names: Iterable[str]) -> Dict[str, int]:
+        """
+        ターム名をIDに解決（索引にない名前は並列に作成して索引に追加）
+        
+        Returns:
+            fold_term_name() で畳み込んだ名前 → ID（作成に失敗した名前は含まない）
+        """
+        names = list(names)
+        lookup = self.taxonomy_index.lookup
+        known = await asyncio.to_thread(lookup, self.base_url, taxonomy, names)
+        
+        missing = {}
+        for name in names:
+            missing.setdefault(fold_term_name(name), name)
+        for key in known:
+            missing.pop(key, None)
+        
+        if missing:
+            # 既存のタームかもしれないので、索引が古ければ構築し直してから作成する
+            await self._warm_terms(taxonomy)
+            known.update(await asyncio.to_thread(lookup, self.base_url, taxonomy, list(missing.values())))
+            for key in known:
+                missing.pop(key, None)
+        
+        if missing:
+            term_ids = await asyncio.gather(*(
+                self._create_term(taxonomy, name) for name in missing.values()
+            ))
+            created = {name: term_id for name, term_id in zip(missing.values(), term_ids) if term_id}
+            await asyncio.to_thread(self.taxonomy_index.add, self.base_url, taxonomy, created)
+            known.update({fold_term_name(name): term_id for name, term_id in created.items()})
+        
+        return known
+    
+    async def resolve_categories(self, names: Iterable[str]) -> Dict[str, int]:
+        return await self.resolve_terms('categories', names)
+    
+    async def resolve_tags(self, names: Iterable[str]) -> Dict[str, int]:
+        return await self.resolve_terms('tags', names)
+    
+    async def create_post(self, post: WordPressPost) -> Optional[int]:
+        """投稿を作成"""
+        try:
+            response = await self._request('POST', 'posts', json=_post_payload(post))
             if response.status_code == 201:
-                new_tag = response.json()
-                self._tags_cache = None  # キャッシュをクリア
-                logger.info(f"Created new tag: {name} (ID={new_tag['id']})")
-                return new_tag['id']
-            else:
-                logger.error(f"Failed to create tag: {response.status_code}")
-                return None
-                
+                created_post = response.json()
+                logger.info(f"Post created successfully: ID={created_post['id']}, URL={created_post['link']}")
+                return created_post['id']
+            logger.error(f"Failed to create post: {response.status_code} - {response.text}")
+            return None
         except Exception as e:
-            logger.error(f"Error creating tag: {e}")
+            logger.error(f"Error creating post: {e}")
             return None
+    
+    async def update_post(self, post_id: int, updates: Dict) -> bool:
+        """投稿を更新"""
+        try:
+            response = await self._request('POST', f'posts/{post_id}', json=updates)
+            if response.status_code == 200:
+                logger.info(f"Post {post_id} updated successfully")
+                return True
+            logger.error(f"Failed to update post {post_id}: {response.status_code}")
+            return False
+        except Exception as e:
+            logger.error(f"Error updating post {post_id}: {e}")
+            return False
+    
+    async def create_posts(self, posts: List[WordPressPost]) -> List[Optional[int]]:
+        """複数の投稿を並列に作成（同時実行数は concurrency まで、結果は入力順）"""
+        return list(await asyncio.gather(*(self.create_post(post) for post in posts)))
 
 
 class ArticlePublisher:
     """記事をWordPressに投稿"""
     
-    def __init__(self):
+    def __init__(self, repository: Optional[ArticleRepository] = None):
         self.wp_client = WordPressClient()
         
+        # 一括投稿する記事の読み込みと投稿済みの記録
+        self.repository = repository or get_article_repository()
+        
+        # 投稿台帳（記事本文のハッシュで投稿済みかを判定）
+        self.ledger = PublishLedger(self.wp_client.base_url)
+        
         # デフォルトカテゴリ
         self.default_categories = {
             'breaking_news': '暗号通貨ニュース',
@@ -267,67 +483,94 @@ class ArticlePublisher:
             'market_overview': '市場動向'
         }
     
+    def _load_article(self, article_path: str, metadata_path: str) -> Tuple[str, Dict]:
+        """HTMLコンテンツとメタデータを読み込み"""
+        with open(article_path, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+        
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        
+        return html_content, metadata
+    
+    def _term_names(self, metadata: Dict) -> Tuple[str, List[str]]:
+        """記事のカテゴリ名とタグ名"""
+        article_type = metadata['article']['type']
+        category_name = self.default_categories.get(article_type, '暗号通貨')
+        tag_names = list(metadata['article']['coins']) + metadata['article']['keywords'][:5]  # キーワードは最大5個
+        return category_name, tag_names
+    
+    def _build_post(self, html_content: str, metadata: Dict,
+                    categories: List[int], tags: List[int]) -> WordPressPost:
+        """投稿データを作成"""
+        return WordPressPost(
+            title=metadata['topic']['title'],
+            content=html_content,
+            status='draft',
+            categories=categories,
+            tags=tags,
+            excerpt=self._generate_excerpt(html_content),
+            meta={
+                'article_generator_version': '1.0',
+                'generated_at': metadata['generated_at'],
+                'topic_score': metadata['topic'].get('score', 0)
+            }
+        )
+    
     def publish_article(self, article_path: str, metadata_path: str) -> Optional[int]:
-        """記事を投稿"""
+        """記事ファイルを投稿（投稿済みの記事は再投稿せず、既存の投稿IDを返す）"""
         try:
-            # HTMLコンテンツを読み込み
-            with open(article_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-            
-            # メタデータを読み込み
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
+            html_content, metadata = self._load_article(article_path, metadata_path)
+        except Exception as e:
+            logger.error(f"Error loading article: {e}")
+            return None
+        return self.publish_content(html_content, metadata, article_path)
+    
+    def publish_content(self, html_content: str, metadata: Dict,
+                        article_path: Optional[str] = None) -> Optional[int]:
+        """HTML本文とメタデータから記事を投稿（記事リポジトリの記事はこちらを使う）"""
+        content_hash = None
+        try:
+            content_hash = article_content_hash(metadata['topic']['title'], html_content)
+            claim = self.ledger.claim(content_hash, metadata['topic']['title'], article_path)
+            if not claim.claimed:
+                if claim.post_id:
+                    logger.info(f"Article already published: post_id={claim.post_id}")
+                    return claim.post_id
+                logger.warning(f"Article is being published by another process: {metadata['topic']['title']}")
+                return None
             
-            # タイトルを生成
-            title = metadata['topic']['title']
+            category_name, tag_names = self._term_names(metadata)
             
             # カテゴリを設定
-            article_type = metadata['article']['type']
-            category_name = self.default_categories.get(article_type, '暗号通貨')
             category_id = self.wp_client.get_or_create_category(category_name)
             categories = [category_id] if category_id else []
             
             # タグを設定
             tags = []
-            for coin in metadata['article']['coins']:
-                tag_id = self.wp_client.get_or_create_tag(coin)
-                if tag_id:
-                    tags.append(tag_id)
-            
-            for keyword in metadata['article']['keywords'][:5]:  # 最大5個
-                tag_id = self.wp_client.get_or_create_tag(keyword)
+            for name in tag_names:
+                tag_id = self.wp_client.get_or_create_tag(name)
                 if tag_id:
                     tags.append(tag_id)
             
-            # 抜粋を生成
-            excerpt = self._generate_excerpt(html_content)
-            
-            # 投稿データを作成
-            post = WordPressPost(
-                title=title,
-                content=html_content,
-                status='draft',
-                categories=categories,
-                tags=tags,
-                excerpt=excerpt,
-                meta={
-                    'article_generator_version': '1.0',
-                    'generated_at': metadata['generated_at'],
-                    'topic_score': metadata['topic'].get('score', 0)
-                }
-            )
-            
             # 投稿を作成
-            post_id = self.wp_client.create_post(post)
+            post_id = self.wp_client.create_post(self._build_post(html_content, metadata, categories, tags))
             
+            # 結果を台帳に記録
             if post_id:
-                # 成功時の記録
-                self._save_publish_record(article_path, post_id, metadata)
+                self.ledger.mark_published(content_hash, post_id, metadata)
+            else:
+                self.ledger.mark_failed(content_hash, "Failed to create post")
             
             return post_id
             
         except Exception as e:
             logger.error(f"Error publishing article: {e}")
+            if content_hash:
+                try:
+                    self.ledger.mark_failed(content_hash, str(e))
+                except Exception as ledger_error:
+                    logger.error(f"Error recording publish failure: {ledger_error}")
             return None
     
     def _generate_excerpt(self, html_content: str, max_length: int = 150) -> str:
@@ -354,52 +597,114 @@ class ArticlePublisher:
         
         return excerpt
     
-    def _save_publish_record(self, article_path: str, post_id: int, metadata: Dict):
-        """投稿記録を保存"""
-        record = {
-            'post_id': post_id,
-            'article_path': article_path,
-            'published_at': datetime.now().isoformat(),
-            'metadata': metadata
-        }
+    def _load_unpublished(self, limit: int) -> List[Tuple[int, str, Dict]]:
+        """未投稿の記事を (記事ID, HTML本文, メタデータ) で古い順に読み込み"""
+        repository = self.repository
+        db = repository.session_factory()
+        try:
+            return [
+                (article.id, repository.get_html(article), repository.publish_metadata(article))
+                for article in repository.list_unpublished(db, limit)
+            ]
+        finally:
+            db.close()
+    
+    async def _publish_chunk(self, client: AsyncWordPressClient,
+                             articles: List[Tuple[int, str, Dict]], batch_id: str) -> List[int]:
+        """チャンク内の記事を投稿し、結果を台帳に記録してから記事を投稿済みにする"""
+        entries = []
+        for article_id, html_content, metadata in articles:
+            try:
+                content_hash = article_content_hash(metadata['topic']['title'], html_content)
+                entries.append((article_id, html_content, metadata, content_hash))
+            except Exception as e:
+                logger.error(f"Error loading article {article_id}: {e}")
+        
+        claims = await asyncio.to_thread(self.ledger.claim_many, [
+            {'content_hash': content_hash, 'title': metadata['topic']['title'], 'batch_id': batch_id}
+            for _, _, metadata, content_hash in entries
+        ])
         
-        # 記録ファイルに追記
-        record_file = 'published_articles.jsonl'
-        with open(record_file, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        pending = []
+        claimed_hashes = set()
+        already_published = {}
+        for entry in entries:
+            article_id, _, _, content_hash = entry
+            claim = claims[content_hash]
+            if claim.post_id:
+                # 前回の実行で投稿済み（記事の更新前に中断した場合など）
+                logger.info(f"Skipping already published article: {article_id}")
+                already_published[article_id] = claim.post_id
+            elif claim.claimed and content_hash not in claimed_hashes:
+                claimed_hashes.add(content_hash)
+                pending.append(entry)
+            else:
+                logger.warning(f"Skipping article being published elsewhere: {article_id}")
+        
+        if not pending:
+            await asyncio.to_thread(self.repository.mark_published_many, already_published)
+            return []
+        
+        term_names = [self._term_names(metadata) for _, _, metadata, _ in pending]
+        category_ids, tag_ids = await asyncio.gather(
+            client.resolve_categories({category for category, _ in term_names}),
+            client.resolve_tags({name for _, tag_names in term_names for name in tag_names})
+        )
+        
+        posts = []
+        for (_, html_content, metadata, _), (category_name, tag_names) in zip(pending, term_names):
+            category_key = fold_term_name(category_name)
+            categories = [category_ids[category_key]] if category_key in category_ids else []
+            tags = [tag_ids[key] for key in map(fold_term_name, tag_names) if key in tag_ids]
+            posts.append(self._build_post(html_content, metadata, categories, tags))
+        
+        post_ids = await client.create_posts(posts)
+        
+        # 記事を投稿済みにする前に台帳へ記録（ここが再開時のチェックポイント）
+        await asyncio.to_thread(
+            self.ledger.record_results,
+            {content_hash: post_id for (*_, content_hash), post_id in zip(pending, post_ids)},
+            {content_hash: metadata for _, _, metadata, content_hash in pending}
+        )
+        
+        published = {article_id: post_id for (article_id, *_), post_id in zip(pending, post_ids) if post_id}
+        await asyncio.to_thread(self.repository.mark_published_many, {**already_published, **published})
+        return list(published.values())
     
-    def batch_publish(self, articles_dir: str, limit: int = 10) -> List[int]:
-        """複数記事を一括投稿"""
-        published_ids = []
+    async def batch_publish_async(self, limit: int = 10,
+                                  concurrency: Optional[int] = None,
+                                  batch_id: Optional[str] = None,
+                                  chunk_size: Optional[int] = None) -> List[int]:
+        """
+        未投稿の記事（記事リポジトリの下書き）を一括投稿し、今回新たに作成した投稿IDを返す
         
-        # 記事ファイルを探す
-        article_files = []
-        for filename in os.listdir(articles_dir):
-            if filename.endswith('.html') and not filename.endswith('_meta.json'):
-                article_path = os.path.join(articles_dir, filename)
-                metadata_path = article_path.replace('.html', '_meta.json')
-                
-                if os.path.exists(metadata_path):
-                    article_files.append((article_path, metadata_path))
+        記事は chunk_size 件ずつ処理する。チャンクごとにカテゴリ・タグをまとめて解決し、
+        投稿は concurrency 件まで並列に作成して結果を台帳に記録してから記事を投稿済みにする。
+        中断した場合も再実行すれば、台帳で投稿済みの記事は投稿せずに続きから投稿する。
+        """
+        batch_id = batch_id or uuid.uuid4().hex
+        chunk_size = chunk_size or int(os.getenv('WORDPRESS_PUBLISH_CHUNK_SIZE', '50'))
+        articles = await asyncio.to_thread(self._load_unpublished, limit)
+        if not articles:
+            return []
         
-        # 投稿
-        for article_path, metadata_path in article_files[:limit]:
-            logger.info(f"Publishing: {os.path.basename(article_path)}")
-            post_id = self.publish_article(article_path, metadata_path)
-            
-            if post_id:
-                published_ids.append(post_id)
-                
-                # 投稿済みファイルを移動
-                published_dir = os.path.join(articles_dir, 'published')
-                os.makedirs(published_dir, exist_ok=True)
-                
-                import shutil
-                shutil.move(article_path, os.path.join(published_dir, os.path.basename(article_path)))
-                shutil.move(metadata_path, os.path.join(published_dir, os.path.basename(metadata_path)))
+        published_ids = []
+        async with AsyncWordPressClient(
+            self.wp_client.base_url, self.wp_client.username, self.wp_client.app_password,
+            concurrency=concurrency, taxonomy_index=self.wp_client.taxonomy_index
+        ) as client:
+            logger.info(f"Publishing {len(articles)} articles (batch={batch_id}, concurrency={client.concurrency})")
+            for offset in range(0, len(articles), chunk_size):
+                published_ids.extend(await self._publish_chunk(
+                    client, articles[offset:offset + chunk_size], batch_id
+                ))
         
         logger.info(f"Published {len(published_ids)} articles")
         return published_ids
+    
+    def batch_publish(self, limit: int = 10) -> List[int]:
+        """未投稿の記事を一括投稿（batch_publish_async を同期的に実行）"""
+        return asyncio.run(self.batch_publish_async(limit))
 
 
 def main():
@@ -425,26 +730,18 @@ def main():
     # 記事投稿テスト
     publisher = ArticlePublisher()
     
-    # outputディレクトリから最新の記事を探す
-    articles_dir = './output/articles'
-    if os.path.exists(articles_dir):
-        files = os.listdir(articles_dir)
-        html_files = [f for f in files if f.endswith('.html')]
+    # 記事リポジトリから最も古い未投稿の記事を投稿
+    articles = publisher._load_unpublished(1)
+    if articles:
+        article_id, html_content, metadata = articles[0]
+        print(f"\n投稿テスト: 記事 {article_id}")
+        post_id = publisher.publish_content(html_content, metadata)
         
-        if html_files:
-            latest_file = sorted(html_files)[-1]
-            article_path = os.path.join(articles_dir, latest_file)
-            metadata_path = article_path.replace('.html', '_meta.json')
-            
-            if os.path.exists(metadata_path):
-                print(f"\n投稿テスト: {latest_file}")
-                post_id = publisher.publish_article(article_path, metadata_path)
-                
-                if post_id:
-                    print(f"✓ 投稿成功! Post ID: {post_id}")
-                    print(f"  管理画面で確認: {wp_client.base_url}/wp-admin/post.php?post={post_id}&action=edit")
-                else:
-                    print("✗ 投稿失敗")
+        if post_id:
+            print(f"✓ 投稿成功! Post ID: {post_id}")
+            print(f"  管理画面で確認: {wp_client.base_url}/wp-admin/post.php?post={post_id}&action=edit")
+        else:
+            print("✗ 投稿失敗")
 
 
 if __name__ == "__main__":
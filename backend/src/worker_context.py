@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Celeryワーカープロセスの共有コンテキスト
+パイプライン・記事生成器・HTTPコネクションプール・トピックストアを
+プロセスごとに一度だけ初期化し、タスク間で使い回す
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Optional
+
+import requests
+
+from .article_pipeline import ArticlePipeline, PipelineConfig
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerContext:
+    """
+    ワーカープロセス単位のシングルトン群
+
+    各プロパティは初回アクセス時に生成され、以降のタスクでは同じインスタンスを返す。
+    worker_process_init で warm_up() を呼ぶことで、最初のタスクからコストなしで利用できる。
+    """
+
+    def __init__(self, config: Optional[PipelineConfig] = None):
+        self.config = config or PipelineConfig.from_env()
+        self.pid = os.getpid()
+        self.warmup_ms: Optional[float] = None
+        self._lock = threading.RLock()
+        self._http_session: Optional[requests.Session] = None
+        self._pipeline: Optional[ArticlePipeline] = None
+        self._publisher = None
+        self._publisher_loaded = False
+
+    @property
+    def http_session(self) -> requests.Session:
+        """外部API用の共有HTTPセッション"""
+        if self._http_session is None:
+            with self._lock:
+                if self._http_session is None:
+                    self._http_session = requests.Session()
+        return self._http_session
+
+    @property
+    def pipeline(self) -> ArticlePipeline:
+        """記事生成パイプライン（トピックストア・収集器・生成器を含む）"""
+        if self._pipeline is None:
+            with self._lock:
+                if self._pipeline is None:
+                    pipeline = ArticlePipeline(self.config)
+                    # 収集器のHTTP接続をプロセス内で共有
+                    pipeline.price_collector.session = self.http_session
+                    # TOPIC_JOURNAL_OWNER=worker の場合だけ（収集タスクを1プロセスのワーカーで処理する構成）
+                    pipeline.attach_topic_journal('worker')
+                    self._pipeline = pipeline
+        return self._pipeline
+
+    @property
+    def generator(self):
+        return self.pipeline.article_generator
+
+    @property
+    def topic_manager(self):
+        return self.pipeline.topic_manager
+
+    @property
+    def publisher(self):
+        """WordPress投稿クライアント（未設定の場合は None）"""
+        if not self._publisher_loaded:
+            with self._lock:
+                if not self._publisher_loaded:
+                    try:
+                        from .wordpress_publisher import ArticlePublisher
+                        self._publisher = ArticlePublisher()
+                    except Exception as e:
+                        logger.warning(f"WordPress publisher not available: {e}")
+                        self._publisher = None
+                    self._publisher_loaded = True
+        return self._publisher
+
+    def add_topic_listener(self, listener) -> None:
+        """トピックストアへリスナーを登録（同じリスナーは一度だけ）"""
+        with self._lock:
+            if listener not in self.topic_manager._listeners:
+                self.topic_manager.add_listener(listener)
+
+    def warm_up(self) -> float:
+        """重い初期化を事前に実行し、所要時間(ms)を返す"""
+        start = time.perf_counter()
+        try:
+            self.pipeline
+        except Exception as e:
+            logger.error(f"Worker warm-up failed: {e}")
+        self.warmup_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Worker context initialized in {self.warmup_ms:.1f}ms (pid={self.pid})")
+        return self.warmup_ms
+
+
+# プロセスごとのインスタンス
+_worker_context: Optional[WorkerContext] = None
+
+
+def get_worker_context() -> WorkerContext:
+    """現在のプロセスのワーカーコンテキストを取得（fork後は作り直す）"""
+    global _worker_context
+    if _worker_context is None or _worker_context.pid != os.getpid():
+        _worker_context = WorkerContext()
+    return _worker_context
@@ -0,0 +1,776 @@
+#!/usr/bin/env python3
+"""
+バックエンド処理のベンチマークスクリプト
+
+使い方:
+    python scripts/benchmark.py worker-setup --tasks 20
+    python scripts/benchmark.py fact-extractor --articles 1000
+    python scripts/benchmark.py keyword-matcher --topics 20000
+    python scripts/benchmark.py batch-scoring --topics 100000
+    python scripts/benchmark.py article-search --articles 50000
+    python scripts/benchmark.py db-load --concurrency 32
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from pathlib import Path
+
+# backend をパスに追加
+backend_root = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_root))
+
+# 計測のみで外部APIは呼ばないため、未設定の場合はダミーのキーを使う
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark-dummy-key')
+os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-dummy-secret')
+
+
+def _timed(func, repeat: int):
+    """func を repeat 回実行し、各回の所要時間(ms)を返す"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(label: str, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(
+        f"{label:<28} mean={statistics.mean(samples):9.2f}ms  "
+        f"p50={statistics.median(samples):9.2f}ms  p95={p95:9.2f}ms  n={len(samples)}"
+    )
+
+
+def bench_worker_setup(args):
+    """記事生成タスクの生成開始までの固定コスト（コールド vs ウォーム）"""
+    from src.article_pipeline import ArticlePipeline, PipelineConfig
+    from src.worker_context import WorkerContext
+
+    config = PipelineConfig.from_env()
+
+    def cold_task():
+        # 従来: タスクごとにパイプラインを構築
+        pipeline = ArticlePipeline(config)
+        topic = pipeline.topic_manager.topics[0]
+        pipeline._convert_to_article_topic(topic)
+
+    context = WorkerContext(config)
+    warmup_ms = context.warm_up()
+
+    def warm_task():
+        # ワーカープロセスで初期化済みのパイプラインを再利用
+        topic = context.topic_manager.topics[0]
+        context.pipeline._convert_to_article_topic(topic)
+
+    print(f"worker warm-up (once per process): {warmup_ms:.2f}ms")
+    _report("cold (pipeline per task)", _timed(cold_task, args.tasks))
+    _report("warm (shared context)", _timed(warm_task, args.tasks))
+
+
+# ファクトチェック用のサンプル記事の素材
+_ARTICLE_SENTENCES = [
+    "ビットコイン（BTC）の価格が急騰し、過去24時間で15%上昇して$45,000を突破しました。",
+    "2024年1月15日、イーサリアムの取引量は前日比12.5%増加しました。",
+    "ビットコインの時価総額は8,500億ドルに達し、市場全体の45%を占めています。",
+    "Solana price rose to $120.50 while trading volume doubled.",
+    "リップルは時価総額ランキング5位を維持し、トップ10に定着しています。",
+    "アナリストによると、3ヶ月以内に$50,000を超える可能性があるとのことです。",
+    "カルダノの開発チームは2024/03/01に大型アップデートを予定しています。",
+    "ポルカドットは1週間前から150円前後で推移しています。",
+    "市場参加者は慎重な姿勢を崩しておらず、様子見ムードが続いています。",
+    "Chainlink and Polygon announced a partnership; Avalanche remained flat.",
+]
+
+
+def _make_article(rng: random.Random, sentences: int) -> str:
+    return "\n".join(rng.choice(_ARTICLE_SENTENCES) for _ in range(sentences))
+
+
+def _legacy_extract_facts(extractor, content: str):
+    """最適化前の抽出処理（種類ごと・名前ごとに finditer）"""
+    from src.fact_checker import FactCheckItem
+
+    facts = []
+    for pattern_info in extractor.patterns.values():
+        for match in re.finditer(pattern_info['pattern'], content, re.IGNORECASE):
+            start = max(0, match.start() - 50)
+            end = min(len(content), match.end() + 50)
+            facts.append(FactCheckItem(
+                text=match.group(), fact_type=pattern_info['type'],
+                context=content[start:end], position=match.start()
+            ))
+
+    for crypto_name in extractor.crypto_names:
+        for match in re.finditer(rf'\b{crypto_name}\b', content, re.IGNORECASE):
+            context = content[max(0, match.start() - 100):min(len(content), match.end() + 100)]
+            if any(keyword in context for keyword in ['価格', '値', 'price', '取引', 'trading']):
+                facts.append(FactCheckItem(
+                    text=match.group(), fact_type='crypto_name',
+                    context=context, position=match.start()
+                ))
+
+    unique, seen = [], set()
+    for fact in facts:
+        key = f"{fact.text}_{fact.fact_type}"
+        if key not in seen:
+            seen.add(key)
+            unique.append(fact)
+    return sorted(unique, key=lambda x: x.position)
+
+
+def bench_fact_extractor(args):
+    """FactExtractor の抽出速度（長文記事・記事バッチ）"""
+    from src.fact_checker import FactExtractor
+
+    rng = random.Random(args.seed)
+    extractor = FactExtractor()
+    long_article = _make_article(rng, args.long_sentences)
+    batch = [_make_article(rng, rng.randint(10, 40)) for _ in range(args.articles)]
+
+    # 結果が最適化前と一致することを確認
+    for content in [long_article] + batch:
+        expected = [(f.text, f.fact_type, f.position, f.context) for f in _legacy_extract_facts(extractor, content)]
+        actual = [(f.text, f.fact_type, f.position, f.context) for f in extractor.extract_facts(content)]
+        if expected != actual:
+            raise SystemExit("FactExtractor results differ from the legacy implementation")
+
+    print(f"long article: {len(long_article):,} chars / batch: {len(batch)} articles")
+    _report("long: legacy", _timed(lambda: _legacy_extract_facts(extractor, long_article), args.repeat))
+    _report("long: combined regex", _timed(lambda: extractor.extract_facts(long_article), args.repeat))
+    _report("batch: legacy", _timed(lambda: [_legacy_extract_facts(extractor, c) for c in batch], args.repeat))
+    _report("batch: combined regex", _timed(lambda: [extractor.extract_facts(c) for c in batch], args.repeat))
+
+
+# トピックのタイトル・要約の素材（一般語が大半で、キーワードは1割程度）
+_TOPIC_FILLER = [
+    "the", "a", "of", "to", "and", "in", "on", "for", "with", "as", "is", "was", "by",
+    "bitcoin", "ethereum", "market", "traders", "investors", "exchange", "token",
+    "network", "volume", "on-chain", "data", "week", "according", "price", "said",
+    "crypto", "asset", "holders", "billion", "million", "daily", "funds", "chain",
+    "protocol", "users", "fees", "blocks", "wallets", "after", "before", "since",
+]
+_TOPIC_KEYWORDS = [
+    "hacked", "exploit", "launches", "partnership", "all-time high", "whale",
+    "technical analysis", "support", "bullish", "airdrop", "podcast", "community",
+    "surge", "crash", "breaking", "report", "trend", "update", "regulation",
+    "速報", "急騰", "規制", "分析", "レポート", "ETF", "SEC", "DeFi", "NFT", "ATH",
+]
+
+
+def _make_text(rng: random.Random, words: int) -> str:
+    return " ".join(
+        rng.choice(_TOPIC_KEYWORDS) if rng.random() < 0.1 else rng.choice(_TOPIC_FILLER)
+        for _ in range(words)
+    )
+
+
+def _make_topic(rng: random.Random) -> dict:
+    return {
+        'title': _make_text(rng, rng.randint(8, 14)),
+        'summary': _make_text(rng, rng.randint(40, 80)),
+    }
+
+
+def _legacy_analyze_content(scorer, title: str, summary: str) -> float:
+    """最適化前のスコア計算（カテゴリ・キーワードごとに部分文字列検索）"""
+    text = (title + " " + summary).lower()
+    max_score = 0
+    for rules in scorer.scoring_rules.values():
+        category_score = rules["base_score"]
+        for keyword in rules["keywords"]:
+            if keyword in text:
+                category_score += rules["weight"]
+        if category_score > max_score:
+            max_score = category_score
+    return min(100, max_score)
+
+
+def _legacy_topic_keywords(collector, title: str, summary: str):
+    """最適化前のキーワード抽出・優先度判定"""
+    from src.topic_collector import TopicPriority
+
+    text_lower = (title + " " + summary).lower()
+    keywords = [term for term in collector.important_terms if term.lower() in text_lower][:5]
+    priority = TopicPriority.LOW
+    for level in ('urgent', 'high', 'medium'):
+        if any(keyword in text_lower for keyword in collector.priority_keywords[level]):
+            priority = collector.PRIORITY_LEVELS[level]
+            break
+    return keywords, priority
+
+
+def _legacy_urgency(client, title: str, summary: str) -> str:
+    text = (title + " " + summary).lower()
+    for urgency_level, keywords in client.urgency_keywords.items():
+        if any(keyword in text for keyword in keywords):
+            return urgency_level
+    return "low"
+
+
+def bench_keyword_matcher(args):
+    """キーワード判定のスループット（トピック/秒）"""
+    from src.content_scorer import ContentScorer
+    from src.topic_collector import RSSFeedCollector
+    from src.rss_client import RSSClient
+
+    rng = random.Random(args.seed)
+    topics = [_make_topic(rng) for _ in range(args.topics)]
+    scorer = ContentScorer()
+    collector = RSSFeedCollector()
+    client = RSSClient()
+
+    def new_topic_keywords(title, summary):
+        return collector._analyze_keywords(title, summary)
+
+    # 結果が最適化前と一致することを確認
+    for topic in topics:
+        title, summary = topic['title'], topic['summary']
+        if (
+            _legacy_analyze_content(scorer, title, summary) != scorer._analyze_content(title, summary)
+            or _legacy_topic_keywords(collector, title, summary) != new_topic_keywords(title, summary)
+            or _legacy_topic_keywords(collector, title, summary) != (
+                collector._extract_keywords(title + " " + summary), collector._determine_priority(title, summary))
+            or _legacy_urgency(client, title, summary) != client._calculate_urgency(title, summary)
+        ):
+            raise SystemExit(f"Keyword matcher results differ for topic: {topic}")
+
+    cases = [
+        ("scorer", lambda t: _legacy_analyze_content(scorer, t['title'], t['summary']),
+         lambda t: scorer._analyze_content(t['title'], t['summary'])),
+        ("collector", lambda t: _legacy_topic_keywords(collector, t['title'], t['summary']),
+         lambda t: new_topic_keywords(t['title'], t['summary'])),
+        ("rss urgency", lambda t: _legacy_urgency(client, t['title'], t['summary']),
+         lambda t: client._calculate_urgency(t['title'], t['summary'])),
+    ]
+
+    print(f"topics: {len(topics):,}")
+    for label, legacy, compiled in cases:
+        for name, func in (("legacy", legacy), ("matcher", compiled)):
+            samples = _timed(lambda: [func(topic) for topic in topics], args.repeat)
+            best = min(samples) / 1000
+            print(f"{label + ': ' + name:<28} {len(topics) / best:12,.0f} topics/s")
+
+
+def _make_scoring_topic(rng: random.Random, now) -> dict:
+    from datetime import timedelta, timezone
+
+    topic = _make_topic(rng)
+    topic['coins'] = rng.sample(["BTC", "ETH", "SOL", "XRP", "DOGE", "ADA", "PEPE"], rng.randint(0, 3))
+    change = rng.choice([None, round(rng.uniform(-30, 30), 2)])
+    topic['primaryData'] = {'change24h': change}
+    published = now - timedelta(seconds=rng.uniform(0, 10 * 86400))
+    if rng.random() < 0.5:
+        topic['collectedAt'] = published.isoformat()
+    else:
+        topic['collectedAt'] = published.astimezone().replace(tzinfo=None).isoformat()
+    return topic
+
+
+def bench_batch_scoring(args):
+    """ContentScorer.batch_score_topics のスカラー計算と列データ計算"""
+    import copy
+    from datetime import datetime, timezone
+    from src.content_scorer import ContentScorer
+
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    topics = [_make_scoring_topic(rng, now) for _ in range(args.topics)]
+    scorer = ContentScorer()
+
+    def scalar(batch):
+        scored = [scorer._score_topic(topic, now) for topic in batch]
+        scored.sort(key=lambda x: x.get('score', 0), reverse=True)
+        return scored
+
+    # 結果がスカラー計算と一致することを確認（型も含めて比較）
+    expected = scalar(copy.deepcopy(topics))
+    actual = scorer.batch_score_topics(copy.deepcopy(topics), now=now)
+    if json.dumps(expected, sort_keys=True) != json.dumps(actual, sort_keys=True):
+        raise SystemExit("Columnar scoring results differ from the scalar path")
+
+    def run(label, func):
+        # トピックは計測前に複製しておく（スコアリング結果を書き込むため）
+        batches = [copy.deepcopy(topics) for _ in range(args.repeat)]
+        samples = _timed(lambda: func(batches.pop()), args.repeat)
+        print(f"{label:<34} {min(samples):9.1f}ms  {len(topics) / (min(samples) / 1000):12,.0f} topics/s")
+
+    print(f"topics: {len(topics):,}")
+    run("scalar batch_score_topics", scalar)
+    run("columnar batch_score_topics", lambda batch: scorer.batch_score_topics(batch, now=now))
+    run("topic_columns (once per topic)", scorer.topic_columns)
+
+    # 再スコアリング: 列データは保持したまま、基準時刻だけ変えて再計算
+    columns = scorer.topic_columns(topics)[0]
+    samples = _timed(lambda: scorer.score_columns(
+        columns['keyword_counts'], columns['price_changes'],
+        columns['coin_multipliers'], columns['timestamps'], now=now
+    ), args.repeat)
+    print(f"{'score_columns (rescoring run)':<34} {min(samples):9.1f}ms  {len(topics) / (min(samples) / 1000):12,.0f} topics/s")
+
+
+def bench_topic_ranking(args):
+    """減衰後スコアの上位取得: 全件再計算+ソートと DecayingScoreIndex"""
+    import math
+    from src.score_decay import DecayingScoreIndex
+
+    rng = random.Random(args.seed)
+    now = time.time()
+    index = DecayingScoreIndex(half_life_hours=36)
+    entries = []
+    for i in range(args.topics):
+        # 過去1週間に収集されたトピック（ベーススコアは20〜150）
+        entry = (i, rng.uniform(20, 150), now - rng.uniform(0, 7 * 24 * 3600))
+        entries.append(entry)
+        index.add(entry, entry[1], entry[2])
+
+    def full_sort(count, min_score):
+        scored = [(entry, entry[1] * math.exp(-index.rate * (now - entry[2]))) for entry in entries]
+        scored = [pair for pair in scored if pair[1] >= min_score]
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored[:count]
+
+    # 順位と減衰後のスコアが全件計算と一致することを確認
+    for count in (10, 1000):
+        expected = full_sort(count, args.min_score)
+        actual = index.top(count, args.min_score, now)
+        if [e[0] for e, _ in expected] != [e[0] for e, _ in actual] or \
+                any(abs(a - b) > 1e-9 * a for (_, a), (_, b) in zip(expected, actual)):
+            raise SystemExit("Indexed ranking differs from full rescoring")
+
+    print(f"topics: {len(entries):,}")
+    for count in (10, 1000):
+        for label, func in (("full rescoring + sort", full_sort),
+                            ("DecayingScoreIndex.top", lambda c, m: index.top(c, m, now))):
+            samples = _timed(lambda: func(count, args.min_score), args.repeat)
+            _report(f"{label} (top {count})", samples)
+
+
+class _FakeWordPress:
+    """
+    WordPress REST API の最小限の偽サーバー（users/me, categories, tags, posts）
+
+    一覧は per_page / page と X-WP-TotalPages に対応し、既存タームの作成には
+    term_exists を返す。各リクエストに latency 秒の遅延を入れる。
+    """
+
+    def __init__(self, latency: float, terms: int):
+        import threading
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.terms = {
+            'categories': [{'id': i + 1, 'name': f"category-{i}"} for i in range(terms)],
+            'tags': [{'id': i + 1, 'name': f"tag-{i}"} for i in range(terms)],
+        }
+        self.posts = []
+        self.requests = 0
+        self.taxonomy_requests = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _route(self):
+                from urllib.parse import urlparse, parse_qs
+                url = urlparse(self.path)
+                return url.path.split('/wp-json/wp/v2/', 1)[-1], parse_qs(url.query)
+
+            def do_GET(self):
+                time.sleep(fake.latency)
+                endpoint, query = self._route()
+                with fake.lock:
+                    fake.requests += 1
+                    fake.taxonomy_requests += endpoint in fake.terms
+                    if endpoint == 'users/me':
+                        return self._send(200, {'id': 1, 'name': 'benchmark'})
+                    items = list(fake.terms.get(endpoint, []))
+                per_page = int(query.get('per_page', ['10'])[0])
+                page = int(query.get('page', ['1'])[0])
+                total_pages = max(1, -(-len(items) // per_page))
+                self._send(200, items[(page - 1) * per_page:page * per_page],
+                           {'X-WP-Total': str(len(items)), 'X-WP-TotalPages': str(total_pages)})
+
+            def do_POST(self):
+                time.sleep(fake.latency)
+                endpoint, _ = self._route()
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with fake.lock:
+                    fake.requests += 1
+                    fake.taxonomy_requests += endpoint in fake.terms
+                    if endpoint in fake.terms:
+                        terms = fake.terms[endpoint]
+                        existing = next((t for t in terms if t['name'].lower() == body['name'].lower()), None)
+                        if existing:
+                            return self._send(400, {'code': 'term_exists', 'data': {'term_id': existing['id']}})
+                        term = {'id': len(terms) + 1, 'name': body['name']}
+                        terms.append(term)
+                        return self._send(201, term)
+                    if endpoint == 'posts':
+                        post = {'id': len(fake.posts) + 1, 'link': f"http://wp.local/?p={len(fake.posts) + 1}", **body}
+                        fake.posts.append(post)
+                        return self._send(201, post)
+                self._send(404, {'code': 'rest_no_route'})
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _seed_articles(repository, count: int, rng: random.Random, edition: str = ""):
+    """ArticlePublisher が投稿する下書き記事を記事リポジトリに保存する（edition で本文を変える）"""
+    coins = ["BTC", "ETH", "SOL", "XRP", "ADA", "DOGE", "DOT", "AVAX"]
+    types = ["breaking_news", "price_analysis", "market_overview", "educational"]
+    for i in range(count):
+        repository.save_generated(
+            title=f"Benchmark article {i}",
+            html_content=f"<p>{_make_text(rng, 200)}。{edition}</p>",
+            article_type=rng.choice(types),
+            coins=rng.sample(coins, 2),
+            keywords=[f"keyword-{rng.randrange(count)}" for _ in range(5)],
+            generation_params={'topic': {'title': f"Benchmark article {i}", 'score': 50}},
+        )
+
+
+def bench_wordpress_publish(args):
+    """ArticlePublisher: 1件ずつの同期投稿と batch_publish（非同期・並列）"""
+    import shutil
+    import logging
+    import tempfile
+
+    # 記事と投稿台帳は一時的なSQLiteに記録
+    dbdir = Path(tempfile.mkdtemp(prefix='wp-bench-db-'))
+    os.environ['DATABASE_URL'] = f"sqlite:///{dbdir / 'bench.db'}"
+    from src.database import SessionLocal, Article, create_tables
+    from src.article_repository import ArticleRepository
+    from src.wordpress_publisher import ArticlePublisher
+    create_tables()
+    repository = ArticleRepository()
+
+    for name in ('src.wordpress_publisher', 'src.taxonomy_index', 'httpx'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    def drafts():
+        db = SessionLocal()
+        try:
+            return db.query(Article).filter(Article.status == 'draft').count()
+        finally:
+            db.close()
+
+    def run(label, fake, publish, edition="", expected=args.articles):
+        _seed_articles(repository, args.articles, random.Random(args.seed), edition)
+        os.environ.update({'WORDPRESS_URL': fake.url, 'WORDPRESS_USERNAME': 'bench',
+                           'WORDPRESS_APP_PASSWORD': 'secret'})
+        publisher = ArticlePublisher(repository)
+        requests_before, taxonomy_before = fake.requests, fake.taxonomy_requests
+        start = time.perf_counter()
+        post_ids = publish(publisher)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        if len([p for p in post_ids if p]) != expected:
+            raise SystemExit(f"{label}: published {len(post_ids)} of {expected} articles")
+        requests = fake.requests - requests_before
+        taxonomy_requests = fake.taxonomy_requests - taxonomy_before
+        print(f"{label:<30} {elapsed:9.1f}ms  requests={requests:5d}  "
+              f"taxonomy={taxonomy_requests:4d}  {args.articles / (elapsed / 1000):8.1f} articles/s")
+        return requests, taxonomy_requests
+
+    def sequential(publisher):
+        articles = publisher._load_unpublished(args.articles)
+        post_ids = [publisher.publish_content(html, metadata) for _, html, metadata in articles]
+        repository.mark_published_many({article_id: post_id for (article_id, _, _), post_id in zip(articles, post_ids)})
+        return post_ids
+
+    def batched(publisher):
+        post_ids = publisher.batch_publish(limit=args.articles)
+        # 投稿済み（今回・前回とも）の記事は投稿済みになる
+        if drafts():
+            raise SystemExit("batch_publish left published articles as drafts")
+        return post_ids
+
+    print(f"articles: {args.articles}, existing terms: {args.existing_terms}, latency: {args.latency}ms")
+    sequential_wp = _FakeWordPress(args.latency / 1000, args.existing_terms)
+    batched_wp = _FakeWordPress(args.latency / 1000, args.existing_terms)
+    try:
+        run("sequential publish_content", sequential_wp, sequential)
+        run("batch_publish (async)", batched_wp, batched)
+        # 同じサイトへの別の記事: タクソノミー索引が構築済みなので問い合わせは不要
+        if run("batch_publish (warm index)", batched_wp, batched, edition="v2")[1] != 0:
+            raise SystemExit("Warm taxonomy index still queried WordPress")
+        # 投稿済みの記事の再実行: 台帳で判定してWordPressには何も送らない
+        if run("batch_publish (rerun)", batched_wp, batched, expected=0)[0] != 0:
+            raise SystemExit("Already published articles were sent to WordPress again")
+    finally:
+        sequential_wp.close()
+        batched_wp.close()
+        shutil.rmtree(dbdir, ignore_errors=True)
+
+    # どちらの方法でも同じカテゴリ・タグが付くことを確認
+    def signature(fake):
+        names = {endpoint: {t['id']: t['name'] for t in terms} for endpoint, terms in fake.terms.items()}
+        return sorted(
+            (post['title'], sorted(names['categories'][c] for c in post.get('categories', [])),
+             sorted(names['tags'][t] for t in post.get('tags', [])))
+            for post in fake.posts
+        )
+    # （バッチ側は本文だけ異なる同じ記事を2回投稿している）
+    if sorted(signature(sequential_wp) * 2) != signature(batched_wp):
+        raise SystemExit("Batch publishing assigned different categories or tags")
+
+
+def bench_article_search(args):
+    """記事検索: ILIKE '%q%' の全件走査と全文検索索引（SQLite FTS5 trigram）"""
+    import shutil
+    import tempfile
+    from datetime import datetime, timedelta
+
+    dbdir = Path(tempfile.mkdtemp(prefix='search-bench-db-'))
+    os.environ['DATABASE_URL'] = f"sqlite:///{dbdir / 'bench.db'}"
+    from sqlalchemy import text
+    from src.database import SessionLocal, Article, engine, create_tables
+    from src.search_index import search_articles
+
+    rng = random.Random(args.seed)
+    try:
+        create_tables()
+        start = time.perf_counter()
+        now = datetime(2024, 1, 1)
+        rows = [
+            {
+                'title': _make_text(rng, rng.randint(6, 12)),
+                # 案件番号は記事ごとに異なる（ヒット数の少ない検索語）
+                'content': f"{_make_text(rng, args.words)} 案件{i:06d}",
+                'status': rng.choice(['draft', 'published']),
+                'type': rng.choice(['analysis', 'news', 'market_overview']),
+                'generated_at': now + timedelta(minutes=i),
+            }
+            for i in range(args.articles)
+        ]
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO articles (title, content, status, type, generated_at) "
+                "VALUES (:title, :content, :status, :type, :generated_at)"
+            ), rows)
+        print(f"articles: {args.articles} ({args.words} words), "
+              f"seeded and indexed in {(time.perf_counter() - start):.1f}s")
+
+        def legacy(db, query):
+            pattern = f"%{query}%"
+            return db.query(Article).filter(
+                Article.title.ilike(pattern) | Article.content.ilike(pattern)
+            ).limit(20).all()
+
+        db = SessionLocal()
+        try:
+            for query in args.queries:
+                # 同じ記事が見つかることを確認（全件取得して集合で比較。空白区切りの語はすべて含む）
+                expected = db.query(Article.id)
+                for term in query.split():
+                    expected = expected.filter(
+                        Article.title.ilike(f"%{term}%") | Article.content.ilike(f"%{term}%")
+                    )
+                expected = {a.id for a in expected}
+                found = {a.id for a in search_articles(db, query, limit=len(expected) + 1)}
+                if found != expected:
+                    raise SystemExit(f"Search index returned different articles for {query!r}")
+                print(f"query {query!r}: {len(expected)} matches")
+                _report("  ILIKE scan (20)", _timed(lambda: legacy(db, query), args.repeat))
+                _report("  search index (20)", _timed(lambda: search_articles(db, query), args.repeat))
+                _report("  search index (page 5)",
+                        _timed(lambda: search_articles(db, query, offset=80), args.repeat))
+
+            # 更新・削除が索引に反映されることを確認
+            article = db.query(Article).first()
+            article.content = "索引同期の確認用テキスト"
+            db.commit()
+            if [a.id for a in search_articles(db, "索引同期の確認")] != [article.id]:
+                raise SystemExit("Updated article was not reindexed")
+            db.delete(article)
+            db.commit()
+            if search_articles(db, "索引同期の確認"):
+                raise SystemExit("Deleted article is still in the search index")
+        finally:
+            db.close()
+    finally:
+        shutil.rmtree(dbdir, ignore_errors=True)
+
+
+def bench_db_load(args):
+    """同時リクエストのスループット: 既定の create_engine と create_database_engine"""
+    import shutil
+    import tempfile
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import sessionmaker
+
+    dbdir = Path(tempfile.mkdtemp(prefix='db-load-bench-'))
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{dbdir / 'app.db'}")
+    from src.database import Base, Topic, create_database_engine, pool_status
+    from src.article_repository import ArticleRepository
+    from src.system_counters import install_system_counters
+
+    def make_url(name: str) -> str:
+        # SQLite はジャーナルモードがファイルに残るため、エンジンごとに別のファイルを使う
+        return args.database_url or f"sqlite:///{dbdir / (name + '.db')}"
+
+    def seed(engine):
+        Base.metadata.create_all(bind=engine)
+        install_system_counters(engine)
+        now = datetime(2024, 1, 1)
+        rng = random.Random(args.seed)
+        with engine.begin() as conn:
+            if conn.execute(text("SELECT COUNT(*) FROM articles")).scalar():
+                return
+            conn.execute(text(
+                "INSERT INTO articles (title, content, status, type, generated_at) "
+                "VALUES (:title, :content, 'draft', 'news', :generated_at)"
+            ), [
+                {'title': _make_text(rng, 8), 'content': _make_text(rng, 80), 'generated_at': now + timedelta(minutes=i)}
+                for i in range(args.articles)
+            ])
+
+    def run(label: str, engine):
+        seed(engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        repository = ArticleRepository(session_factory=Session)
+        errors = []
+        latencies = []
+        lock = threading.Lock()
+
+        def request(i: int):
+            # API のリクエスト1件（get_db と同じくセッションを開いて閉じる）
+            start = time.perf_counter()
+            db = Session()
+            try:
+                if i % 100 < args.write_percent:
+                    db.add(Topic(title=f"load {label} {i}", score=50.0, priority='medium', source='rss'))
+                    db.commit()
+                else:
+                    repository.list_page(db, limit=20)
+            except Exception as e:
+                db.rollback()
+                with lock:
+                    errors.append(type(e).__name__)
+            finally:
+                db.close()
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(request, range(args.requests)))
+        elapsed = time.perf_counter() - start
+        print(f"{label}: {args.requests / elapsed:8.1f} req/s  errors={len(errors)}"
+              + (f" ({', '.join(sorted(set(errors)))})" if errors else ""))
+        _report("  latency", latencies)
+        return engine
+
+    try:
+        print(f"concurrency={args.concurrency} requests={args.requests} writes={args.write_percent}%")
+        legacy = run("create_engine (defaults)", create_engine(make_url('legacy'), echo=False))
+        legacy.dispose()
+        tuned = run("create_database_engine", create_database_engine(make_url('tuned')))
+        print(f"  pool: {pool_status(tuned)}")
+        tuned.dispose()
+    finally:
+        shutil.rmtree(dbdir, ignore_errors=True)
+
+
+BENCHMARKS = {
+    'worker-setup': (bench_worker_setup, "記事生成タスクの固定コスト"),
+    'fact-extractor': (bench_fact_extractor, "ファクト抽出の速度"),
+    'keyword-matcher': (bench_keyword_matcher, "キーワード判定のスループット"),
+    'batch-scoring': (bench_batch_scoring, "トピック一括スコアリングの速度"),
+    'topic-ranking': (bench_topic_ranking, "減衰後スコアの上位トピック取得"),
+    'wordpress-publish': (bench_wordpress_publish, "WordPressへの一括投稿"),
+    'article-search': (bench_article_search, "記事の全文検索"),
+    'db-load': (bench_db_load, "同時リクエスト時のデータベースのスループット"),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="バックエンド処理のベンチマーク")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    worker = subparsers.add_parser('worker-setup', help=BENCHMARKS['worker-setup'][1])
+    worker.add_argument('--tasks', type=int, default=20, help="計測するタスク数")
+
+    facts = subparsers.add_parser('fact-extractor', help=BENCHMARKS['fact-extractor'][1])
+    facts.add_argument('--articles', type=int, default=1000, help="バッチの記事数")
+    facts.add_argument('--long-sentences', type=int, default=5000, help="長文記事の文数")
+    facts.add_argument('--repeat', type=int, default=5, help="計測回数")
+    facts.add_argument('--seed', type=int, default=42)
+
+    keywords = subparsers.add_parser('keyword-matcher', help=BENCHMARKS['keyword-matcher'][1])
+    keywords.add_argument('--topics', type=int, default=20000, help="トピック数")
+    keywords.add_argument('--repeat', type=int, default=5, help="計測回数")
+    keywords.add_argument('--seed', type=int, default=42)
+
+    scoring = subparsers.add_parser('batch-scoring', help=BENCHMARKS['batch-scoring'][1])
+    scoring.add_argument('--topics', type=int, default=100000, help="トピック数")
+    scoring.add_argument('--repeat', type=int, default=3, help="計測回数")
+    scoring.add_argument('--seed', type=int, default=42)
+
+    ranking = subparsers.add_parser('topic-ranking', help=BENCHMARKS['topic-ranking'][1])
+    ranking.add_argument('--topics', type=int, default=100000, help="トピック数")
+    ranking.add_argument('--min-score', type=float, default=10, help="スコアの下限")
+    ranking.add_argument('--repeat', type=int, default=5, help="計測回数")
+    ranking.add_argument('--seed', type=int, default=42)
+
+    wordpress = subparsers.add_parser('wordpress-publish', help=BENCHMARKS['wordpress-publish'][1])
+    wordpress.add_argument('--articles', type=int, default=50, help="投稿する記事数")
+    wordpress.add_argument('--existing-terms', type=int, default=250, help="既存のカテゴリ・タグ数")
+    wordpress.add_argument('--latency', type=float, default=20, help="偽サーバーの応答遅延(ms)")
+    wordpress.add_argument('--seed', type=int, default=42)
+
+    search = subparsers.add_parser('article-search', help=BENCHMARKS['article-search'][1])
+    search.add_argument('--articles', type=int, default=50000, help="記事数")
+    search.add_argument('--words', type=int, default=150, help="本文の語数")
+    search.add_argument('--queries', nargs='+', default=['案件000042', '規制 DeFi', 'レポート', 'bullish', '速報'],
+                        help="検索語")
+    search.add_argument('--repeat', type=int, default=20, help="計測回数")
+    search.add_argument('--seed', type=int, default=42)
+
+    load = subparsers.add_parser('db-load', help=BENCHMARKS['db-load'][1])
+    load.add_argument('--requests', type=int, default=3000, help="リクエスト数")
+    load.add_argument('--concurrency', type=int, default=16, help="同時実行数")
+    load.add_argument('--write-percent', type=int, default=10, help="書き込みリクエストの割合(%%)")
+    load.add_argument('--articles', type=int, default=5000, help="事前に投入する記事数")
+    load.add_argument('--database-url', help="計測するデータベース（未指定なら一時的なSQLite）")
+    load.add_argument('--seed', type=int, default=42)
+
+    args = parser.parse_args()
+    func, _ = BENCHMARKS[args.benchmark]
+    func(args)
+
+
+if __name__ == "__main__":
+    main()
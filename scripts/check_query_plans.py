@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+ホットなクエリの実行計画チェック
+
+DatabaseUtils の各クエリと記事一覧・ファクトチェック・メトリクスのクエリを実行し、
+発行されたSQLを EXPLAIN して、索引を使わない全件走査や並べ替えがあれば失敗（終了コード1）にする。
+既定では一時的なSQLiteに現実的な件数のデータを投入して確認する。
+
+使い方:
+    python scripts/check_query_plans.py
+    python scripts/check_query_plans.py --rows 100000
+    DATABASE_URL=postgresql://... python scripts/check_query_plans.py --database-url $DATABASE_URL
+"""
+
+import os
+import re
+import sys
+import random
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# backend をパスに追加
+backend_root = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_root))
+
+os.environ.setdefault('JWT_SECRET_KEY', 'query-plan-check')
+
+# 索引を使わない全件走査（SQLite / PostgreSQL）
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+SQLITE_TEMP_SORT = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY)')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+_WORDS = [
+    "ビットコイン", "イーサリアム", "価格", "分析", "規制", "速報", "市場", "上昇", "下落",
+    "ETF", "DeFi", "NFT", "bitcoin", "market", "report", "trend", "update", "volume",
+]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def seed(engine, rows: int, rng: random.Random):
+    """トピック・記事・ファクトチェック結果・メトリクスを投入"""
+    from sqlalchemy import text
+
+    now = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO topics (title, content, score, priority, source, processed, collected_at) "
+            "VALUES (:title, :content, :score, :priority, 'rss', :processed, :collected_at)"
+        ), [
+            {
+                'title': _text(rng, 8), 'content': _text(rng, 20), 'score': rng.uniform(0, 100),
+                'priority': rng.choice(['low', 'medium', 'high']), 'processed': rng.random() < 0.8,
+                'collected_at': now + timedelta(minutes=i),
+            }
+            for i in range(rows)
+        ])
+        conn.execute(text(
+            "INSERT INTO articles (title, content, type, status, word_count, generated_at) "
+            "VALUES (:title, :content, :type, :status, :word_count, :generated_at)"
+        ), [
+            {
+                'title': _text(rng, 8), 'content': _text(rng, 30),
+                'type': rng.choice(['analysis', 'news', 'market_overview', 'educational']),
+                'status': rng.choice(['draft', 'draft', 'published', 'archived']),
+                'word_count': rng.randint(300, 2000), 'generated_at': now + timedelta(minutes=i),
+            }
+            for i in range(rows)
+        ])
+        conn.execute(text(
+            "INSERT INTO fact_check_results (article_id, reliability_score, checker_version, checked_at) "
+            "VALUES (:article_id, :score, :version, :checked_at)"
+        ), [
+            {
+                'article_id': rng.randint(1, rows), 'score': rng.randint(0, 100),
+                'version': rng.choice(['1.0', '2.0']), 'checked_at': now + timedelta(minutes=i),
+            }
+            for i in range(rows)
+        ])
+        conn.execute(text(
+            "INSERT INTO system_metrics (metric_name, metric_value, category, recorded_at) "
+            "VALUES (:name, :value, 'system', :recorded_at)"
+        ), [
+            {
+                'name': f"metric_{rng.randrange(50)}", 'value': rng.random(),
+                'recorded_at': now + timedelta(seconds=i * 30),
+            }
+            for i in range(rows)
+        ])
+        # 統計情報を更新（実行計画が投入したデータ量を前提にするように）
+        conn.execute(text("ANALYZE"))
+
+
+def hot_queries():
+    """(名前, クエリを実行する関数, 許容する計画) の一覧"""
+    from sqlalchemy import desc, func
+    from src.database import DatabaseUtils, Article, FactCheckResult, SystemMetrics
+    from src.fact_check_pipeline import load_previous_results
+    from src.article_repository import ArticleRepository
+    from src.pagination import encode_article_cursor
+
+    since = datetime(2024, 1, 10)
+    return [
+        ('DatabaseUtils.get_topic_by_id', lambda db: DatabaseUtils.get_topic_by_id(db, 42), ()),
+        ('DatabaseUtils.get_article_by_id', lambda db: DatabaseUtils.get_article_by_id(db, 42), ()),
+        ('DatabaseUtils.get_articles_by_status',
+         lambda db: DatabaseUtils.get_articles_by_status(db, 'published'), ()),
+        ('DatabaseUtils.get_recent_articles', lambda db: DatabaseUtils.get_recent_articles(db), ()),
+        ('DatabaseUtils.get_topics_by_score', lambda db: DatabaseUtils.get_topics_by_score(db, 90.0), ()),
+        ('DatabaseUtils.get_unprocessed_topics', lambda db: DatabaseUtils.get_unprocessed_topics(db), ()),
+        # 関連度順の並べ替えは候補（SEARCH_RANK_WINDOW 件）に対してのみ行う
+        ('DatabaseUtils.search_articles', lambda db: DatabaseUtils.search_articles(db, 'イーサリアム 規制'),
+         (SQLITE_TEMP_SORT,)),
+        # 2文字の語は bigram 索引、関連度順の範囲より後ろのページは記事IDの降順
+        ('search_articles (bigram)', lambda db: DatabaseUtils.search_articles(db, '規制'), (SQLITE_TEMP_SORT,)),
+        ('search_articles (past window)', lambda db: DatabaseUtils.search_articles(db, '規制', offset=220),
+         (SQLITE_TEMP_SORT,)),
+        ('DatabaseUtils.get_system_stats', lambda db: DatabaseUtils.get_system_stats(db), ()),
+        ('get_articles (status)', lambda db: db.query(Article).filter(Article.status == 'draft')
+         .order_by(desc(Article.generated_at)).limit(20).all(), ()),
+        ('get_articles (type)', lambda db: db.query(Article).filter(Article.type == 'news')
+         .order_by(desc(Article.generated_at)).limit(20).all(), ()),
+        # カーソルの次のページ（キーの比較で索引から引く）
+        ('list_page (cursor)', lambda db: ArticleRepository().list_page(
+            db, cursor=encode_article_cursor(datetime(2024, 1, 5), 5000)), ()),
+        ('list_page (status, cursor)', lambda db: ArticleRepository().list_page(
+            db, cursor=encode_article_cursor(datetime(2024, 1, 5), 5000), status='draft'), ()),
+        ('count_generated_since', lambda db: ArticleRepository().count_generated_since(db, since), ()),
+        ('list_unpublished', lambda db: ArticleRepository().list_unpublished(db, 50), ()),
+        ('blob references', lambda db: db.query(Article.html_blob_hash)
+         .filter(Article.html_blob_hash.in_(['0' * 64, 'f' * 64])).all(), ()),
+        ('load_previous_results', lambda db: load_previous_results(db, list(range(1, 200))), ()),
+        ('fact checks by article', lambda db: db.query(FactCheckResult)
+         .filter(FactCheckResult.article_id == 42).all(), ()),
+        ('metrics by name', lambda db: db.query(SystemMetrics)
+         .filter(SystemMetrics.metric_name == 'metric_7', SystemMetrics.recorded_at >= since)
+         .order_by(desc(SystemMetrics.recorded_at)).limit(100).all(), ()),
+        ('latest metric value', lambda db: db.query(func.max(SystemMetrics.recorded_at))
+         .filter(SystemMetrics.metric_name == 'metric_7').scalar(), ()),
+    ]
+
+
+def explain(conn, statement: str, parameters):
+    """実行計画の各行（SQLite は detail 列、PostgreSQL はテキスト）"""
+    if conn.dialect.name == 'sqlite':
+        return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    return [row[0] for row in conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)]
+
+
+def violations(dialect: str, plan, allowed):
+    found = []
+    for line in plan:
+        detail = line.strip()
+        if dialect == 'sqlite':
+            patterns = (SQLITE_FULL_SCAN, SQLITE_TEMP_SORT)
+        else:
+            patterns = (POSTGRES_FULL_SCAN,)
+        for pattern in patterns:
+            if pattern.search(detail) and pattern not in allowed:
+                found.append(detail)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ホットなクエリの実行計画チェック")
+    parser.add_argument('--database-url', help="確認するデータベース（未指定なら一時的なSQLite）")
+    parser.add_argument('--rows', type=int, default=20000, help="テーブルごとに投入する行数")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--verbose', action='store_true', help="すべての実行計画を表示")
+    args = parser.parse_args()
+
+    tempdir = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        tempdir = Path(tempfile.mkdtemp(prefix='query-plan-'))
+        os.environ['DATABASE_URL'] = f"sqlite:///{tempdir / 'plans.db'}"
+
+    try:
+        from sqlalchemy import event, text
+        from src.database import engine, SessionLocal, create_tables
+
+        create_tables()
+        with engine.connect() as conn:
+            existing = conn.execute(text("SELECT COUNT(*) FROM articles")).scalar()
+        if existing:
+            print(f"Using existing data ({existing} articles)")
+        else:
+            seed(engine, args.rows, random.Random(args.seed))
+            print(f"Seeded {args.rows} rows per table ({engine.dialect.name})")
+        if engine.dialect.name == 'sqlite':
+            # 投入した記事を bigram 索引に反映しておく（反映待ちの読み出しは確認の対象外）
+            from src.search_index import sync_bigram_index
+            sync_bigram_index(engine)
+
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        failures = 0
+        for name, run, allowed in hot_queries():
+            captured.clear()
+            db = SessionLocal()
+            event.listen(engine, 'before_cursor_execute', capture)
+            try:
+                run(db)
+            finally:
+                event.remove(engine, 'before_cursor_execute', capture)
+                db.close()
+
+            problems = []
+            with engine.connect() as conn:
+                for statement, parameters in list(captured):
+                    plan = explain(conn, statement, parameters)
+                    if args.verbose:
+                        print(f"  {statement}\n    " + "\n    ".join(plan))
+                    problems += violations(engine.dialect.name, plan, allowed)
+
+            status = "FAIL" if problems else "ok"
+            print(f"{status:<5} {name:<40} statements={len(captured)}")
+            for problem in problems:
+                print(f"      {problem}")
+            failures += bool(problems)
+
+        if failures:
+            print(f"{failures} queries use a full scan or an unindexed sort")
+            sys.exit(1)
+        print("All hot queries use indexes")
+    finally:
+        if tempdir:
+            shutil.rmtree(tempdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
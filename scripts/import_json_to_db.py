@@ -1,18 +1,28 @@
 #!/usr/bin/env python3
 """
 既存のJSONファイルデータをPostgreSQLにインポートするスクリプト
+
+使い方:
+    python scripts/import_json_to_db.py
+    python scripts/import_json_to_db.py --bulk --workers 8 --chunk-size 1000
 """
 
 import os
+import re
 import sys
 import json
+import time
 import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
-# プロジェクトルートをパスに追加
+# プロジェクトルートと backend をパスに追加
 project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
+sys.path.append(str(project_root / "backend"))
+
+from sqlalchemy import func, text
 
 from src.database import (
     SessionLocal, Topic, Article, FactCheckResult, 
@@ -27,6 +37,103 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def parse_datetime(date_str):
+    """日付文字列をdatetimeオブジェクトに変換"""
+    if not date_str:
+        return None
+    
+    try:
+        # ISO形式
+        return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    except:
+        try:
+            # 一般的な形式
+            return datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
+        except:
+            logger.warning(f"Cannot parse datetime: {date_str}")
+            return None
+
+
+def extract_text_from_html(html_content: str) -> str:
+    """HTMLからテキストコンテンツを抽出"""
+    try:
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html_content, 'html.parser')
+        return soup.get_text().strip()
+    except ImportError:
+        # BeautifulSoupが利用できない場合は簡易的に処理
+        text_content = re.sub(r'<[^>]+>', '', html_content)
+        return text_content.strip()
+
+
+def topic_fields(topic_data: dict) -> dict:
+    """JSONのトピック1件 → topics の列"""
+    return dict(
+        title=topic_data.get('title', ''),
+        content=topic_data.get('content', ''),
+        score=float(topic_data.get('score', 0.0)),
+        priority=topic_data.get('priority', 'medium'),
+        source=topic_data.get('source', ''),
+        source_url=topic_data.get('source_url', ''),
+        keywords=topic_data.get('keywords', []),
+        coins=topic_data.get('coins', []),
+        collected_at=parse_datetime(topic_data.get('collected_at')),
+        processed=topic_data.get('processed', False),
+        processed_at=parse_datetime(topic_data.get('processed_at'))
+    )
+
+
+def article_fields(article_id: str, html_content: str, metadata: dict) -> dict:
+    """記事のHTMLとメタデータ → articles の列（topic_id 以外）"""
+    # HTMLからテキストコンテンツを抽出
+    text_content = extract_text_from_html(html_content)
+    return dict(
+        title=metadata.get('topic', {}).get('title', article_id),
+        content=text_content,
+        html_content=html_content,
+        type=metadata.get('article', {}).get('type', 'analysis'),
+        status='draft',  # デフォルトは下書き
+        word_count=metadata.get('article', {}).get('word_count', len(text_content)),
+        coins=metadata.get('article', {}).get('coins', []),
+        keywords=metadata.get('article', {}).get('keywords', []),
+        source=metadata.get('topic', {}).get('source'),
+        source_url=metadata.get('topic', {}).get('source_url'),
+        model_used=metadata.get('generation', {}).get('model', 'unknown'),
+        generation_params=metadata.get('generation', {}),
+        generated_at=parse_datetime(metadata.get('generated_at'))
+    )
+
+
+def read_article_file(articles_dir: str, html_file: str):
+    """
+    記事1件のファイルを読み込んで列を組み立てる（一括モードのワーカープロセスで実行）
+    
+    戻り値は (ファイル名, 列, 関連トピックのタイトル, エラー)。
+    """
+    try:
+        article_id = html_file.replace('.html', '')
+        html_path = os.path.join(articles_dir, html_file)
+        meta_path = os.path.join(articles_dir, f"{article_id}_meta.json")
+        
+        with open(html_path, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+        
+        metadata = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+        
+        fields = article_fields(article_id, html_content, metadata)
+        return html_file, fields, metadata.get('topic', {}).get('title', ''), None
+    except Exception as e:
+        return html_file, None, None, str(e)
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
 class DataImporter:
     """JSONデータのインポートクラス"""
     
@@ -67,19 +174,7 @@ class DataImporter:
                         continue
                     
                     # 新しいトピックを作成
-                    topic = Topic(
-                        title=topic_data.get('title', ''),
-                        content=topic_data.get('content', ''),
-                        score=float(topic_data.get('score', 0.0)),
-                        priority=topic_data.get('priority', 'medium'),
-                        source=topic_data.get('source', ''),
-                        source_url=topic_data.get('source_url', ''),
-                        keywords=topic_data.get('keywords', []),
-                        coins=topic_data.get('coins', []),
-                        collected_at=self._parse_datetime(topic_data.get('collected_at')),
-                        processed=topic_data.get('processed', False),
-                        processed_at=self._parse_datetime(topic_data.get('processed_at'))
-                    )
+                    topic = Topic(**topic_fields(topic_data))
                     
                     self.db.add(topic)
                     self.imported_topics += 1
@@ -133,9 +228,6 @@ class DataImporter:
                         self.skipped_items += 1
                         continue
                     
-                    # HTMLからテキストコンテンツを抽出
-                    text_content = self._extract_text_from_html(html_content)
-                    
                     # 関連トピックを検索
                     topic_title = metadata.get('topic', {}).get('title', '')
                     topic = None
@@ -147,19 +239,7 @@ class DataImporter:
                     # 新しい記事を作成
                     article = Article(
                         topic_id=topic.id if topic else None,
-                        title=metadata.get('topic', {}).get('title', article_id),
-                        content=text_content,
-                        html_content=html_content,
-                        type=metadata.get('article', {}).get('type', 'analysis'),
-                        status='draft',  # デフォルトは下書き
-                        word_count=metadata.get('article', {}).get('word_count', len(text_content)),
-                        coins=metadata.get('article', {}).get('coins', []),
-                        keywords=metadata.get('article', {}).get('keywords', []),
-                        source=metadata.get('topic', {}).get('source'),
-                        source_url=metadata.get('topic', {}).get('source_url'),
-                        model_used=metadata.get('generation', {}).get('model', 'unknown'),
-                        generation_params=metadata.get('generation', {}),
-                        generated_at=self._parse_datetime(metadata.get('generated_at'))
+                        **article_fields(article_id, html_content, metadata)
                     )
                     
                     self.db.add(article)
@@ -176,33 +256,112 @@ class DataImporter:
             logger.error(f"Error importing articles from {articles_dir}: {e}")
             self.db.rollback()
     
-    def _parse_datetime(self, date_str):
-        """日付文字列をdatetimeオブジェクトに変換"""
-        if not date_str:
-            return None
+    def import_topics_bulk(self, json_file_path: str, chunk_size: int = 1000):
+        """
+        トピックを一括インポート
         
-        try:
-            # ISO形式
-            return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-        except:
+        既存のタイトルを最初に1回だけ読み込み、bulk_insert_mappings で chunk_size 件ずつコミットする。
+        import_topics_from_json と同じく、実行前からあるタイトルだけを重複として飛ばす。
+        """
+        if not os.path.exists(json_file_path):
+            logger.warning(f"Topics file not found: {json_file_path}")
+            return
+        
+        with open(json_file_path, 'r', encoding='utf-8') as f:
+            topics_data = json.load(f)
+        logger.info(f"Bulk importing {len(topics_data)} topics from {json_file_path}")
+        
+        existing_titles = {title for (title,) in self.db.query(Topic.title)}
+        rows = []
+        for topic_data in topics_data:
+            try:
+                if topic_data.get('title', '') in existing_titles:
+                    self.skipped_items += 1
+                    continue
+                rows.append(topic_fields(topic_data))
+            except Exception as e:
+                logger.error(f"Error importing topic: {e}")
+        
+        self._insert_chunks(Topic, rows, chunk_size, 'topics')
+        self.imported_topics += len(rows)
+        logger.info(f"Successfully imported {len(rows)} topics")
+    
+    def import_articles_bulk(self, articles_dir: str, workers: int = None, chunk_size: int = 1000):
+        """
+        記事を一括インポート
+        
+        ファイルの読み込みとHTMLからのテキスト抽出はプロセスを分けて並列に行い、
+        既存タイトルは1回の読み込み、関連トピックは IN 句でまとめて引く。
+        挿入は bulk_insert_mappings で chunk_size 件ずつコミットし、進捗をログに出す。
+        結果は import_articles_from_directory と同じ（同じ順序・同じ列の値で挿入する）。
+        """
+        if not os.path.exists(articles_dir):
+            logger.warning(f"Articles directory not found: {articles_dir}")
+            return
+        
+        html_files = [f for f in os.listdir(articles_dir) if f.endswith('.html')]
+        logger.info(f"Found {len(html_files)} HTML files in {articles_dir}")
+        
+        existing_titles = {title for (title,) in self.db.query(Article.title)}
+        
+        # 並列に読み込み（map は元の順序で結果を返す）
+        parsed = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(html_files) // ((workers or os.cpu_count() or 1) * 8))
+            results = executor.map(read_article_file, [articles_dir] * len(html_files), html_files,
+                                   chunksize=chunksize)
+            for html_file, fields, topic_title, error in results:
+                if error:
+                    logger.error(f"Error importing article {html_file}: {error}")
+                    continue
+                if fields['title'] in existing_titles:
+                    logger.debug(f"Article already exists: {html_file}")
+                    self.skipped_items += 1
+                    continue
+                parsed.append((fields, topic_title))
+        
+        # 関連トピックをまとめて解決（同じタイトルが複数あれば最初のもの）
+        topic_ids = {}
+        titles = sorted({topic_title for _, topic_title in parsed if topic_title})
+        for batch in _chunks(titles, 500):
+            topic_ids.update(
+                self.db.query(Topic.title, func.min(Topic.id))
+                .filter(Topic.title.in_(batch))
+                .group_by(Topic.title)
+            )
+        
+        rows = [
+            {'topic_id': topic_ids.get(topic_title) if topic_title else None, **fields}
+            for fields, topic_title in parsed
+        ]
+        self._insert_chunks(Article, rows, chunk_size, 'articles')
+        self.imported_articles += len(rows)
+        logger.info(f"Successfully imported {len(rows)} articles")
+    
+    def _insert_chunks(self, model, rows: list, chunk_size: int, label: str):
+        """chunk_size 件ずつ挿入してコミット（失敗したチャンクだけロールバック）"""
+        started = time.perf_counter()
+        done = 0
+        for chunk in _chunks(rows, chunk_size):
             try:
-                # 一般的な形式
-                return datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-            except:
-                logger.warning(f"Cannot parse datetime: {date_str}")
-                return None
+                self.db.bulk_insert_mappings(model, chunk)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                logger.error(f"Failed to insert {label} {done + 1}-{done + len(chunk)}; "
+                             f"{done} were committed, re-run to resume")
+                raise
+            done += len(chunk)
+            elapsed = time.perf_counter() - started
+            logger.info(f"{label}: {done}/{len(rows)} inserted ({done / elapsed if elapsed else 0:.0f}/s)")
+    
+    def _parse_datetime(self, date_str):
+        """日付文字列をdatetimeオブジェクトに変換"""
+        return parse_datetime(date_str)
     
     def _extract_text_from_html(self, html_content: str) -> str:
         """HTMLからテキストコンテンツを抽出"""
-        try:
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(html_content, 'html.parser')
-            return soup.get_text().strip()
-        except ImportError:
-            # BeautifulSoupが利用できない場合は簡易的に処理
-            import re
-            text = re.sub(r'<[^>]+>', '', html_content)
-            return text.strip()
+        return extract_text_from_html(html_content)
     
     def print_summary(self):
         """インポート結果のサマリーを表示"""
@@ -215,6 +374,14 @@ class DataImporter:
 
 def main():
     """メイン実行関数"""
+    parser = argparse.ArgumentParser(description="JSONファイルのデータをデータベースにインポート")
+    parser.add_argument('--bulk', action='store_true', help="一括モード（並列読み込みとまとめての挿入）")
+    parser.add_argument('--workers', type=int, default=None, help="一括モードの読み込みプロセス数（既定: CPU数）")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="一括モードで1回にコミットする件数")
+    parser.add_argument('--topics-file', default=os.path.join(project_root, "output", "topics.json"))
+    parser.add_argument('--articles-dir', default=os.path.join(project_root, "output", "articles"))
+    args = parser.parse_args()
+    
     logger.info("Starting JSON to PostgreSQL import process...")
     
     # データベーステーブルを作成
@@ -224,7 +391,7 @@ def main():
     # データベース接続テスト
     try:
         db = SessionLocal()
-        db.execute("SELECT 1")
+        db.execute(text("SELECT 1"))
         db.close()
         logger.info("Database connection successful")
     except Exception as e:
@@ -234,16 +401,22 @@ def main():
     
     with DataImporter() as importer:
         # トピックデータをインポート
-        topics_file = os.path.join(project_root, "output", "topics.json")
+        topics_file = args.topics_file
         if os.path.exists(topics_file):
-            importer.import_topics_from_json(topics_file)
+            if args.bulk:
+                importer.import_topics_bulk(topics_file, chunk_size=args.chunk_size)
+            else:
+                importer.import_topics_from_json(topics_file)
         else:
             logger.info("No topics.json file found, skipping topics import")
         
         # 記事データをインポート
-        articles_dir = os.path.join(project_root, "output", "articles")
+        articles_dir = args.articles_dir
         if os.path.exists(articles_dir):
-            importer.import_articles_from_directory(articles_dir)
+            if args.bulk:
+                importer.import_articles_bulk(articles_dir, workers=args.workers, chunk_size=args.chunk_size)
+            else:
+                importer.import_articles_from_directory(articles_dir)
         else:
             logger.info("No articles directory found, skipping articles import")
         